@@ -1,17 +1,16 @@
 from gestionador import Gestionador
 
 def main():
-    USER = "neo4j"
-    PASSWORD = "proyectoNEO4J"
-    URL = "bolt://localhost:7474"
-
+    conexion = None
     try:
-        conexion = Gestionador(URL, USER, PASSWORD)
+        # URI y credenciales desde las variables NEO4J_* (ver app/db.py)
+        conexion = Gestionador()
         print("Conexión exitosa a Neo4j")
     except Exception as e:
         print("Error al conectar a Neo4j:", e)
     finally:
-        conexion.close()
+        if conexion is not None:
+            conexion.close()
 
 if __name__ == "__main__":
     main()
@@ -1,25 +1,66 @@
-from flask import Flask, request, jsonify, render_template, session, redirect, url_for
+from flask import Flask, request, jsonify, render_template, session, redirect, url_for, Response, stream_with_context
 from flask_cors import CORS
-import traceback
+import json
+import logging
+
+from log_setup import configure_logging
+
+# Antes de importar el recomendador: sus logs también pasan por la cola
+configure_logging()
+logger = logging.getLogger(__name__)
+
+from deadline import Deadline
+from server_timing import ServerTiming
 
 # Importar el sistema de recomendaciones
 try:
-    from recommender_minimal import get_recommendations
+    from recommender import (get_recommendations, get_recommendations_with_tier, get_cache_stats,
+                             get_breaker_stats, stream_recommendations, get_recommendations_page,
+                             start_warm_up, get_readiness, get_similar_cars, get_facet_counts,
+                             SIMILAR_LIMIT, SIMILAR_MAX, WIZARD_STEPS)
     RECOMMENDER_AVAILABLE = True
-    print("✅ Usando recommender_minimal.py")
+    logger.info("Usando recommender.py")
 except ImportError as e:
+    def get_cache_stats():
+        return {}
+    def get_breaker_stats():
+        return {}
+    def start_warm_up():
+        return None
+    def get_similar_cars(car_id, k=6):
+        return None
+    def get_facet_counts(step, selections):
+        return None
+    WIZARD_STEPS = [('brands', []), ('budget', []), ('fuel', []), ('types', []), ('transmission', [])]
+    SIMILAR_LIMIT, SIMILAR_MAX = 6, 24
+    def get_readiness():
+        return {"ready": True, "state": "minimal"}
+    # recommender_minimal solo acepta las cinco preferencias: k se aplica recortando
+    # y los pesos se ignoran (siempre puntúa con los pesos por defecto)
+    def get_recommendations_with_tier(*args, deadline=None, timing=None, k=None, weights=None, **kwargs):
+        recommendations = get_recommendations(*args, **kwargs)
+        return (recommendations[:k] if k else recommendations), 'minimal'
+
+    def stream_recommendations(*args, k=None, weights=None, **kwargs):
+        recommendations = get_recommendations(*args, **kwargs)
+        yield from (recommendations[:k] if k else recommendations)
+    get_recommendations_page = None
     try:
-        from recommender import get_recommendations
+        from recommender_minimal import get_recommendations
         RECOMMENDER_AVAILABLE = True
-        print("✅ Usando recommender.py")
+        logger.info("Usando recommender_minimal.py")
     except ImportError as e2:
-        print(f"❌ Warning: No se pudo importar sistema de recomendaciones: {e2}")
+        logger.error(f"No se pudo importar sistema de recomendaciones: {e2}")
         RECOMMENDER_AVAILABLE = False
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=["X-Recommendation-Tier", "X-Relaxed-Constraints", "Server-Timing"])
 app.secret_key = 'tu_clave_secreta_aqui_cambiala_por_una_segura'
 
+# Fase de arranque: conectar y precalentar en segundo plano; /api/ready responde 503 hasta que termine
+if RECOMMENDER_AVAILABLE:
+    start_warm_up()
+
 @app.route("/")
 def index():
     return render_template("index.html")
@@ -35,7 +76,7 @@ def login():
         if username and password:
             session['logged_in'] = True
             session['username'] = username
-            print(f"✅ Usuario logueado: {username}")
+            logger.info("Usuario logueado", extra={'username': username})
             return jsonify({"success": True, "redirect": url_for("brands")})
         else:
             return jsonify({"success": False, "message": "Credenciales inválidas"})
@@ -94,11 +135,11 @@ def save_brands():
     try:
         data = request.get_json()
         brands_data = data.get('brands')
-        print(f"🏷️ Guardando brands: {brands_data}")
+        logger.debug("Selección guardada", extra={'step': 'brands', 'value': brands_data})
         session['selected_brands'] = brands_data
         return jsonify({"success": True})
     except Exception as e:
-        print(f"❌ Error guardando brands: {e}")
+        logger.error(f"Error guardando brands: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route("/api/save-budget", methods=["POST"])
@@ -106,11 +147,11 @@ def save_budget():
     try:
         data = request.get_json()
         budget_data = data.get('budget')
-        print(f"💰 Guardando budget: {budget_data}")
+        logger.debug("Selección guardada", extra={'step': 'budget', 'value': budget_data})
         session['selected_budget'] = budget_data
         return jsonify({"success": True})
     except Exception as e:
-        print(f"❌ Error guardando budget: {e}")
+        logger.error(f"Error guardando budget: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route("/api/save-fuel", methods=["POST"])
@@ -118,11 +159,11 @@ def save_fuel():
     try:
         data = request.get_json()
         fuel_data = data.get('fuel')
-        print(f"⛽ Guardando fuel: {fuel_data}")
+        logger.debug("Selección guardada", extra={'step': 'fuel', 'value': fuel_data})
         session['selected_fuel'] = fuel_data
         return jsonify({"success": True})
     except Exception as e:
-        print(f"❌ Error guardando fuel: {e}")
+        logger.error(f"Error guardando fuel: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route("/api/save-types", methods=["POST"])
@@ -130,11 +171,11 @@ def save_types():
     try:
         data = request.get_json()
         types_data = data.get('types')
-        print(f"🚗 Guardando types: {types_data}")
+        logger.debug("Selección guardada", extra={'step': 'types', 'value': types_data})
         session['selected_types'] = types_data
         return jsonify({"success": True})
     except Exception as e:
-        print(f"❌ Error guardando types: {e}")
+        logger.error(f"Error guardando types: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route("/api/save-transmission", methods=["POST"])
@@ -142,20 +183,34 @@ def save_transmission():
     try:
         data = request.get_json()
         transmission_data = data.get('transmission')
-        print(f"⚙️ Guardando transmission: {transmission_data}")
+        logger.debug("Selección guardada", extra={'step': 'transmission', 'value': transmission_data})
         session['selected_transmission'] = transmission_data
         return jsonify({"success": True})
     except Exception as e:
-        print(f"❌ Error guardando transmission: {e}")
+        logger.error(f"Error guardando transmission: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+def parse_ranking_args():
+    """Parámetros de ranking opcionales: ?k=10&w_brand=40&w_price=10 (ValueError si son inválidos)"""
+    ranking = {}
+    if request.args.get('k'):
+        ranking['k'] = max(1, min(int(request.args['k']), 100))
+    weights = {name[2:]: float(value) for name, value in request.args.items()
+               if name.startswith('w_')}
+    if weights:
+        ranking['weights'] = weights
+    return ranking
+
+def request_deadline():
+    """Plazo de la petición: cabecera X-Request-Deadline-Ms o deadline.DEFAULT_DEADLINE_MS"""
+    return Deadline.from_ms(request.headers.get('X-Request-Deadline-Ms'))
+
 @app.route("/api/recommendations", methods=["GET"])
 def api_recommendations():
+    # El plazo y los tiempos por fase empiezan a contar al recibir la petición
+    deadline = request_deadline()
+    timing = ServerTiming()
     try:
-        print("\n" + "="*60)
-        print("🎯 API RECOMMENDATIONS - INICIANDO")
-        print("="*60)
-        
         # Obtener datos de la sesión
         brands = session.get('selected_brands')
         budget = session.get('selected_budget')
@@ -163,14 +218,11 @@ def api_recommendations():
         types = session.get('selected_types')
         transmission = session.get('selected_transmission')
         
-        # Debug detallado
-        print("📊 DATOS DE SESIÓN:")
-        print(f"  🏷️  Brands: {brands} (tipo: {type(brands)})")
-        print(f"  💰 Budget: {budget} (tipo: {type(budget)})")
-        print(f"  ⛽ Fuel: {fuel} (tipo: {type(fuel)})")
-        print(f"  🚗 Types: {types} (tipo: {type(types)})")
-        print(f"  ⚙️  Transmission: {transmission} (tipo: {type(transmission)})")
-        print(f"  👤 Usuario: {session.get('username', 'N/A')}")
+        # Solo con LOG_LEVEL=DEBUG: los campos se formatean en el hilo del listener
+        logger.debug("Selecciones de la sesión", extra={
+            'brands': brands, 'budget': budget, 'fuel': fuel, 'types': types,
+            'transmission': transmission, 'username': session.get('username')
+        })
         
         # Verificar que todos los datos estén presentes
         missing_data = []
@@ -181,7 +233,7 @@ def api_recommendations():
         if not transmission: missing_data.append("transmission")
         
         if missing_data:
-            print(f"❌ FALTAN DATOS: {', '.join(missing_data)}")
+            logger.warning("Faltan datos de selección", extra={'missing': missing_data})
             return jsonify({
                 "error": f"Faltan datos de selección: {', '.join(missing_data)}",
                 "session_data": {
@@ -194,11 +246,9 @@ def api_recommendations():
                 "missing": missing_data
             }), 400
         
-        print("✅ TODOS LOS DATOS PRESENTES")
-        
         # Si el sistema de recomendaciones no está disponible, usar datos de ejemplo
         if not RECOMMENDER_AVAILABLE:
-            print("⚠️ RECOMMENDER NO DISPONIBLE - Usando datos de ejemplo")
+            logger.warning("Recomendador no disponible, se usan datos de ejemplo")
             sample_recommendations = [
                 {
                     "id": "sample_1",
@@ -313,46 +363,179 @@ def api_recommendations():
                     "image": None
                 }
             ]
-            return jsonify(sample_recommendations)
+            response = jsonify(sample_recommendations)
+            response.headers['X-Recommendation-Tier'] = 'sample'
+            return response
         
-        print("🔍 Llamando a get_recommendations...")
-        print(f"  Parámetros enviados:")
-        print(f"    brands={brands}")
-        print(f"    budget={budget}")
-        print(f"    fuel={fuel}")
-        print(f"    types={types}")
-        print(f"    transmission={transmission}")
+        try:
+            ranking = parse_ranking_args()
+        except ValueError as e:
+            return jsonify({"error": f"Parámetros de ranking inválidos: {e}"}), 400
         
         # Usar el sistema de recomendaciones real
-        result = get_recommendations(brands, budget, fuel, types, transmission)
-        
-        print(f"📋 Resultado recibido:")
-        print(f"  Tipo: {type(result)}")
-        print(f"  Cantidad: {len(result) if isinstance(result, list) else 'N/A'}")
-        if result and isinstance(result, list):
-            print(f"  Primer elemento: {result[0].get('name', 'Sin nombre') if result[0] else 'Vacío'}")
+        result, tier = get_recommendations_with_tier(brands, budget, fuel, types, transmission,
+                                                     deadline=deadline, timing=timing, **ranking)
         
         # Asegurar que el resultado sea una lista
         if not isinstance(result, list):
-            print(f"⚠️ get_recommendations devolvió {type(result)}, esperaba lista")
+            logger.warning(f"get_recommendations devolvió {type(result).__name__}, esperaba lista")
             return jsonify([])
         
-        print(f"🎉 ÉXITO: Devolviendo {len(result)} recomendaciones")
-        print("="*60)
-        
-        return jsonify(result)
+        with timing.phase('serialize'):
+            response = jsonify(result)
+        response.headers['X-Recommendation-Tier'] = tier
+        if result and result[0].get('relaxed_constraints'):
+            response.headers['X-Relaxed-Constraints'] = ",".join(result[0]['relaxed_constraints'])
+        response.headers['Server-Timing'] = timing.header()
+        logger.info("Recomendaciones servidas", extra={
+            'tier': tier, 'results': len(result), 'timing_ms': timing.milliseconds()
+        })
+        return response
         
     except Exception as e:
-        # Log completo del error
-        error_traceback = traceback.format_exc()
-        print(f"💥 ERROR en api_recommendations:")
-        print(error_traceback)
+        # Traza completa en el log (nivel ERROR)
+        logger.exception("Error en api_recommendations")
         
         return jsonify({
             "error": f"Error interno del servidor: {str(e)}",
             "details": "Revisa la consola del servidor para más información"
         }), 500
 
+@app.route("/api/recommendations/stream", methods=["GET"])
+def api_recommendations_stream():
+    """
+    Variante en flujo de /api/recommendations: una línea NDJSON por auto
+    
+    Cada auto se envía en cuanto llega su registro de Neo4j. Si algo falla a
+    mitad del flujo se envía una última línea {"error": ...}.
+    """
+    selections = {
+        'brands': session.get('selected_brands'),
+        'budget': session.get('selected_budget'),
+        'fuel': session.get('selected_fuel'),
+        'types': session.get('selected_types'),
+        'transmission': session.get('selected_transmission')
+    }
+    missing_data = [name for name, value in selections.items() if not value]
+    if missing_data:
+        return jsonify({
+            "error": f"Faltan datos de selección: {', '.join(missing_data)}",
+            "session_data": selections,
+            "missing": missing_data
+        }), 400
+    
+    if not RECOMMENDER_AVAILABLE:
+        return jsonify({"error": "Sistema de recomendaciones no disponible"}), 503
+    
+    try:
+        ranking = parse_ranking_args()
+    except ValueError as e:
+        return jsonify({"error": f"Parámetros de ranking inválidos: {e}"}), 400
+    
+    def generate():
+        sent = 0
+        try:
+            for car in stream_recommendations(**selections, **ranking):
+                sent += 1
+                yield json.dumps(car, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.error(f"Error en flujo de recomendaciones tras {sent} autos: {e}")
+            yield json.dumps({"error": f"Error interno del servidor: {str(e)}"}) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson",
+                    headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache"})
+
+@app.route("/api/recommendations/page", methods=["GET"])
+def api_recommendations_page():
+    """
+    Recomendaciones paginadas por cursor: ?sort=score_desc&page_size=10&cursor=<token>
+    
+    Devuelve {"results": [...], "next_cursor": token o null, "sort": ...}
+    """
+    selections = {
+        'brands': session.get('selected_brands'),
+        'budget': session.get('selected_budget'),
+        'fuel': session.get('selected_fuel'),
+        'types': session.get('selected_types'),
+        'transmission': session.get('selected_transmission')
+    }
+    missing_data = [name for name, value in selections.items() if not value]
+    if missing_data:
+        return jsonify({
+            "error": f"Faltan datos de selección: {', '.join(missing_data)}",
+            "missing": missing_data
+        }), 400
+    
+    if not RECOMMENDER_AVAILABLE or get_recommendations_page is None:
+        return jsonify({"error": "Paginación no disponible"}), 503
+    
+    try:
+        ranking = parse_ranking_args()
+        page_size = max(1, min(int(request.args.get('page_size', 10)), 50))
+        page = get_recommendations_page(
+            **selections,
+            sort=request.args.get('sort', 'score_desc'),
+            page_size=page_size,
+            cursor=request.args.get('cursor') or None,
+            weights=ranking.get('weights')
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error en api_recommendations_page: {e}")
+        return jsonify({"error": f"Error interno del servidor: {str(e)}"}), 500
+    
+    return jsonify(page)
+
+@app.route("/api/cars/<car_id>/similar", methods=["GET"])
+def api_similar_cars(car_id):
+    """Autos parecidos a car_id según el índice k-NN en memoria (?k=6)"""
+    try:
+        k = max(1, min(int(request.args.get('k', SIMILAR_LIMIT)), SIMILAR_MAX))
+    except ValueError:
+        return jsonify({"error": "Parámetro k inválido"}), 400
+    
+    similar = get_similar_cars(car_id, k)
+    if similar is None:
+        return jsonify({"error": f"Auto no encontrado o índice no disponible: {car_id}"}), 404
+    return jsonify(similar)
+
+# Paso del asistente -> clave de la sesión con su selección
+WIZARD_SESSION_KEYS = {
+    'brands': 'selected_brands',
+    'budget': 'selected_budget',
+    'fuel': 'selected_fuel',
+    'types': 'selected_types',
+    'transmission': 'selected_transmission'
+}
+
+@app.route("/api/facets", methods=["GET"])
+def api_facets():
+    """
+    Autos que quedarían con cada opción de un paso del asistente (?step=fuel)
+    
+    Usa las selecciones de los pasos anteriores guardadas en la sesión; sin
+    ?step se cuenta el primer paso aún sin selección.
+    """
+    steps = [name for name, _ in WIZARD_STEPS]
+    step = request.args.get('step')
+    if step is None:
+        step = next((name for name in steps if not session.get(WIZARD_SESSION_KEYS[name])), steps[-1])
+    if step not in steps:
+        return jsonify({"error": f"Paso desconocido: {step}"}), 400
+    
+    selections = {name: session.get(key) for name, key in WIZARD_SESSION_KEYS.items()}
+    facets = get_facet_counts(step, selections)
+    if facets is None:
+        return jsonify({"step": step, "counts": {}, "source": "unavailable"}), 503
+    return jsonify(facets)
+
+@app.route("/api/ready", methods=["GET"])
+def readiness():
+    """Sonda de preparación: 503 mientras el recomendador se precalienta"""
+    status = get_readiness()
+    return jsonify(status), 200 if status["ready"] else 503
+
 # Endpoint adicional para debug
 @app.route("/api/debug/session", methods=["GET"])
 def debug_session():
@@ -369,14 +552,14 @@ def debug_session():
             session.get('selected_transmission')
         ])
     }
-    print(f"🔍 Debug session solicitado: {debug_info}")
+    logger.debug("Debug de sesión solicitado", extra={'session_keys': debug_info['session_keys']})
     return jsonify(debug_info)
 
 # Endpoint para limpiar la sesión (útil para testing)
 @app.route("/api/debug/clear-session", methods=["POST"])
 def clear_session():
     session.clear()
-    print("🧹 Sesión limpiada")
+    logger.info("Sesión limpiada")
     return jsonify({"success": True, "message": "Sesión limpiada"})
 
 # Endpoint para verificar estado del sistema
@@ -395,6 +578,8 @@ def system_status():
             status["recommender_test"] = f"✅ Funcionando ({len(test_result)} resultados)"
         except Exception as e:
             status["recommender_test"] = f"❌ Error: {str(e)}"
+        status["cache"] = get_cache_stats()
+        status["circuit"] = get_breaker_stats()
     
     return jsonify(status)
 
@@ -402,7 +587,7 @@ def system_status():
 def logout():
     username = session.get('username', 'Usuario')
     session.clear()
-    print(f"👋 Usuario {username} cerró sesión")
+    logger.info("Usuario cerró sesión", extra={'username': username})
     return redirect(url_for('login'))
 
 # Manejador de errores
@@ -430,5 +615,6 @@ if __name__ == "__main__":
     print("  📊 GET  /api/recommendations -> obtener recomendaciones JSON")
     print("  🔍 GET  /api/debug/session -> ver datos de sesión")
     print("  📈 GET  /api/debug/system-status -> estado del sistema")
+    print("  🟢 GET  /api/ready -> preparación (503 durante el arranque)")
     print("=" * 60)
     app.run(debug=True, port=5000)
\ No newline at end of file
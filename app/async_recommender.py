@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Versión asíncrona del sistema de recomendaciones
+Mismos métodos públicos que CarRecommender sobre AsyncGraphDatabase: las idas y
+vueltas a Neo4j no bloquean un hilo, así que un solo proceso puede atender
+cientos de peticiones en curso. Normalización, construcción de consultas y
+puntuación se heredan de RecommenderBase.
+"""
+
+import asyncio
+import logging
+import time
+from typing import List, Dict, Any, Optional
+
+from catalog_statistics import STATISTICS_TTL_SECONDS, build_statistics, statistics_query
+from db import create_async_driver, async_read_query
+from precomputed import PrecomputedRecommendations, DEFAULT_PATH as PRECOMPUTED_PATH
+from recommender import (RecommenderBase, RecommendationCache, RECOMMENDATION_LIMIT,
+                         SERVER_SIDE_SCORING)
+from vocabulary import VOCABULARY, VOCABULARY_QUERY
+
+logger = logging.getLogger(__name__)
+
+
+def _log_statistics_error(task: asyncio.Task):
+    """Registrar el error de un recálculo de estadísticas en segundo plano"""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Error recalculando estadísticas: {task.exception()}")
+
+
+class AsyncCarRecommender(RecommenderBase):
+    """Recomendador sobre el driver asíncrono de Neo4j"""
+
+    def __init__(self, uri: Optional[str] = None, user: Optional[str] = None,
+                 password: Optional[str] = None, catalog_engine=None):
+        """
+        Crear el driver sin conectar; usar AsyncCarRecommender.create para verificar la conexión
+
+        Args:
+            uri, user, password: Omitidos se toman de las variables NEO4J_* (ver db.py)
+            catalog_engine: CatalogEngine ya cargado para compartir con el recomendador síncrono
+        """
+        self.catalog_engine = catalog_engine
+        self.precomputed = None
+        self.cache = RecommendationCache()
+        self.driver = create_async_driver(uri, user, password)
+        self._statistics = None
+        self._statistics_at = 0.0
+        self._statistics_task = None
+
+    @classmethod
+    async def create(cls, uri: Optional[str] = None, user: Optional[str] = None,
+                     password: Optional[str] = None, catalog_engine=None) -> 'AsyncCarRecommender':
+        """Crear el recomendador, verificar la conexión y cargar el vocabulario y los resultados precalculados"""
+        recommender = cls(uri, user, password, catalog_engine)
+        try:
+            await recommender.driver.verify_connectivity()
+            logger.info("Conexión asíncrona exitosa a Neo4j")
+        except Exception as e:
+            logger.error(f"Error conectando a Neo4j: {e}")
+            await recommender.close()
+            raise
+        try:
+            VOCABULARY.install(await async_read_query(recommender.driver, VOCABULARY_QUERY))
+        except Exception as e:
+            logger.error(f"No se pudo cargar el vocabulario: {e}")
+        recommender.precomputed = PrecomputedRecommendations.load(PRECOMPUTED_PATH)
+        return recommender
+
+    async def close(self):
+        """Cerrar conexión"""
+        await self.driver.close()
+
+    async def execute_recommendation_query(self, query: str, parameters: Dict) -> List[Dict]:
+        """Ejecutar consulta de recomendaciones"""
+        try:
+            records = await async_read_query(self.driver, query, parameters)
+            return [self.car_from_query_record(record) for record in records]
+        except Exception as e:
+            logger.error(f"Error ejecutando consulta de recomendaciones: {e}")
+            logger.error(f"Query: {query}")
+            logger.error(f"Parameters: {parameters}")
+            return []
+
+    async def query_recommendations(self, preferences: Dict, k: int = RECOMMENDATION_LIMIT,
+                                    weights: Optional[Dict] = None) -> List[Dict]:
+        """Recomendaciones que cumplen todas las preferencias (lista vacía si la consulta falla)"""
+        if SERVER_SIDE_SCORING:
+            query, parameters = self.build_scored_recommendation_query(preferences, k, weights)
+            return await self.execute_recommendation_query(query, parameters)
+        query, parameters = self.build_recommendation_query(preferences)
+        recommendations = await self.execute_recommendation_query(query, parameters)
+        return self.rank_recommendations(recommendations, preferences, k, weights)
+
+    async def query_relaxed_recommendations(self, preferences: Dict, k: int = RECOMMENDATION_LIMIT,
+                                            weights: Optional[Dict] = None) -> List[Dict]:
+        """Relajación progresiva en una sola consulta (lista vacía si la consulta falla)"""
+        query, parameters = self.build_relaxed_recommendation_query(preferences, k, weights)
+        try:
+            return self.cars_from_relaxed_records(await async_read_query(self.driver, query, parameters),
+                                                  preferences)
+        except Exception as e:
+            logger.error(f"Error ejecutando consulta de relajación: {e}")
+            return []
+
+    async def get_recommendations(self, brands=None, budget=None, fuel=None, types=None, transmission=None,
+                                  k: int = RECOMMENDATION_LIMIT, weights: Optional[Dict] = None) -> List[Dict]:
+        """
+        Obtener recomendaciones de autos basadas en preferencias del usuario
+
+        Mismo flujo que CarRecommender.get_recommendations: caché, precalculados,
+        catálogo en memoria y por último Neo4j, con las consultas estricta y
+        relajada en paralelo (asyncio.gather).
+        """
+        try:
+            preferences = self.normalize_preferences(brands, budget, fuel, types, transmission)
+            cache_key = RecommendationCache.make_key(preferences, k, weights)
+
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            if self.precomputed is not None:
+                precomputed = self.precomputed.lookup(cache_key)
+                if precomputed:
+                    return precomputed
+
+            if self.catalog_engine is not None and self.catalog_engine.is_loaded:
+                recommendations = (self.catalog_engine.rank(preferences, k, weights)
+                                   or self.catalog_engine.relax(preferences, k, weights))
+            else:
+                # Las consultas estricta y relajada son independientes: se lanzan a la vez
+                # y la relajada solo se usa si la estricta no encuentra nada, así que una
+                # búsqueda sin coincidencias exactas cuesta una ida y vuelta y no dos
+                recommendations, relaxed = await asyncio.gather(
+                    self.query_recommendations(preferences, k, weights),
+                    self.query_relaxed_recommendations(preferences, k, weights)
+                )
+                recommendations = recommendations or relaxed
+
+            # Las listas vacías pueden deberse a un error de consulta: no se guardan
+            if recommendations:
+                self.cache.put(cache_key, recommendations)
+            return recommendations
+
+        except Exception as e:
+            logger.error(f"Error general en get_recommendations: {e}")
+            return []
+
+    async def _refresh_statistics(self) -> Dict[str, Any]:
+        """Recalcular las estadísticas (una sola consulta, ver catalog_statistics.py)"""
+        price_summary = None
+        if self.catalog_engine is not None and self.catalog_engine.is_loaded:
+            price_summary = self.catalog_engine.price_summary()
+        records = await async_read_query(self.driver, statistics_query(price_summary))
+        self._statistics = build_statistics(records[0], price_summary)
+        self._statistics_at = time.monotonic()
+        return self._statistics
+
+    async def get_statistics(self) -> Dict[str, Any]:
+        """Obtener estadísticas de la base de datos; vencido el TTL se recalculan en segundo plano"""
+        try:
+            if self._statistics is None:
+                return await self._refresh_statistics()
+            stale = time.monotonic() - self._statistics_at >= STATISTICS_TTL_SECONDS
+            if stale and (self._statistics_task is None or self._statistics_task.done()):
+                self._statistics_task = asyncio.create_task(self._refresh_statistics())
+                self._statistics_task.add_done_callback(_log_statistics_error)
+            return self._statistics
+        except Exception as e:
+            logger.error(f"Error obteniendo estadísticas: {e}")
+            return {}
@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+Motor de catálogo en memoria para el sistema de recomendaciones
+Carga todos los nodos Auto con sus relaciones en columnas NumPy y resuelve
+los filtros de preferencias con máscaras vectorizadas, sin ir a Neo4j
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+from db import read_query
+from relaxation import RELAXATION_ORDER, widened_budget, annotate
+from server_timing import ServerTiming
+from vocabulary import VOCABULARY
+
+if NUMPY_AVAILABLE:
+    from facet_index import FacetBitmapIndex
+    from price_index import PriceIndex
+    from scoring import score_vectors, top_k
+    from pagination import SORT_ORDERS
+
+logger = logging.getLogger(__name__)
+
+# Consulta de carga: una fila por combinación auto/marca/tipo/combustible/transmisión,
+# igual que las filas que produce la consulta de recomendaciones
+CATALOG_COLUMNS = """
+    OPTIONAL MATCH (a)-[:ES_MARCA]->(m:Marca)
+    OPTIONAL MATCH (a)-[:ES_TIPO]->(t:Tipo)
+    OPTIONAL MATCH (a)-[:USA_COMBUSTIBLE]->(c:Combustible)
+    OPTIONAL MATCH (a)-[:TIENE_TRANSMISION]->(tr:Transmision)
+    RETURN a.id as id, a.modelo as modelo, a.año as año, a.precio as precio,
+           a.caracteristicas as caracteristicas,
+           m.nombre as marca, t.categoria as tipo,
+           c.tipo as combustible, tr.tipo as transmision
+"""
+CATALOG_QUERY = "\n    MATCH (a:Auto)" + CATALOG_COLUMNS
+
+# Filas de un solo auto con las mismas columnas (actualizaciones incrementales)
+CATALOG_CAR_QUERY = "\n    MATCH (a:Auto {id: $id})" + CATALOG_COLUMNS
+
+# Facetas de preferencias -> columna del registro de Neo4j
+FACETS = [
+    ('brands', 'marca'),
+    ('types', 'tipo'),
+    ('fuel', 'combustible'),
+    ('transmission', 'transmision'),
+]
+
+
+def car_from_record(record) -> Dict[str, Any]:
+    """Convertir un registro de Neo4j (o dict equivalente) al formato de auto de la API"""
+    return {
+        'id': record['id'],
+        'name': f"{record['marca']} {record['modelo']} {record['año']}" if record['marca'] else f"{record['modelo']} {record['año']}",
+        'model': record['modelo'],
+        'brand': record['marca'] or 'Marca no especificada',
+        'year': record['año'],
+        'price': float(record['precio']) if record['precio'] else 0,
+        'type': record['tipo'] or 'Tipo no especificado',
+        'fuel': record['combustible'] or 'Combustible no especificado',
+        'transmission': record['transmision'] or 'Transmisión no especificada',
+        'features': record['caracteristicas'] or [],
+        'image': None  # Placeholder para imágenes futuras
+    }
+
+
+def facet_values(preferences: Dict, facet: str) -> Optional[List[str]]:
+    """Obtener los valores de una faceta como lista (None si no hay filtro)"""
+    values = preferences.get(facet)
+    if not values:
+        return None
+    if isinstance(values, str):
+        return [values]
+    return list(values)
+
+
+def facet_selections(preferences: Dict) -> Dict[str, List[str]]:
+    """Facetas con filtro activo -> valores seleccionados"""
+    selections = {}
+    for facet, _ in FACETS:
+        values = facet_values(preferences, facet)
+        if values:
+            selections[facet] = values
+    return selections
+
+
+class CatalogSnapshot:
+    """Instantánea inmutable del catálogo en formato columnar"""
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        """
+        Construir columnas a partir de los registros de la consulta de carga
+
+        Args:
+            records: Lista de dicts con las claves de CATALOG_QUERY
+        """
+        self.records = records
+        self.size = len(records)
+        self.loaded_at = time.time()
+
+        # Huella del contenido: permite detectar resultados precalculados obsoletos
+        payload = json.dumps(records, sort_keys=True, ensure_ascii=False, default=str)
+        self.fingerprint = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+        # Filas ya hidratadas en el formato de la API
+        self.cars = [car_from_record(record) for record in records]
+
+        # Precio crudo; NaN para autos sin precio (Neo4j los excluye del filtro)
+        self.price = np.array(
+            [float(r['precio']) if r['precio'] is not None else np.nan for r in records],
+            dtype=np.float64
+        )
+
+        # Columnas de orden para la paginación por cursor (a.id desempata)
+        self.ids = np.array([str(r['id']) for r in records], dtype=str)
+        self.year = np.array(
+            [float(r['año']) if r['año'] is not None else np.nan for r in records],
+            dtype=np.float64
+        )
+
+        # Auto de cada fila: un auto con varias relaciones por faceta ocupa varias filas
+        car_index: Dict[Any, int] = {}
+        self.car_codes = np.array(
+            [car_index.setdefault(r['id'], len(car_index)) for r in records], dtype=np.int64
+        )
+        self.car_count = len(car_index)
+
+        # Número de características (regla de puntuación por características)
+        self.feature_count = np.array(
+            [len(r['caracteristicas'] or ()) for r in records], dtype=np.float64
+        )
+
+        # Facetas codificadas con los ids del vocabulario (-1 = sin relación); los
+        # valores que aún no están en el registro se agregan al final
+        self.vocabulary = VOCABULARY.current.extended(
+            {facet: [record[column] for record in records] for facet, column in FACETS}
+        )
+        self.facet_vocab: Dict[str, Dict[str, int]] = {}
+        self.facet_codes: Dict[str, Any] = {}
+        for facet, column in FACETS:
+            vocab = self.vocabulary.ids[facet]
+            codes = np.full(self.size, -1, dtype=np.int32)
+            for ordinal, record in enumerate(records):
+                value = record[column]
+                if value is not None:
+                    codes[ordinal] = vocab[value]
+            self.facet_vocab[facet] = vocab
+            self.facet_codes[facet] = codes
+
+        # Bitsets invertidos por valor de faceta
+        self.facets = FacetBitmapIndex(self.size, self.facet_codes, self.facet_vocab)
+
+        # Ordinales ordenados por precio para el filtro de presupuesto
+        self.prices = PriceIndex(self.price)
+
+    def hydrate(self, ordinal: int) -> Dict[str, Any]:
+        """Copia del auto en la posición indicada (los llamadores pueden mutarla)"""
+        car = dict(self.cars[ordinal])
+        car['features'] = list(car['features'])
+        return car
+
+
+class CatalogEngine:
+    """Motor de consultas en memoria con intercambio atómico de instantáneas"""
+
+    def __init__(self, driver=None):
+        """
+        Args:
+            driver: Driver de Neo4j; puede omitirse si el catálogo se instala con load_records
+        """
+        if not NUMPY_AVAILABLE:
+            raise ImportError("NumPy no está instalado; el motor de catálogo no está disponible")
+        self.driver = driver
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        return self._snapshot
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def load(self) -> CatalogSnapshot:
+        """Cargar el catálogo completo desde Neo4j e instalar la nueva instantánea"""
+        with self._load_lock:
+            started = time.perf_counter()
+            records = [record.data() for record in read_query(self.driver, CATALOG_QUERY)]
+            snapshot = self.load_records(records)
+            logger.info(f"Catálogo cargado en memoria: {snapshot.size} filas "
+                        f"en {(time.perf_counter() - started) * 1000:.1f} ms")
+            return snapshot
+
+    def load_records(self, records: List[Dict[str, Any]]) -> CatalogSnapshot:
+        """Construir e instalar una instantánea a partir de registros ya leídos"""
+        snapshot = CatalogSnapshot(records)
+        # La asignación de la referencia es atómica: los lectores ven la
+        # instantánea anterior o la nueva, nunca una a medio construir
+        self._snapshot = snapshot
+        return snapshot
+
+    def refresh(self) -> Optional[CatalogSnapshot]:
+        """Recargar el catálogo; si falla se conserva la instantánea anterior"""
+        try:
+            return self.load()
+        except Exception as e:
+            logger.error(f"Error recargando catálogo en memoria: {e}")
+            return self._snapshot
+
+    def query(self, preferences: Dict, limit: Optional[int] = 20) -> List[Dict[str, Any]]:
+        """
+        Resolver los filtros de preferencias sobre la instantánea actual
+
+        Devuelve las mismas filas que execute_recommendation_query:
+        filtradas por presupuesto y facetas, ordenadas por precio ascendente.
+        limit=None devuelve todos los candidatos.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            raise RuntimeError("El catálogo en memoria no está cargado")
+
+        ordinals = self._candidates(snapshot, preferences)[:limit]
+        return [snapshot.hydrate(ordinal) for ordinal in ordinals]
+
+    def query_ordinals(self, preferences: Dict, limit: Optional[int] = 20) -> List[int]:
+        """Igual que query pero devuelve ordinales de la instantánea en lugar de filas"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            raise RuntimeError("El catálogo en memoria no está cargado")
+        return self._candidates(snapshot, preferences)[:limit].tolist()
+
+    def rank(self, preferences: Dict, k: int, weights: Optional[Dict] = None,
+             timing: Optional[ServerTiming] = None) -> List[Dict[str, Any]]:
+        """
+        Los k candidatos con mayor puntuación, hidratados y con similarity_score
+
+        timing acumula 'query' (filtros) y 'scoring' (puntuación, top k e hidratación).
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            raise RuntimeError("El catálogo en memoria no está cargado")
+        timing = timing or ServerTiming()
+        ordinals, scores = self._rank(snapshot, preferences, k, weights, timing)
+        with timing.phase('scoring'):
+            ranked = []
+            for ordinal, score in zip(ordinals, scores):
+                car = snapshot.hydrate(ordinal)
+                car['similarity_score'] = score
+                ranked.append(car)
+        return ranked
+
+    def relax(self, preferences: Dict, k: int, weights: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        """
+        Los k mejores autos del nivel de relajación más bajo con candidatos
+
+        Se usa cuando rank no devuelve nada. Los autos llevan similarity_score
+        (con las preferencias originales) y relaxed_constraints.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            raise RuntimeError("El catálogo en memoria no está cargado")
+
+        levels = self._relaxation_levels(snapshot, preferences)
+        eligible = levels >= 0
+        if not eligible.any():
+            return []
+        level = int(levels[eligible].min())
+        candidates = np.flatnonzero(levels == level)
+        # Mismo orden de desempate que _candidates: precio ascendente
+        candidates = candidates[np.argsort(snapshot.price[candidates], kind='stable')]
+        scores = self._scores(snapshot, candidates, preferences, weights)
+
+        ranked = []
+        for position in top_k(scores, k):
+            car = snapshot.hydrate(int(candidates[position]))
+            car['similarity_score'] = float(scores[position])
+            ranked.append(car)
+        return annotate(ranked, level, preferences)
+
+    def rank_ordinals(self, preferences: Dict, k: int, weights: Optional[Dict] = None) -> tuple:
+        """Igual que rank pero devuelve (ordinales, puntuaciones) sin hidratar"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            raise RuntimeError("El catálogo en memoria no está cargado")
+        return self._rank(snapshot, preferences, k, weights)
+
+    def page(self, preferences: Dict, sort: str, limit: int, after: Optional[Dict] = None,
+             weights: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        """
+        Página ordenada por (clave de orden, id) que empieza después del cursor
+
+        Mismo contrato que PAGED_RECOMMENDATION_QUERIES: after = {'value', 'id'} de
+        la última fila de la página anterior; todas las filas llevan similarity_score.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            raise RuntimeError("El catálogo en memoria no está cargado")
+
+        candidates = self._candidates(snapshot, preferences)
+        scores = self._scores(snapshot, candidates, preferences, weights)
+        key, descending = SORT_ORDERS[sort]
+        if key == 'score':
+            keys = scores
+        else:
+            keys = (snapshot.price if key == 'a.precio' else snapshot.year)[candidates]
+        ids = snapshot.ids[candidates]
+
+        keep = ~np.isnan(keys)
+        if after is not None:
+            value = after['value']
+            beyond = keys < value if descending else keys > value
+            keep &= beyond | ((keys == value) & (ids > str(after['id'])))
+        positions = np.flatnonzero(keep)
+        order = np.lexsort((ids[positions], -keys[positions] if descending else keys[positions]))
+        positions = positions[order[:limit]]
+
+        rows = []
+        for position in positions:
+            car = snapshot.hydrate(int(candidates[position]))
+            car['similarity_score'] = float(scores[position])
+            rows.append(car)
+        return rows
+
+    def _scores(self, snapshot: CatalogSnapshot, candidates, preferences: Dict, weights: Optional[Dict]):
+        """Puntuación vectorizada de los candidatos con las columnas de la instantánea"""
+        matches = {}
+        for facet, _ in FACETS:
+            values = facet_values(preferences, facet)
+            if not values:
+                matches[facet] = False
+                continue
+            vocab = snapshot.facet_vocab[facet]
+            codes = [vocab[value] for value in values if value in vocab]
+            matches[facet] = np.isin(snapshot.facet_codes[facet][candidates], codes)
+
+        return score_vectors(
+            snapshot.price[candidates], matches['brands'], matches['types'],
+            matches['fuel'], matches['transmission'],
+            snapshot.feature_count[candidates], preferences, weights
+        )
+
+    def _rank(self, snapshot: CatalogSnapshot, preferences: Dict, k: int, weights: Optional[Dict],
+              timing: Optional[ServerTiming] = None) -> tuple:
+        """Puntuar todos los candidatos con las columnas de la instantánea y elegir el top k"""
+        timing = timing or ServerTiming()
+        with timing.phase('query'):
+            candidates = self._candidates(snapshot, preferences)
+        with timing.phase('scoring'):
+            scores = self._scores(snapshot, candidates, preferences, weights)
+            positions = top_k(scores, k)
+        return candidates[positions].tolist(), scores[positions].tolist()
+
+    def _relaxation_levels(self, snapshot: CatalogSnapshot, preferences: Dict):
+        """
+        Nivel mínimo de relajación de cada fila en una pasada (-1 = fuera de alcance)
+
+        El nivel es la posición en RELAXATION_ORDER de la última restricción
+        incumplida; las filas sin precio o fuera del presupuesto ampliado quedan en -1.
+        """
+        price = snapshot.price
+        levels = np.zeros(snapshot.size, dtype=np.int8)
+        for level, constraint in enumerate(RELAXATION_ORDER, start=1):
+            if constraint == 'budget':
+                satisfied = (price >= preferences['min_price']) & (price <= preferences['max_price'])
+            else:
+                values = facet_values(preferences, constraint)
+                if not values:
+                    continue
+                satisfied = snapshot.facets.to_mask(snapshot.facets.facet_bits(constraint, values))
+            # Niveles crecientes: la última restricción incumplida prevalece
+            levels[~satisfied] = level
+        min_price, max_price = widened_budget(preferences)
+        levels[~((price >= min_price) & (price <= max_price))] = -1
+        return levels
+
+    def _candidates(self, snapshot: CatalogSnapshot, preferences: Dict):
+        """Ordinales que cumplen presupuesto y facetas, ya ordenados por precio"""
+        # Primer corte: el presupuesto siempre está presente
+        candidates = snapshot.prices.range(preferences['min_price'], preferences['max_price'])
+        bits = snapshot.facets.resolve(facet_selections(preferences))
+        if bits is not None:
+            candidates = candidates[snapshot.facets.to_mask(bits)[candidates]]
+        return candidates
+
+    def count_cars(self, preferences: Dict) -> int:
+        """Autos distintos que cumplen presupuesto y facetas"""
+        snapshot = self._loaded_snapshot()
+        return int(np.unique(snapshot.car_codes[self._candidates(snapshot, preferences)]).size)
+
+    def facet_counts(self, preferences: Dict, facet: str) -> Dict[str, int]:
+        """
+        Autos distintos por cada valor de una faceta entre los que cumplen el resto de preferencias
+
+        El filtro propio de la faceta se ignora: cada valor cuenta los autos que
+        quedarían al elegirlo. Un único np.unique sobre pares (valor, auto).
+        """
+        snapshot = self._loaded_snapshot()
+        candidates = self._candidates(snapshot, {**preferences, facet: None})
+        codes = snapshot.facet_codes[facet][candidates]
+        present = codes >= 0
+        pairs = np.unique(codes[present].astype(np.int64) * snapshot.car_count + snapshot.car_codes[candidates][present])
+        vocab = snapshot.facet_vocab[facet]
+        # Los ids pueden tener huecos (valores retirados del vocabulario)
+        counts = np.bincount(pairs // max(snapshot.car_count, 1), minlength=snapshot.vocabulary.size(facet))
+        return {value: int(counts[code]) for value, code in vocab.items()}
+
+    def budget_counts(self, preferences: Dict, ranges: Dict[str, tuple]) -> Dict[str, int]:
+        """
+        Autos distintos por rango de presupuesto entre los que cumplen las facetas
+
+        Args:
+            ranges: Etiqueta -> (precio mínimo, precio máximo)
+        """
+        snapshot = self._loaded_snapshot()
+        ordinals = snapshot.prices.ordinals
+        bits = snapshot.facets.resolve(facet_selections(preferences))
+        if bits is not None:
+            ordinals = ordinals[snapshot.facets.to_mask(bits)[ordinals]]
+        prices = snapshot.price[ordinals]
+        counts = {}
+        for label, (min_price, max_price) in ranges.items():
+            start = int(np.searchsorted(prices, min_price, side='left'))
+            end = int(np.searchsorted(prices, max_price, side='right'))
+            counts[label] = int(np.unique(snapshot.car_codes[ordinals[start:end]]).size) if end > start else 0
+        return counts
+
+    def price_summary(self) -> Optional[Dict[str, Any]]:
+        """
+        Mínimo, máximo y promedio de precio sobre autos distintos con precio
+
+        Mismo criterio que las estadísticas de Neo4j (cada Auto cuenta una vez).
+        None si el catálogo no está cargado.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        _, first_rows = np.unique(snapshot.car_codes, return_index=True)
+        prices = snapshot.price[first_rows]
+        prices = prices[~np.isnan(prices)]
+        if not prices.size:
+            return {'min': None, 'max': None, 'average': None}
+        return {'min': float(prices.min()), 'max': float(prices.max()), 'average': float(prices.mean())}
+
+    def _loaded_snapshot(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            raise RuntimeError("El catálogo en memoria no está cargado")
+        return snapshot
+
+    def selectivity(self, preferences: Dict) -> Dict[str, Any]:
+        """Cardinalidad de cada faceta, del presupuesto y de su intersección, sin hidratar filas"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            raise RuntimeError("El catálogo en memoria no está cargado")
+        selectivity = snapshot.facets.selectivity(facet_selections(preferences))
+        start, end = snapshot.prices.bounds(preferences['min_price'], preferences['max_price'])
+        selectivity['budget'] = end - start
+        selectivity['matches'] = len(self._candidates(snapshot, preferences))
+        return selectivity
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Servicio de estadísticas del catálogo y de la base de datos
+Todos los agregados salen de una sola consulta con subconsultas CALL que
+Neo4j resuelve desde el almacén de conteos (totales de nodos, relaciones y
+autos), por grado de cada nodo (autos por marca y por tipo) o desde el índice
+de precio (mínimo y máximo), sin recorrer el grafo. El precio promedio sale
+del catálogo en memoria cuando está cargado; sin él, la consulta lo agrega
+recorriendo los autos. El resultado se guarda con un TTL; al vencer se sigue sirviendo el
+anterior mientras un hilo lo recalcula, así que las páginas de estado nunca
+esperan a Neo4j salvo la primera vez.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Any, Optional, Callable
+
+from db import read_query
+
+logger = logging.getLogger(__name__)
+
+# Vigencia del resultado (segundos) antes de recalcularlo en segundo plano
+STATISTICS_TTL_SECONDS = 60
+
+# Tiempo máximo de la consulta de estadísticas (segundos)
+STATISTICS_TIMEOUT = 10.0
+
+# Una fila con todos los agregados. count(n)/count(r)/count(a:Auto) sin filtros
+# se leen del almacén de conteos; COUNT { (m)<-[:ES_MARCA]-() } es el grado del
+# nodo (solo los Auto se enlazan con Marca y Tipo). Mínimo y máximo de precio son
+# el primer valor del índice auto_precio en cada sentido (ORDER BY ... LIMIT 1).
+STATISTICS_QUERY = """
+    CALL { MATCH (n) RETURN count(n) AS total_nodes }
+    CALL { MATCH ()-[r]->() RETURN count(r) AS total_relationships }
+    CALL { MATCH (a:Auto) RETURN count(a) AS total_cars }
+    CALL {
+        MATCH (a:Auto) WHERE a.precio IS NOT NULL
+        WITH a.precio AS precio ORDER BY precio ASC LIMIT 1
+        RETURN collect(precio)[0] AS precio_min
+    }
+    CALL {
+        MATCH (a:Auto) WHERE a.precio IS NOT NULL
+        WITH a.precio AS precio ORDER BY precio DESC LIMIT 1
+        RETURN collect(precio)[0] AS precio_max
+    }
+    CALL {
+        MATCH (m:Marca)
+        WITH m, COUNT { (m)<-[:ES_MARCA]-() } AS cantidad
+        WHERE cantidad > 0
+        RETURN collect({marca: m.nombre, cantidad: cantidad}) AS cars_by_brand
+    }
+    CALL {
+        MATCH (t:Tipo)
+        WITH t, COUNT { (t)<-[:ES_TIPO]-() } AS cantidad
+        WHERE cantidad > 0
+        RETURN collect({tipo: t.categoria, cantidad: cantidad}) AS cars_by_type
+    }
+    CALL { CALL db.labels() YIELD label RETURN collect(label) AS node_labels }
+    CALL { CALL db.relationshipTypes() YIELD relationshipType RETURN collect(relationshipType) AS relationship_types }
+    CALL { CALL dbms.components() YIELD versions RETURN head(collect(versions[0])) AS neo4j_version }
+    RETURN *
+"""
+
+# Variante sin catálogo en memoria: el promedio no sale de un índice y recorre los autos
+STATISTICS_WITH_AVERAGE_QUERY = STATISTICS_QUERY.replace("""
+    RETURN *
+""", """
+    CALL { MATCH (a:Auto) RETURN avg(a.precio) AS precio_promedio }
+    RETURN *
+""")
+
+
+def statistics_query(price_summary: Optional[Dict[str, Any]] = None) -> str:
+    """Consulta de estadísticas: sin el recorrido del promedio si price_summary ya lo trae"""
+    return STATISTICS_QUERY if price_summary is not None else STATISTICS_WITH_AVERAGE_QUERY
+
+
+def build_statistics(row: Dict[str, Any], price_summary: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Resultado del servicio a partir de la fila de statistics_query(price_summary)
+
+    Args:
+        price_summary: Resumen de precios del catálogo en memoria
+            (CatalogEngine.price_summary); aporta el promedio
+    """
+    average = price_summary['average'] if price_summary is not None else row['precio_promedio']
+    return {
+        'cars_by_brand': sorted(row['cars_by_brand'], key=lambda item: (-item['cantidad'], item['marca'])),
+        'cars_by_type': sorted(row['cars_by_type'], key=lambda item: (-item['cantidad'], item['tipo'])),
+        'price_range': {
+            'min': row['precio_min'],
+            'max': row['precio_max'],
+            'average': round(average, 2) if average is not None else None
+        },
+        'total_cars': row['total_cars'],
+        'total_nodes': row['total_nodes'],
+        'total_relationships': row['total_relationships'],
+        'node_labels': sorted(row['node_labels']),
+        'relationship_types': sorted(row['relationship_types']),
+        'neo4j_version': row['neo4j_version'] or 'Unknown',
+    }
+
+
+class StatisticsService:
+    """Estadísticas en caché con TTL y recálculo en segundo plano"""
+
+    def __init__(self, driver, ttl: float = STATISTICS_TTL_SECONDS,
+                 price_summary: Optional[Callable[[], Optional[Dict[str, Any]]]] = None):
+        """
+        Args:
+            price_summary: Función que devuelve el resumen de precios del catálogo
+                en memoria, o None si no está cargado (el promedio se consulta a Neo4j)
+        """
+        self.driver = driver
+        self.ttl = ttl
+        self.price_summary = price_summary
+        self._lock = threading.Lock()
+        self._statistics: Optional[Dict[str, Any]] = None
+        self._computed_at = 0.0
+        self._refreshing = False
+        self.refreshes = 0
+        self.last_duration = None
+        self.last_error = None
+
+    def get(self) -> Dict[str, Any]:
+        """
+        Estadísticas vigentes
+
+        Solo la primera llamada espera la consulta; después, si el resultado
+        venció, se devuelve el anterior y se recalcula en un hilo.
+
+        Raises:
+            Exception: Si la primera consulta falla (no hay resultado anterior)
+        """
+        with self._lock:
+            statistics = self._statistics
+            stale = time.monotonic() - self._computed_at >= self.ttl
+            start_refresh = statistics is not None and stale and not self._refreshing
+            if start_refresh:
+                self._refreshing = True
+        if statistics is None:
+            return self.refresh()
+        if start_refresh:
+            threading.Thread(target=self._refresh_in_background, name="statistics-refresh", daemon=True).start()
+        return statistics
+
+    def refresh(self) -> Dict[str, Any]:
+        """Recalcular ahora (una sola ida y vuelta a Neo4j)"""
+        started = time.perf_counter()
+        try:
+            price_summary = self.price_summary() if self.price_summary is not None else None
+            records = read_query(self.driver, statistics_query(price_summary), timeout=STATISTICS_TIMEOUT)
+            statistics = build_statistics(records[0], price_summary)
+        except Exception as e:
+            self.last_error = str(e)
+            raise
+        finally:
+            self.last_duration = time.perf_counter() - started
+        with self._lock:
+            self._statistics = statistics
+            self._computed_at = time.monotonic()
+            self.refreshes += 1
+            self.last_error = None
+        logger.info(f"Estadísticas recalculadas en {self.last_duration * 1000:.0f} ms")
+        return statistics
+
+    def invalidate(self):
+        """Marcar el resultado como vencido (se recalcula en la próxima lectura)"""
+        with self._lock:
+            self._computed_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado de la caché de estadísticas"""
+        with self._lock:
+            age = time.monotonic() - self._computed_at if self._statistics is not None else None
+            return {
+                'cached': self._statistics is not None,
+                'age': age,
+                'ttl': self.ttl,
+                'refreshing': self._refreshing,
+                'refreshes': self.refreshes,
+                'last_duration': self.last_duration,
+                'last_error': self.last_error
+            }
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Error recalculando estadísticas: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
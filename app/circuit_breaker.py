@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Cortocircuito (circuit breaker) para dependencias remotas
+Tras varios fallos seguidos el circuito se abre y las llamadas se rechazan
+sin intentar la conexión; pasado un tiempo de espera se deja pasar una sola
+prueba (semiabierto). Si la prueba falla, la espera se duplica hasta un máximo.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Circuito cerrado -> abierto -> semiabierto con espera exponencial entre pruebas"""
+
+    def __init__(self, name: str, failure_threshold: int = 3, base_backoff: float = 1.0,
+                 max_backoff: float = 60.0):
+        """
+        Args:
+            name: Nombre de la dependencia (para logs y métricas)
+            failure_threshold: Fallos consecutivos que abren el circuito
+            base_backoff: Espera (segundos) antes de la primera prueba
+            max_backoff: Espera máxima entre pruebas
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.backoff = base_backoff
+        self.retry_at = 0.0
+        self._probe_in_flight = False
+        self.changed_at = time.time()
+        # Métricas
+        self.successes = 0
+        self.failures = 0
+        self.neutral = 0
+        self.rejected = 0
+        self.transitions = {CLOSED: 0, OPEN: 0, HALF_OPEN: 0}
+
+    def allow(self) -> bool:
+        """
+        ¿Se puede llamar a la dependencia?
+
+        Con el circuito abierto devuelve False sin esperar; al vencer la espera
+        pasa a semiabierto y autoriza una única llamada de prueba, cuyo resultado
+        se informa con record_success/record_failure/record_neutral.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() >= self.retry_at:
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+            self.backoff = self.base_backoff
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN:
+                # La prueba falló: volver a abrir con el doble de espera
+                self._probe_in_flight = False
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+                self._open()
+            elif self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    def record_neutral(self):
+        """
+        La llamada terminó sin decir nada de la disponibilidad (ej. error de la consulta)
+
+        No cambia el estado ni los fallos consecutivos; en semiabierto libera la
+        prueba para que la siguiente llamada vuelva a probar.
+        """
+        with self._lock:
+            self.neutral += 1
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado y contadores del circuito"""
+        with self._lock:
+            retry_in = max(0.0, self.retry_at - time.monotonic()) if self.state == OPEN else None
+            return {
+                'name': self.name,
+                'state': self.state,
+                'changed_at': self.changed_at,
+                'consecutive_failures': self.consecutive_failures,
+                'backoff': self.backoff,
+                'retry_in': retry_in,
+                'successes': self.successes,
+                'failures': self.failures,
+                'neutral': self.neutral,
+                'rejected': self.rejected,
+                'transitions': dict(self.transitions)
+            }
+
+    def _open(self):
+        self.retry_at = time.monotonic() + self.backoff
+        self._transition(OPEN)
+
+    def _transition(self, state: str):
+        previous, self.state = self.state, state
+        self.changed_at = time.time()
+        self.transitions[state] += 1
+        log = logger.info if state == CLOSED else logger.warning
+        log(f"Circuito {self.name}: {previous} -> {state}"
+            + (f" (nueva prueba en {self.backoff:.1f} s)" if state == OPEN else ""))
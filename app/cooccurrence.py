@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Matriz dispersa de co-ocurrencia ítem-ítem a partir de favoritos
+Para cada par de autos guarda cuántos usuarios tienen ambos en favoritos. Se
+construye una vez recorriendo las relaciones FAVORITO y después se actualiza
+en cada alta o baja de un favorito (coste proporcional a los favoritos de ese
+usuario), así "quienes guardaron X también guardaron Y" se responde en memoria.
+"""
+
+import math
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class CoOccurrenceMatrix:
+    """Conteos de pares de favoritos por usuario, con altas y bajas incrementales"""
+
+    def __init__(self, favorites: Optional[Iterable[Tuple[str, str]]] = None):
+        """
+        Args:
+            favorites: Pares (usuario, car_id) existentes; se consumen en streaming
+        """
+        self._lock = threading.Lock()
+        self.user_favorites: Dict[str, Set[str]] = defaultdict(set)
+        # pairs[x][y] = usuarios con x e y en favoritos (simétrica, sin diagonal)
+        self.pairs: Dict[str, Dict[str, int]] = defaultdict(dict)
+        # Usuarios que guardaron cada auto
+        self.counts: Dict[str, int] = defaultdict(int)
+        for user, car_id in favorites or []:
+            self._add(user, car_id)
+
+    def __len__(self) -> int:
+        """Número de relaciones de favorito"""
+        return sum(self.counts.values())
+
+    def add(self, user: str, car_id: str) -> bool:
+        """Registrar un favorito; False si ya existía"""
+        with self._lock:
+            return self._add(user, car_id)
+
+    def remove(self, user: str, car_id: str) -> bool:
+        """Quitar un favorito; False si no existía"""
+        with self._lock:
+            return self._remove(user, car_id)
+
+    def remove_user(self, user: str):
+        """Quitar todos los favoritos de un usuario"""
+        with self._lock:
+            for car_id in list(self.user_favorites.get(user, ())):
+                self._remove(user, car_id)
+
+    def remove_car(self, car_id: str):
+        """Quitar un auto de los favoritos de todos los usuarios"""
+        with self._lock:
+            for user in [u for u, cars in self.user_favorites.items() if car_id in cars]:
+                self._remove(user, car_id)
+
+    def favorites(self, user: str) -> Set[str]:
+        with self._lock:
+            return set(self.user_favorites.get(user, ()))
+
+    def related(self, car_ids: Iterable[str], k: int = 10,
+                exclude: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Autos guardados junto a car_ids
+
+        La puntuación es el coseno medio entre cada semilla y el candidato,
+        cnt(x, y) / sqrt(cnt(x) · cnt(y)), de modo que queda en [0, 1] y los
+        autos muy populares no dominan solo por serlo.
+
+        Returns:
+            Pares (car_id, puntuación) ordenados de mayor a menor
+        """
+        seeds = list(dict.fromkeys(car_ids))
+        excluded = set(seeds) | set(exclude or ())
+        scores: Dict[str, float] = defaultdict(float)
+        with self._lock:
+            for seed in seeds:
+                seed_count = self.counts.get(seed, 0)
+                if not seed_count:
+                    continue
+                for other, together in self.pairs.get(seed, {}).items():
+                    if other not in excluded:
+                        scores[other] += together / math.sqrt(seed_count * self.counts[other])
+        if not seeds:
+            return []
+        ranked = sorted(((car_id, score / len(seeds)) for car_id, score in scores.items()),
+                        key=lambda item: (-item[1], item[0]))
+        return ranked[:k]
+
+    def _add(self, user: str, car_id: str) -> bool:
+        saved = self.user_favorites[user]
+        if car_id in saved:
+            return False
+        row = self.pairs[car_id]
+        for other in saved:
+            row[other] = row.get(other, 0) + 1
+            other_row = self.pairs[other]
+            other_row[car_id] = other_row.get(car_id, 0) + 1
+        saved.add(car_id)
+        self.counts[car_id] += 1
+        return True
+
+    def _remove(self, user: str, car_id: str) -> bool:
+        saved = self.user_favorites.get(user)
+        if not saved or car_id not in saved:
+            return False
+        saved.discard(car_id)
+        row = self.pairs.get(car_id, {})
+        for other in saved:
+            self._decrement(row, other)
+            self._decrement(self.pairs.get(other, {}), car_id)
+            if not self.pairs.get(other):
+                self.pairs.pop(other, None)
+        if not row:
+            self.pairs.pop(car_id, None)
+        self.counts[car_id] -= 1
+        if self.counts[car_id] <= 0:
+            del self.counts[car_id]
+        if not saved:
+            del self.user_favorites[user]
+        return True
+
+    @staticmethod
+    def _decrement(row: Dict[str, int], key: str):
+        remaining = row.get(key, 0) - 1
+        if remaining > 0:
+            row[key] = remaining
+        else:
+            row.pop(key, None)
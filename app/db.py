@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Fábrica compartida del driver de Neo4j
+Credenciales y ajustes del pool de conexiones se leen de variables de entorno
+NEO4J_*, con los valores del proyecto por defecto. Las lecturas se enrutan a
+lectores (READ) y las escrituras van en transacciones administradas, que el
+driver reintenta ante errores transitorios.
+"""
+
+import logging
+import os
+import time
+from typing import List, Dict, Any, Optional, Callable
+
+from neo4j import GraphDatabase, AsyncGraphDatabase, RoutingControl, READ_ACCESS, WRITE_ACCESS, unit_of_work
+from neo4j.exceptions import ServiceUnavailable, SessionExpired
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_URI = "bolt://localhost:7687"
+DEFAULT_USER = "neo4j"
+DEFAULT_PASSWORD = "proyectoNEO4J"
+
+# Errores que indican que el servidor no está disponible (no errores de la consulta)
+UNAVAILABLE_ERRORS = (ServiceUnavailable, SessionExpired, ConnectionError)
+
+# Código de Neo4j para transacciones cortadas por su timeout en el servidor
+TRANSACTION_TIMEOUT_CODE = 'TransactionTimedOut'
+
+
+def is_timeout(error: Exception) -> bool:
+    """
+    ¿El error es un plazo vencido y no un error de la consulta?
+
+    Cubre el plazo propio de read_query (TimeoutError), el timeout de la
+    transacción en el servidor y la espera por una conexión del pool, que el
+    driver informa como ClientError (5.x) o ConnectionAcquisitionTimeoutError (6.x).
+    """
+    if isinstance(error, TimeoutError):
+        return True
+    if TRANSACTION_TIMEOUT_CODE in (getattr(error, 'code', None) or ''):
+        return True
+    return 'failed to obtain a connection from the pool' in str(error)
+
+
+def _env_number(name: str, default, cast=float):
+    value = os.environ.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        logger.warning(f"Valor inválido en {name}='{value}', se usa {default}")
+        return default
+
+
+def connection_settings() -> Dict[str, Any]:
+    """URI, credenciales y base de datos (NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, NEO4J_DATABASE)"""
+    return {
+        'uri': os.environ.get('NEO4J_URI', DEFAULT_URI),
+        'user': os.environ.get('NEO4J_USER', DEFAULT_USER),
+        'password': os.environ.get('NEO4J_PASSWORD', DEFAULT_PASSWORD),
+        'database': os.environ.get('NEO4J_DATABASE') or None,
+    }
+
+
+def pool_settings() -> Dict[str, Any]:
+    """
+    Ajustes del pool de conexiones (argumentos de GraphDatabase.driver)
+
+    Los valores por defecto priorizan fallar rápido en ráfagas: esperar 60 s
+    por una conexión (valor del driver) bloquea hilos de Flask sin avisar.
+    """
+    settings = {
+        # Conexiones simultáneas por servidor
+        'max_connection_pool_size': _env_number('NEO4J_MAX_POOL_SIZE', 100, int),
+        # Espera máxima para obtener una conexión del pool (segundos)
+        'connection_acquisition_timeout': _env_number('NEO4J_ACQUISITION_TIMEOUT', 10.0),
+        # Renovar conexiones antes de que un balanceador/firewall las corte
+        'max_connection_lifetime': _env_number('NEO4J_MAX_CONNECTION_LIFETIME', 1800.0),
+        # Tiempo máximo para abrir un socket nuevo
+        'connection_timeout': _env_number('NEO4J_CONNECTION_TIMEOUT', 15.0),
+        # Tiempo total de reintentos de las transacciones administradas
+        'max_transaction_retry_time': _env_number('NEO4J_MAX_RETRY_TIME', 15.0),
+    }
+    # Verificar con un RESET las conexiones inactivas más de N segundos antes de usarlas
+    liveness = _env_number('NEO4J_LIVENESS_CHECK_TIMEOUT', 30.0)
+    if liveness >= 0:
+        settings['liveness_check_timeout'] = liveness
+    return settings
+
+
+def database() -> Optional[str]:
+    """Base de datos configurada (None = la base por defecto del servidor)"""
+    return connection_settings()['database']
+
+
+def create_driver(uri: Optional[str] = None, user: Optional[str] = None,
+                  password: Optional[str] = None, **overrides):
+    """
+    Crear un driver síncrono con los ajustes del pool
+
+    Los argumentos omitidos se toman de connection_settings(); overrides
+    sustituye ajustes concretos de pool_settings().
+    """
+    connection = connection_settings()
+    settings = dict(pool_settings(), **overrides)
+    return GraphDatabase.driver(
+        uri or connection['uri'],
+        auth=(user or connection['user'], password or connection['password']),
+        **settings
+    )
+
+
+def create_async_driver(uri: Optional[str] = None, user: Optional[str] = None,
+                        password: Optional[str] = None, **overrides):
+    """Igual que create_driver, sobre AsyncGraphDatabase"""
+    connection = connection_settings()
+    settings = dict(pool_settings(), **overrides)
+    return AsyncGraphDatabase.driver(
+        uri or connection['uri'],
+        auth=(user or connection['user'], password or connection['password']),
+        **settings
+    )
+
+
+def read_query(driver, query: str, parameters: Optional[Dict[str, Any]] = None,
+               timeout: Optional[float] = None) -> List:
+    """
+    Consulta de lectura en transacción administrada enrutada a lectores; devuelve los registros
+
+    Args:
+        timeout: Segundos disponibles en total. Acota la espera por una conexión
+            del pool y el timeout de cada intento de la transacción en el servidor;
+            los reintentos se detienen con TimeoutError cuando se agota.
+    """
+    if timeout is None:
+        records, _, _ = driver.execute_query(query, parameters, routing_=RoutingControl.READ,
+                                             database_=database())
+        return records
+
+    started = time.monotonic()
+
+    # Dentro de una transacción administrada tx.run no acepta Query(timeout=...):
+    # el timeout va en la función de trabajo y el driver lo lee antes de reintentar
+    @unit_of_work(timeout=timeout)
+    def work(tx):
+        if time.monotonic() - started >= timeout:
+            raise TimeoutError(f"Plazo de {timeout:.3f} s agotado antes de ejecutar la consulta")
+        return list(tx.run(query, parameters))
+
+    with driver.session(database=database(), default_access_mode=READ_ACCESS,
+                        connection_acquisition_timeout=timeout) as session:
+        return session.execute_read(work)
+
+
+async def async_read_query(driver, query: str, parameters: Optional[Dict[str, Any]] = None) -> List:
+    """Versión asíncrona de read_query"""
+    records, _, _ = await driver.execute_query(query, parameters, routing_=RoutingControl.READ,
+                                               database_=database())
+    return records
+
+
+def read_session(driver):
+    """
+    Sesión en modo lectura para consultar sin transacción administrada
+
+    Para flujos que entregan registros a medida que llegan: una transacción
+    administrada puede reintentarse y repetiría registros ya entregados.
+    """
+    return driver.session(database=database(), default_access_mode=READ_ACCESS)
+
+
+def execute_read(driver, work: Callable, *args, **kwargs):
+    """Ejecutar work(tx, ...) en una transacción de lectura con reintentos"""
+    with driver.session(database=database(), default_access_mode=READ_ACCESS) as session:
+        return session.execute_read(work, *args, **kwargs)
+
+
+def execute_write(driver, work: Callable, *args, **kwargs):
+    """Ejecutar work(tx, ...) en una transacción de escritura con reintentos"""
+    with driver.session(database=database(), default_access_mode=WRITE_ACCESS) as session:
+        return session.execute_write(work, *args, **kwargs)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Plazos por petición
+Un Deadline se crea al recibir la petición HTTP y se pasa hacia abajo: cada
+capa consulta el tiempo restante para acotar sus esperas (conexión del pool,
+transacción en Neo4j) o para saltar a un camino más barato.
+"""
+
+import time
+from typing import Optional
+
+# Plazo por defecto de una petición de recomendaciones y máximo aceptado del cliente (ms)
+DEFAULT_DEADLINE_MS = 2000
+MAX_DEADLINE_MS = 10000
+
+
+class Deadline:
+    """Instante límite medido con el reloj monotónico; None = sin plazo"""
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+
+    @classmethod
+    def from_ms(cls, value, default_ms: int = DEFAULT_DEADLINE_MS, max_ms: int = MAX_DEADLINE_MS) -> 'Deadline':
+        """
+        Plazo a partir de un valor en milisegundos (p. ej. una cabecera)
+
+        Valores vacíos o inválidos usan default_ms; el resultado se recorta a [1, max_ms].
+        """
+        try:
+            milliseconds = int(value) if value not in (None, '') else default_ms
+        except (TypeError, ValueError):
+            milliseconds = default_ms
+        return cls(max(1, min(milliseconds, max_ms)) / 1000.0)
+
+    def remaining(self) -> Optional[float]:
+        """Segundos restantes (nunca negativos); None si no hay plazo"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def allows(self, seconds: float) -> bool:
+        """Queda al menos `seconds` antes del límite"""
+        remaining = self.remaining()
+        return remaining is None or remaining >= seconds
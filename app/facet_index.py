@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Índices invertidos por faceta para el catálogo en memoria
+Cada valor de faceta (marca, tipo, combustible, transmisión) guarda un bitset
+empaquetado con los ordinales de los autos que lo tienen. Una consulta se
+resuelve con OR dentro de cada faceta y AND entre facetas.
+"""
+
+from typing import List, Dict, Any
+
+import numpy as np
+
+# Cantidad de bits encendidos por cada byte posible
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+class FacetBitmapIndex:
+    """Bitsets por valor de faceta sobre los ordinales de una instantánea"""
+
+    def __init__(self, size: int, facet_codes: Dict[str, Any], facet_vocab: Dict[str, Dict[str, int]]):
+        """
+        Args:
+            size: Número de filas de la instantánea
+            facet_codes: Por faceta, arreglo de códigos enteros por ordinal (-1 = sin valor)
+            facet_vocab: Por faceta, valor -> código
+        """
+        self.size = size
+        self.empty = np.zeros((size + 7) // 8, dtype=np.uint8)
+        self.bitmaps: Dict[str, Dict[str, Any]] = {}
+        for facet, vocab in facet_vocab.items():
+            codes = facet_codes[facet]
+            self.bitmaps[facet] = {
+                value: np.packbits(codes == code) for value, code in vocab.items()
+            }
+
+    @staticmethod
+    def cardinality(bits) -> int:
+        """Número de autos en un bitset"""
+        return int(_POPCOUNT[bits].sum(dtype=np.int64))
+
+    def to_mask(self, bits):
+        """Convertir un bitset en máscara booleana por ordinal"""
+        return np.unpackbits(bits, count=self.size).view(bool)
+
+    def facet_bits(self, facet: str, values: List[str]):
+        """OR de los bitsets de los valores seleccionados de una faceta"""
+        bitmaps = self.bitmaps.get(facet, {})
+        bits = self.empty
+        for value in values:
+            value_bits = bitmaps.get(value)
+            if value_bits is not None:
+                bits = bits | value_bits
+        return bits
+
+    def resolve(self, selections: Dict[str, List[str]]):
+        """
+        AND entre facetas de los bitsets seleccionados
+
+        Args:
+            selections: Faceta -> valores seleccionados (solo facetas con filtro)
+
+        Returns:
+            Bitset resultante, o None si no hay ninguna faceta filtrada
+        """
+        bits = None
+        for facet, values in selections.items():
+            facet_bits = self.facet_bits(facet, values)
+            bits = facet_bits if bits is None else bits & facet_bits
+        return bits
+
+    def selectivity(self, selections: Dict[str, List[str]]) -> Dict[str, Any]:
+        """
+        Cardinalidades de cada faceta y de la intersección acumulada
+
+        Returns:
+            Dict con 'facets' (autos por faceta), 'intersections' (autos que
+            cumplen todas las facetas hasta esa) y 'matches' (total final)
+        """
+        facets = {}
+        intersections = {}
+        bits = None
+        for facet, values in selections.items():
+            facet_bits = self.facet_bits(facet, values)
+            bits = facet_bits if bits is None else bits & facet_bits
+            facets[facet] = self.cardinality(facet_bits)
+            intersections[facet] = self.cardinality(bits)
+        return {
+            'facets': facets,
+            'intersections': intersections,
+            'matches': self.size if bits is None else self.cardinality(bits)
+        }
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Configuración de logging de la aplicación
+Los registros se encolan con un QueueHandler y un hilo (QueueListener) los
+formatea y escribe: la petición solo paga el put en la cola. El nivel se
+elige con LOG_LEVEL (INFO por defecto; DEBUG muestra consultas y
+preferencias) y el formato con LOG_FORMAT ('text' o 'json'). Los campos
+pasados con extra={...} salen como clave=valor o como claves del JSON.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+DEFAULT_LEVEL = 'INFO'
+DEFAULT_FORMAT = 'text'
+
+# Atributos propios de LogRecord; el resto viene de extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener: Optional[QueueListener] = None
+
+
+def record_fields(record: logging.LogRecord) -> dict:
+    """Campos estructurados de un registro (los pasados con extra)"""
+    return {name: value for name, value in vars(record).items() if name not in _RECORD_ATTRIBUTES}
+
+
+class StructuredFormatter(logging.Formatter):
+    """Línea de texto con los campos extra como clave=valor, o un objeto JSON por línea"""
+
+    def __init__(self, json_output: bool = False):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        self.json_output = json_output
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = record_fields(record)
+        if self.json_output:
+            document = {
+                'ts': self.formatTime(record),
+                'level': record.levelname,
+                'logger': record.name,
+                'message': record.getMessage(),
+                **fields
+            }
+            if record.exc_info:
+                document['exception'] = self.formatException(record.exc_info)
+            return json.dumps(document, ensure_ascii=False, default=str)
+        line = super().format(record)
+        if fields:
+            line += " " + " ".join(f"{name}={value}" for name, value in fields.items())
+        return line
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler que no formatea en el hilo de la petición
+
+    El QueueHandler estándar formatea el mensaje y la excepción antes de
+    encolar; aquí el registro se encola tal cual (plantilla, args y exc_info)
+    y todo el texto lo arma el hilo del listener. Por eso los args y los campos
+    extra no deben modificarse después de registrarlos.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configure_logging(level: Optional[str] = None, log_format: Optional[str] = None) -> QueueListener:
+    """
+    Instalar el QueueHandler en el logger raíz y arrancar el listener (idempotente)
+
+    Args:
+        level: Nivel ('DEBUG', 'INFO', ...); omitido se toma de LOG_LEVEL
+        log_format: 'text' o 'json'; omitido se toma de LOG_FORMAT
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    level = (level or os.environ.get('LOG_LEVEL') or DEFAULT_LEVEL).upper()
+    log_format = (log_format or os.environ.get('LOG_FORMAT') or DEFAULT_FORMAT).lower()
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(StructuredFormatter(json_output=log_format == 'json'))
+    records = queue.SimpleQueue()
+    _listener = QueueListener(records, output, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.handlers[:] = [DeferredQueueHandler(records)]
+    root.setLevel(level)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Firmas MinHash y LSH por bandas sobre las características de los autos
+Cada Auto guarda en a.minhash una firma de NUM_PERM valores; la firma se parte
+en BANDS bandas y cada banda se enlaza a un nodo (:BandaLSH {clave}). Dos autos
+con Jaccard alta comparten alguna banda con alta probabilidad, así que los
+candidatos salen de unos pocos nodos banda en lugar de comparar todos los pares.
+"""
+
+import hashlib
+import logging
+import random
+from typing import List, Dict, Any, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 64 permutaciones en 16 bandas de 4 filas: umbral de colisión ~ (1/16)^(1/4) = 0.5
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+
+# Familia de hashes h(x) = (a·x + b) mod p, con p primo de Mersenne (cabe en un entero de Neo4j)
+_PRIME = (1 << 61) - 1
+_SEED = 20240611
+_rng = random.Random(_SEED)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+# Autos por lote al indexar el catálogo completo
+INDEX_BATCH_SIZE = 500
+
+SCHEMA_QUERY = "CREATE CONSTRAINT banda_lsh_clave IF NOT EXISTS FOR (b:BandaLSH) REQUIRE b.clave IS UNIQUE"
+
+# Guardar firma y bandas de un lote de autos, reemplazando las bandas anteriores
+WRITE_SIGNATURES_QUERY = """
+    UNWIND $cars AS car
+    MATCH (a:Auto {id: car.id})
+    SET a.minhash = car.minhash
+    WITH a, car
+    OPTIONAL MATCH (a)-[old:EN_BANDA]->(:BandaLSH)
+    DELETE old
+    WITH DISTINCT a, car
+    UNWIND car.bands AS clave
+    MERGE (b:BandaLSH {clave: clave})
+    MERGE (a)-[:EN_BANDA]->(b)
+"""
+
+# Candidatos que comparten al menos una banda con la firma consultada
+CANDIDATES_QUERY = """
+    UNWIND $bands AS clave
+    MATCH (:BandaLSH {clave: clave})<-[:EN_BANDA]-(a:Auto)
+    WITH DISTINCT a
+    WHERE $exclude_id IS NULL OR a.id <> $exclude_id
+    OPTIONAL MATCH (a)-[:ES_MARCA]->(m:Marca)
+    RETURN a.id as id, a.modelo as modelo, a.año as año, a.precio as precio,
+           m.nombre as marca, a.caracteristicas as caracteristicas, a.minhash as minhash
+"""
+
+
+def normalize_features(features: Optional[Iterable[str]]) -> set:
+    """Conjunto de características sin distinguir mayúsculas ni espacios sobrantes"""
+    return {feature.strip().lower() for feature in features or [] if feature and feature.strip()}
+
+
+def _base_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def signature(features: Optional[Iterable[str]]) -> List[int]:
+    """Firma MinHash de un conjunto de características (lista vacía si no hay características)"""
+    hashes = [_base_hash(feature) for feature in normalize_features(features)]
+    if not hashes:
+        return []
+    return [min((a * x + b) % _PRIME for x in hashes) for a, b in _PERMUTATIONS]
+
+
+def band_keys(minhash: List[int]) -> List[str]:
+    """Claves de las bandas de una firma ('banda:huella'); una firma vacía no tiene bandas"""
+    if not minhash:
+        return []
+    keys = []
+    for band in range(BANDS):
+        rows = minhash[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(",".join(map(str, rows)).encode('ascii'), digest_size=8).hexdigest()
+        keys.append(f"{band}:{digest}")
+    return keys
+
+
+def estimate_jaccard(first: List[int], second: List[int]) -> float:
+    """Fracción de posiciones iguales entre dos firmas (estimador de Jaccard)"""
+    if not first or not second:
+        return 0.0
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_PERM
+
+
+def jaccard(first: Optional[Iterable[str]], second: Optional[Iterable[str]]) -> float:
+    """Jaccard exacta entre dos listas de características"""
+    first, second = normalize_features(first), normalize_features(second)
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+def signature_row(car_id, features: Optional[Iterable[str]]) -> Dict[str, Any]:
+    """Parámetro de WRITE_SIGNATURES_QUERY para un auto"""
+    minhash = signature(features)
+    return {'id': car_id, 'minhash': minhash, 'bands': band_keys(minhash)}
+
+
+def write_signatures(tx, rows: List[Dict[str, Any]]):
+    """Función de transacción: guardar firmas y bandas (ver signature_row)"""
+    tx.run(WRITE_SIGNATURES_QUERY, cars=rows).consume()
+
+
+def index_all_car_features(driver, batch_size: int = INDEX_BATCH_SIZE) -> int:
+    """
+    Calcular y guardar la firma de todos los autos (scripts de carga y migración)
+
+    Recibe un driver de neo4j cualquiera: los scripts de configuración usan el suyo.
+
+    Returns:
+        Número de autos indexados
+    """
+    with driver.session() as session:
+        session.run(SCHEMA_QUERY).consume()
+        cars = [(record['id'], record['caracteristicas']) for record in session.run(
+            "MATCH (a:Auto) RETURN a.id as id, a.caracteristicas as caracteristicas"
+        )]
+        for start in range(0, len(cars), batch_size):
+            rows = [signature_row(car_id, features) for car_id, features in cars[start:start + batch_size]]
+            session.execute_write(write_signatures, rows)
+    logger.info(f"Firmas MinHash calculadas para {len(cars)} autos")
+    return len(cars)
+
+
+def rank_candidates(records: Iterable[Dict[str, Any]], query_signature: List[int],
+                    threshold: float, limit: int) -> List[Dict[str, Any]]:
+    """Ordenar candidatos por Jaccard estimada, descartando los que no llegan al umbral"""
+    ranked = []
+    for record in records:
+        similarity = estimate_jaccard(query_signature, record['minhash'] or [])
+        if similarity >= threshold:
+            row = {key: record[key] for key in ('id', 'modelo', 'año', 'precio', 'marca', 'caracteristicas')}
+            row['jaccard'] = round(similarity, 3)
+            ranked.append(row)
+    ranked.sort(key=lambda row: (-row['jaccard'], str(row['id'])))
+    return ranked[:limit]
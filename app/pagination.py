@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Paginación por cursor (keyset) para recomendaciones y búsqueda
+Cada página continúa desde la última fila entregada comparando (clave de orden,
+a.id) en lugar de usar SKIP, así que una página profunda cuesta lo mismo que la
+primera. El cursor es opaco para el cliente.
+"""
+
+import base64
+import hashlib
+import json
+from typing import List, Dict, Any
+
+# Orden -> (expresión Cypher de la clave, descendente). El desempate es siempre a.id ASC
+SORT_ORDERS = {
+    'price_asc': ('a.precio', False),
+    'price_desc': ('a.precio', True),
+    'year_desc': ('a.año', True),
+    'score_desc': ('score', True),
+}
+
+# Clave de orden -> campo del auto en el formato de la API
+API_FIELDS = {
+    'a.precio': 'price',
+    'a.año': 'year',
+    'score': 'similarity_score',
+}
+
+
+def validate_sort(sort: str) -> str:
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"Orden no soportado: {sort} (opciones: {', '.join(SORT_ORDERS)})")
+    return sort
+
+
+def keyset_condition(sort: str) -> str:
+    """Condición que deja solo las filas posteriores al cursor $after = {value, id}"""
+    key, descending = SORT_ORDERS[sort]
+    operator = '<' if descending else '>'
+    return f"({key} {operator} $after.value OR ({key} = $after.value AND a.id > $after.id))"
+
+
+def order_clause(sort: str) -> str:
+    key, descending = SORT_ORDERS[sort]
+    return f"ORDER BY {key} {'DESC' if descending else 'ASC'}, a.id ASC"
+
+
+def query_digest(query: Any) -> str:
+    """Huella corta de la consulta; un cursor solo vale para la consulta que lo emitió"""
+    payload = json.dumps(query, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def encode_cursor(sort: str, value: Any, car_id: Any, digest: str) -> str:
+    payload = json.dumps({'s': sort, 'v': value, 'i': car_id, 'q': digest}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str, sort: str, digest: str) -> Dict[str, Any]:
+    """
+    Decodificar un cursor para el orden y la consulta indicados
+
+    Returns:
+        Parámetro $after: {'value': clave de la última fila, 'id': su a.id}
+
+    Raises:
+        ValueError: si el cursor está mal formado o pertenece a otra consulta/orden
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        after = {'value': payload['v'], 'id': payload['i']}
+        cursor_sort, cursor_digest = payload['s'], payload['q']
+    except Exception:
+        raise ValueError("Cursor inválido")
+    if cursor_sort != sort or cursor_digest != digest:
+        raise ValueError("El cursor no corresponde a esta consulta")
+    return after
+
+
+def paginate(rows: List[Dict[str, Any]], page_size: int, sort: str, field: str,
+             digest: str, id_field: str = 'id') -> tuple:
+    """
+    Recortar una página y emitir el cursor de la siguiente
+
+    Args:
+        rows: Filas ordenadas, pedidas con LIMIT page_size + 1
+        field: Campo de la fila con el valor de la clave de orden
+
+    Returns:
+        Tupla (página, cursor siguiente o None si no hay más filas)
+    """
+    if len(rows) <= page_size:
+        return rows, None
+    page = rows[:page_size]
+    last = page[-1]
+    return page, encode_cursor(sort, last[field], last[id_field], digest)
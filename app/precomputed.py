@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Recomendaciones precalculadas para las combinaciones del asistente
+Lee el archivo generado por scripts/setup/precompute_recommendations.py y
+responde con una sola búsqueda en diccionario. Las combinaciones que no estén
+en el archivo siguen por el camino normal.
+"""
+
+import gzip
+import itertools
+import json
+import logging
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+FORMAT_NAME = "ayuda-precomputed-recommendations"
+FORMAT_VERSION = 3
+DEFAULT_PATH = Path(__file__).parent / "data" / "precomputed_recommendations.json.gz"
+
+# Opciones de cada paso del asistente (templates/brands.html, budget.html, ...)
+WIZARD_BRANDS = [
+    "Toyota", "Ford", "BMW", "Tesla", "Honda", "Mercedes", "Audi", "Nissan",
+    "Volkswagen", "Hyundai", "Kia", "Mazda", "Chevrolet", "Subaru", "Volvo", "Lexus"
+]
+WIZARD_BUDGETS = ["15000-30000", "30000-50000", "50000-100000", "100000+"]
+WIZARD_FUELS = ["gasolina", "diesel", "electrico", "hibrido"]
+WIZARD_TYPES = ["sedan", "suv", "hatchback", "pickup", "coupe", "convertible"]
+WIZARD_TRANSMISSIONS = ["automatic", "manual", "semiautomatic"]
+
+
+def _subsets(options: List[str], max_size: int):
+    """Subconjuntos no vacíos de hasta max_size elementos"""
+    for size in range(1, min(max_size, len(options)) + 1):
+        for combination in itertools.combinations(options, size):
+            yield list(combination)
+
+
+def wizard_combinations(max_brands: int = 2, max_types: int = 2):
+    """
+    Enumerar las selecciones alcanzables desde el asistente
+
+    Marcas y tipos son de selección múltiple; todas sus combinaciones suman
+    cientos de millones, así que se limitan a subconjuntos de hasta
+    max_brands / max_types elementos.
+    """
+    for brands in _subsets(WIZARD_BRANDS, max_brands):
+        for budget in WIZARD_BUDGETS:
+            for fuel in WIZARD_FUELS:
+                for types in _subsets(WIZARD_TYPES, max_types):
+                    for transmission in WIZARD_TRANSMISSIONS:
+                        yield {
+                            'brands': brands,
+                            'budget': budget,
+                            'fuel': fuel,
+                            'types': types,
+                            'transmission': transmission
+                        }
+
+
+def write_precomputed(path: Path, cars: List[Dict[str, Any]], entries: Dict[str, List],
+                      catalog_fingerprint: str, metadata: Optional[Dict[str, Any]] = None):
+    """
+    Escribir el archivo de búsqueda
+
+    Args:
+        cars: Tabla de autos (por ordinal) en el formato de la API
+        entries: Clave de preferencias -> lista de [ordinal, puntuación]
+        catalog_fingerprint: Huella de la instantánea usada para calcularlo
+    """
+    document = {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'created_at': time.time(),
+        'catalog_fingerprint': catalog_fingerprint,
+        'metadata': metadata or {},
+        'cars': cars,
+        'entries': entries
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, separators=(',', ':'))
+
+
+class PrecomputedRecommendations:
+    """Tabla de resultados precalculados indexada por la clave de preferencias"""
+
+    def __init__(self, cars: List[Dict[str, Any]], entries: Dict[str, List],
+                 catalog_fingerprint: str, created_at: float = 0.0):
+        self.cars = cars
+        self.entries = entries
+        self.catalog_fingerprint = catalog_fingerprint
+        self.created_at = created_at
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @classmethod
+    def load(cls, path: Path = DEFAULT_PATH) -> Optional['PrecomputedRecommendations']:
+        """Cargar el archivo; None si no existe o tiene otro formato/versión"""
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                document = json.load(f)
+        except Exception as e:
+            logger.error(f"Error leyendo recomendaciones precalculadas '{path}': {e}")
+            return None
+
+        if document.get('format') != FORMAT_NAME or document.get('version') != FORMAT_VERSION:
+            logger.warning(f"Formato de recomendaciones precalculadas no soportado en '{path}'")
+            return None
+
+        logger.info(f"Cargadas {len(document['entries'])} combinaciones precalculadas")
+        return cls(document['cars'], document['entries'],
+                   document['catalog_fingerprint'], document.get('created_at', 0.0))
+
+    def lookup(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Resultados para una clave de preferencias, o None si no se precalculó"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        recommendations = []
+        for ordinal, score in entry:
+            car = dict(self.cars[ordinal])
+            car['features'] = list(car['features'])
+            car['similarity_score'] = score
+            recommendations.append(car)
+        return recommendations
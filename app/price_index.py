@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Índice de precios ordenado para el catálogo en memoria
+Guarda los ordinales de los autos ordenados por precio y resuelve un rango de
+presupuesto con dos búsquedas binarias, devolviendo un corte contiguo.
+"""
+
+import numpy as np
+
+
+class PriceIndex:
+    """Ordinales ordenados por precio con búsqueda de rango por bisección"""
+
+    def __init__(self, price):
+        """
+        Args:
+            price: Arreglo de precios por ordinal (NaN = sin precio)
+        """
+        # Los autos sin precio nunca cumplen el filtro de presupuesto
+        priced = np.flatnonzero(~np.isnan(price))
+        # Orden estable: los empates conservan el orden de carga
+        self.ordinals = priced[np.argsort(price[priced], kind='stable')]
+        self.sorted_prices = price[self.ordinals]
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    def bounds(self, min_price: float, max_price: float) -> tuple:
+        """Posiciones [inicio, fin) del rango dentro del índice"""
+        start = int(np.searchsorted(self.sorted_prices, min_price, side='left'))
+        end = int(np.searchsorted(self.sorted_prices, max_price, side='right'))
+        return start, max(start, end)
+
+    def range(self, min_price: float, max_price: float):
+        """
+        Ordinales con min_price <= precio <= max_price, ordenados por precio
+
+        Un límite superior infinito (presupuesto "100000+" o sin presupuesto)
+        cuesta lo mismo que un rango acotado. Devuelve una vista, no una copia.
+        """
+        start, end = self.bounds(min_price, max_price)
+        return self.ordinals[start:end]
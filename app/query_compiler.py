@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Compilador de consultas Cypher por forma de filtros
+Cada combinación de filtros presentes ("forma") se compila una sola vez en una
+plantilla que enlaza cada nodo relacionado exactamente una vez: MATCH cuando la
+faceta filtra y OPTIONAL MATCH cuando solo se necesita para el resultado.
+"""
+
+import itertools
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+
+from db import read_session
+from pagination import SORT_ORDERS, keyset_condition, order_clause
+from relaxation import RELAXATION_ORDER
+from scoring import SCORE_EXPRESSION
+
+logger = logging.getLogger(__name__)
+
+# Relaciones de un Auto: alias -> patrón
+RELATIONS = [
+    ('m', "(a)-[:ES_MARCA]->(m:Marca)"),
+    ('t', "(a)-[:ES_TIPO]->(t:Tipo)"),
+    ('c', "(a)-[:USA_COMBUSTIBLE]->(c:Combustible)"),
+    ('tr', "(a)-[:TIENE_TRANSMISION]->(tr:Transmision)"),
+]
+
+# Alias de los filtros que se evalúan después de la proyección (WITH)
+PROJECTED = 'projected'
+
+CAR_COLUMNS = """a.id as id, a.modelo as modelo, a.año as año, a.precio as precio,
+       a.caracteristicas as caracteristicas,
+       m.nombre as marca, t.categoria as tipo,
+       c.tipo as combustible, tr.tipo as transmision"""
+
+
+class QueryCompiler:
+    """Plantillas Cypher precompiladas para todas las formas de un conjunto de filtros"""
+
+    def __init__(self, name: str, filters: List[Tuple[str, Optional[str], str]],
+                 return_clause: str, base_conditions: Optional[List[str]] = None,
+                 placeholders: Optional[Dict[str, Any]] = None, projection: Optional[str] = None):
+        """
+        Args:
+            name: Nombre del conjunto de consultas (para logs)
+            filters: Lista de (parámetro, alias de la relación, None si filtra el Auto
+                o PROJECTED si filtra sobre la proyección, condición)
+            return_clause: Cláusula RETURN/ORDER BY/LIMIT común a todas las formas
+            base_conditions: Condiciones sobre el Auto presentes en todas las formas
+            placeholders: Valores de ejemplo de cada parámetro para EXPLAIN
+            projection: Cláusula WITH previa al RETURN (requerida por los filtros PROJECTED)
+        """
+        if projection is None and any(alias == PROJECTED for _, alias, _ in filters):
+            raise ValueError(f"[{name}] Los filtros sobre la proyección requieren una cláusula WITH")
+        self.name = name
+        self.filters = filters
+        self.return_clause = return_clause
+        self.base_conditions = base_conditions or []
+        self.placeholders = placeholders or {}
+        self.projection = projection
+        self.templates: Dict[Tuple[bool, ...], str] = {
+            shape: self._compile(shape)
+            for shape in itertools.product((False, True), repeat=len(filters))
+        }
+        self.plan_report: List[Dict[str, Any]] = []
+
+    def shape_name(self, shape: Tuple[bool, ...]) -> str:
+        """Nombre legible de una forma (ej. 'brands+fuel')"""
+        active = [param for (param, _, _), present in zip(self.filters, shape) if present]
+        return "+".join(active) or "base"
+
+    def _compile(self, shape: Tuple[bool, ...]) -> str:
+        node_conditions = list(self.base_conditions)
+        relation_conditions: Dict[str, List[str]] = {}
+        projected_conditions: List[str] = []
+        for (param, alias, condition), present in zip(self.filters, shape):
+            if not present:
+                continue
+            if alias is None:
+                node_conditions.append(condition)
+            elif alias == PROJECTED:
+                projected_conditions.append(condition)
+            else:
+                relation_conditions.setdefault(alias, []).append(condition)
+
+        lines = ["MATCH (a:Auto)"]
+        if node_conditions:
+            lines.append("WHERE " + " AND ".join(node_conditions))
+        # Primero las relaciones que filtran, después las opcionales
+        for alias, pattern in RELATIONS:
+            if alias in relation_conditions:
+                lines.append(f"MATCH {pattern} WHERE " + " AND ".join(relation_conditions[alias]))
+        for alias, pattern in RELATIONS:
+            if alias not in relation_conditions:
+                lines.append(f"OPTIONAL MATCH {pattern}")
+        if self.projection:
+            lines.append(self.projection)
+            if projected_conditions:
+                lines.append("WHERE " + " AND ".join(projected_conditions))
+        lines.append(self.return_clause)
+        return "\n".join(lines)
+
+    def build(self, values: Dict[str, Any], base_parameters: Optional[Dict[str, Any]] = None) -> tuple:
+        """
+        Elegir la plantilla de la forma correspondiente a los filtros presentes
+
+        Args:
+            values: Valores de filtros; un valor vacío/None significa filtro ausente
+            base_parameters: Parámetros presentes en todas las formas
+
+        Returns:
+            Tupla (query, parameters)
+        """
+        parameters = dict(base_parameters or {})
+        shape = []
+        for param, _, _ in self.filters:
+            value = values.get(param)
+            present = bool(value)
+            shape.append(present)
+            if present:
+                parameters[param] = value
+        return self.templates[tuple(shape)], parameters
+
+    def warm_up(self, driver) -> List[Dict[str, Any]]:
+        """
+        Ejecutar EXPLAIN sobre todas las formas para calentar la caché de planes
+
+        Returns:
+            Por forma: nombre, si el plan usa el índice de precio y el error si lo hubo
+        """
+        report = []
+        with read_session(driver) as session:
+            for shape, query in self.templates.items():
+                entry = {'shape': self.shape_name(shape), 'uses_price_index': False, 'error': None}
+                try:
+                    summary = session.run("EXPLAIN " + query, self.placeholders).consume()
+                    entry['uses_price_index'] = _uses_price_index(summary.plan)
+                except Exception as e:
+                    entry['error'] = str(e)
+                report.append(entry)
+
+        without_index = [e['shape'] for e in report if e['error'] is None and not e['uses_price_index']]
+        if without_index:
+            logger.warning(f"[{self.name}] Formas sin índice auto_precio: {', '.join(without_index)}")
+        failed = [e['shape'] for e in report if e['error']]
+        if failed:
+            logger.error(f"[{self.name}] Formas con error en EXPLAIN: {', '.join(failed)}")
+        logger.info(f"[{self.name}] {len(report)} formas de consulta precalentadas")
+        self.plan_report = report
+        return report
+
+
+def _uses_price_index(plan) -> bool:
+    """Buscar en el plan una búsqueda por índice sobre Auto.precio"""
+    if not plan:
+        return False
+    operator = plan.get('operatorType', '')
+    details = str(plan.get('args', {}).get('Details', ''))
+    if 'IndexSeek' in operator and 'precio' in details:
+        return True
+    return any(_uses_price_index(child) for child in plan.get('children', []))
+
+
+# Filtros de preferencias: 16 formas (marca, combustible, tipo, transmisión)
+RECOMMENDATION_FILTERS = [
+    ('brands', 'm', "m.nombre IN $brands"),
+    ('fuel', 'c', "c.tipo IN $fuel"),
+    ('types', 't', "t.categoria IN $types"),
+    ('transmission', 'tr', "tr.tipo IN $transmission"),
+]
+RECOMMENDATION_BASE_CONDITIONS = ["a.precio >= $min_price AND a.precio <= $max_price"]
+
+# Conteos del asistente sin catálogo en memoria: autos distintos por valor de la
+# faceta siguiente (una agrupación) o por rango de presupuesto (una agregación)
+FACET_COUNT_COLUMNS = {
+    'brands': 'm.nombre',
+    'fuel': 'c.tipo',
+    'types': 't.categoria',
+    'transmission': 'tr.tipo',
+}
+FACET_COUNT_QUERIES = {
+    facet: QueryCompiler(
+        f"conteo {facet}",
+        filters=RECOMMENDATION_FILTERS,
+        base_conditions=RECOMMENDATION_BASE_CONDITIONS,
+        return_clause=f"RETURN {column} as valor, count(DISTINCT a) as autos",
+        placeholders={
+            'min_price': 0, 'max_price': 0, 'brands': [], 'fuel': [], 'types': [], 'transmission': []
+        }
+    )
+    for facet, column in FACET_COUNT_COLUMNS.items()
+}
+BUDGET_COUNT_QUERIES = QueryCompiler(
+    "conteo presupuesto",
+    filters=RECOMMENDATION_FILTERS,
+    return_clause="""WITH DISTINCT a
+WITH collect(a.precio) AS precios
+RETURN [r IN $budget_ranges | size([p IN precios WHERE p >= r[0] AND p <= r[1]])] AS autos""",
+    placeholders={'brands': [], 'fuel': [], 'types': [], 'transmission': [], 'budget_ranges': []}
+)
+
+# Candidatos ordenados por precio (la puntuación vectorizada se hace en Python)
+RECOMMENDATION_QUERIES = QueryCompiler(
+    "recomendaciones",
+    filters=RECOMMENDATION_FILTERS,
+    base_conditions=RECOMMENDATION_BASE_CONDITIONS,
+    return_clause=f"""RETURN {CAR_COLUMNS}
+ORDER BY a.precio ASC
+LIMIT $candidate_limit""",
+    placeholders={
+        'min_price': 0, 'max_price': 0, 'brands': [], 'fuel': [],
+        'types': [], 'transmission': [], 'candidate_limit': 1
+    }
+)
+
+# Puntuación y top-k dentro de Neo4j: se consideran todos los autos que cumplen
+# los filtros, no solo los 20 más baratos
+SCORED_RECOMMENDATION_QUERIES = QueryCompiler(
+    "recomendaciones puntuadas",
+    filters=RECOMMENDATION_FILTERS,
+    base_conditions=RECOMMENDATION_BASE_CONDITIONS,
+    return_clause=f"""WITH a, m, t, c, tr, {SCORE_EXPRESSION} AS score
+RETURN {CAR_COLUMNS},
+       round(score, 2) as similarity_score
+ORDER BY similarity_score DESC, a.precio ASC, a.id ASC
+LIMIT $k""",
+    placeholders={
+        'min_price': 0, 'max_price': 1, 'brands': [], 'fuel': [],
+        'types': [], 'transmission': [], 'k': 10, 'score_price': True,
+        'w_price': 0, 'w_brand': 0, 'w_type': 0, 'w_fuel': 0,
+        'w_transmission': 0, 'w_feature': 0
+    }
+)
+
+# Páginas de recomendaciones por orden: 32 formas cada uno (filtros + cursor $after).
+# La puntuación se proyecta siempre para devolver similarity_score en cualquier orden
+PAGED_RECOMMENDATION_QUERIES = {
+    sort: QueryCompiler(
+        f"recomendaciones paginadas ({sort})",
+        filters=RECOMMENDATION_FILTERS + [
+            ('after', PROJECTED if key == 'score' else None, keyset_condition(sort))
+        ],
+        base_conditions=RECOMMENDATION_BASE_CONDITIONS + (["a.año IS NOT NULL"] if key == 'a.año' else []),
+        projection=f"WITH a, m, t, c, tr, round({SCORE_EXPRESSION}, 2) AS score",
+        return_clause=f"""RETURN {CAR_COLUMNS},
+       score as similarity_score
+{order_clause(sort)}
+LIMIT $limit""",
+        placeholders={
+            'min_price': 0, 'max_price': 1, 'brands': [], 'fuel': [],
+            'types': [], 'transmission': [], 'limit': 1, 'score_price': True,
+            'w_price': 0, 'w_brand': 0, 'w_type': 0, 'w_fuel': 0,
+            'w_transmission': 0, 'w_feature': 0, 'after': {'value': 0, 'id': ''}
+        }
+    )
+    for sort, (key, _) in SORT_ORDERS.items()
+}
+
+# Filtros de un perfil dentro de BATCH_*: cada perfil trae sus parámetros en p y
+# los filtros ausentes llegan como null
+BATCH_PROFILE_MATCH = """    WITH p
+    MATCH (a:Auto)
+    WHERE a.precio >= p.min_price AND a.precio <= p.max_price
+    OPTIONAL MATCH (a)-[:ES_MARCA]->(m:Marca)
+    OPTIONAL MATCH (a)-[:ES_TIPO]->(t:Tipo)
+    OPTIONAL MATCH (a)-[:USA_COMBUSTIBLE]->(c:Combustible)
+    OPTIONAL MATCH (a)-[:TIENE_TRANSMISION]->(tr:Transmision)
+    WITH p, a, m, t, c, tr
+    WHERE (p.brands IS NULL OR m.nombre IN p.brands)
+      AND (p.types IS NULL OR t.categoria IN p.types)
+      AND (p.fuel IS NULL OR c.tipo IN p.fuel)
+      AND (p.transmission IS NULL OR tr.tipo IN p.transmission)"""
+
+# Candidatos de un bloque de perfiles en una sola consulta (get_recommendations_batch
+# con puntuación en Python): los mismos que RECOMMENDATION_QUERIES por perfil
+BATCH_CANDIDATE_QUERY = f"""UNWIND $profiles AS p
+CALL {{
+{BATCH_PROFILE_MATCH}
+    RETURN {CAR_COLUMNS}
+    ORDER BY a.precio ASC
+    LIMIT $candidate_limit
+}}
+RETURN p.index as profile, id, modelo, año, precio, caracteristicas,
+       marca, tipo, combustible, transmision"""
+
+# Top-k de un bloque de perfiles puntuado dentro de Neo4j: misma puntuación, orden y
+# recorte que SCORED_RECOMMENDATION_QUERIES, con los parámetros de score_parameters en p
+BATCH_SCORED_RECOMMENDATION_QUERY = f"""UNWIND $profiles AS p
+CALL {{
+{BATCH_PROFILE_MATCH}
+    WITH a, m, t, c, tr, {SCORE_EXPRESSION.replace('$', 'p.')} AS score
+    RETURN {CAR_COLUMNS},
+           round(score, 2) as similarity_score
+    ORDER BY similarity_score DESC, a.precio ASC, a.id ASC
+    LIMIT $k
+}}
+RETURN p.index as profile, id, modelo, año, precio, caracteristicas,
+       marca, tipo, combustible, transmision, similarity_score"""
+
+# Incumplimiento de cada restricción relajable; los filtros ausentes llegan como null
+RELAXATION_CONDITIONS = {
+    'transmission': "$transmission IS NOT NULL AND NOT coalesce(tr.tipo IN $transmission, false)",
+    'fuel': "$fuel IS NOT NULL AND NOT coalesce(c.tipo IN $fuel, false)",
+    'types': "$types IS NOT NULL AND NOT coalesce(t.categoria IN $types, false)",
+    'brands': "$brands IS NOT NULL AND NOT coalesce(m.nombre IN $brands, false)",
+    'budget': "NOT (a.precio >= $min_price AND a.precio <= $max_price)",
+}
+
+# Nivel de relajación: posición de la última restricción incumplida (0 = cumple todas)
+RELAXATION_LEVEL = "CASE\n" + "".join(
+    f"        WHEN {RELAXATION_CONDITIONS[constraint]} THEN {level}\n"
+    for level, constraint in reversed(list(enumerate(RELAXATION_ORDER, start=1)))
+) + "        ELSE 0\n    END"
+
+# Relajación progresiva en una sola consulta: candidatos dentro del presupuesto
+# ampliado, ordenados por nivel y puntuación; el llamador conserva el primer nivel
+RELAXED_RECOMMENDATION_QUERY = f"""MATCH (a:Auto)
+WHERE a.precio >= $relaxed_min_price AND a.precio <= $relaxed_max_price
+OPTIONAL MATCH (a)-[:ES_MARCA]->(m:Marca)
+OPTIONAL MATCH (a)-[:ES_TIPO]->(t:Tipo)
+OPTIONAL MATCH (a)-[:USA_COMBUSTIBLE]->(c:Combustible)
+OPTIONAL MATCH (a)-[:TIENE_TRANSMISION]->(tr:Transmision)
+WITH a, m, t, c, tr,
+    {RELAXATION_LEVEL} AS relaxation_level,
+    {SCORE_EXPRESSION} AS score
+RETURN {CAR_COLUMNS},
+       round(score, 2) as similarity_score, relaxation_level
+ORDER BY relaxation_level ASC, similarity_score DESC, a.precio ASC, a.id ASC
+LIMIT $k"""
+
+# Búsqueda de Gestionador.search_cars: 32 formas
+SEARCH_FILTERS = [
+    ('marca', 'm', "m.nombre = $marca"),
+    ('tipo', 't', "t.categoria = $tipo"),
+    ('precio_min', None, "a.precio >= $precio_min"),
+    ('precio_max', None, "a.precio <= $precio_max"),
+    ('año_min', None, "a.año >= $año_min"),
+]
+SEARCH_COLUMNS = """a.id as id, a.modelo as modelo, a.año as año, a.precio as precio,
+       m.nombre as marca, t.categoria as tipo,
+       c.tipo as combustible, tr.tipo as transmision"""
+
+SEARCH_QUERIES = QueryCompiler(
+    "búsqueda",
+    filters=SEARCH_FILTERS,
+    return_clause=f"""RETURN {SEARCH_COLUMNS}
+ORDER BY a.precio ASC
+LIMIT $limit""",
+    placeholders={
+        'marca': '', 'tipo': '', 'precio_min': 0, 'precio_max': 0,
+        'año_min': 0, 'limit': 1
+    }
+)
+
+# Páginas de búsqueda por orden (sin puntuación): 64 formas cada uno
+SEARCH_SORTS = ['price_asc', 'price_desc', 'year_desc']
+PAGED_SEARCH_QUERIES = {
+    sort: QueryCompiler(
+        f"búsqueda paginada ({sort})",
+        filters=SEARCH_FILTERS + [('after', None, keyset_condition(sort))],
+        # La comparación del cursor descarta claves nulas: se excluyen desde la primera página
+        base_conditions=[f"{SORT_ORDERS[sort][0]} IS NOT NULL"],
+        return_clause=f"""RETURN {SEARCH_COLUMNS}
+{order_clause(sort)}
+LIMIT $limit""",
+        placeholders={
+            'marca': '', 'tipo': '', 'precio_min': 0, 'precio_max': 0,
+            'año_min': 0, 'limit': 1, 'after': {'value': 0, 'id': ''}
+        }
+    )
+    for sort in SEARCH_SORTS
+}
@@ -4,31 +4,182 @@ Sistema de recomendaciones de autos usando Neo4j
 Conecta con la base de datos y genera recomendaciones basadas en las preferencias del usuario
 """
 
-from neo4j import GraphDatabase
+import hashlib
+import itertools
+import json
 import logging
-from typing import List, Dict, Any, Optional
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Iterator, Iterable
+
+from catalog_engine import CatalogEngine, NUMPY_AVAILABLE, CATALOG_QUERY, CATALOG_CAR_QUERY, car_from_record
+from catalog_statistics import StatisticsService
+from circuit_breaker import CircuitBreaker
+from db import create_driver, read_query, read_session, is_timeout, UNAVAILABLE_ERRORS
+from deadline import Deadline
+from precomputed import (PrecomputedRecommendations, DEFAULT_PATH as PRECOMPUTED_PATH, WIZARD_BRANDS, WIZARD_BUDGETS,
+                         WIZARD_FUELS, WIZARD_TYPES, WIZARD_TRANSMISSIONS)
+from query_compiler import (RECOMMENDATION_QUERIES, SCORED_RECOMMENDATION_QUERIES, PAGED_RECOMMENDATION_QUERIES,
+                            BATCH_CANDIDATE_QUERY, BATCH_SCORED_RECOMMENDATION_QUERY,
+                            RELAXED_RECOMMENDATION_QUERY, FACET_COUNT_QUERIES,
+                            BUDGET_COUNT_QUERIES)
+from relaxation import widened_budget, annotate
+from pagination import SORT_ORDERS, API_FIELDS, validate_sort, query_digest, decode_cursor, paginate
+from scoring import resolve_weights, scores_price, score_parameters, rank_cars
+from server_timing import ServerTiming
+from vocabulary import VOCABULARY
+
+if NUMPY_AVAILABLE:
+    from similarity_index import SimilarityIndex
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class CarRecommender:
-    def __init__(self, uri: str, user: str, password: str):
-        """Inicializar conexión a Neo4j"""
-        try:
-            self.driver = GraphDatabase.driver(uri, auth=(user, password))
-            # Verificar conexión
-            with self.driver.session() as session:
-                session.run("RETURN 1")
-            logger.info("Conexión exitosa a Neo4j")
-        except Exception as e:
-            logger.error(f"Error conectando a Neo4j: {e}")
-            raise
+# Servir las consultas desde el catálogo en memoria cuando NumPy esté disponible
+USE_CATALOG_ENGINE = True
+
+# Número de recomendaciones devueltas por consulta
+RECOMMENDATION_LIMIT = 10
+
+# Candidatos traídos de Neo4j cuando se puntúa en Python
+CANDIDATE_LIMIT = 1000
+
+# Perfiles por consulta UNWIND en get_recommendations_batch
+BATCH_CHUNK_SIZE = 100
+
+# Campos de un perfil de preferencias guardado
+PROFILE_FIELDS = ('brands', 'budget', 'fuel', 'types', 'transmission')
+
+# Puntuar y recortar dentro de Neo4j (ORDER BY score DESC LIMIT k)
+SERVER_SIDE_SCORING = True
+
+# Tiempo restante mínimo (segundos) para intentar Neo4j; con menos se sirve el respaldo
+MIN_QUERY_SECONDS = 0.05
+
+# Cortocircuito de Neo4j: fallos seguidos que lo abren y espera entre pruebas (segundos)
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_BASE_BACKOFF = 1.0
+BREAKER_MAX_BACKOFF = 60.0
+
+# Autos similares por defecto y máximo por petición (/api/cars/<id>/similar)
+SIMILAR_LIMIT = 6
+SIMILAR_MAX = 24
+
+# Pasos del asistente en orden con las opciones de cada página (/api/facets)
+WIZARD_STEPS = [
+    ('brands', WIZARD_BRANDS),
+    ('budget', WIZARD_BUDGETS),
+    ('fuel', WIZARD_FUELS),
+    ('types', WIZARD_TYPES),
+    ('transmission', WIZARD_TRANSMISSIONS),
+]
+
+# Tiempo máximo (segundos) de la agregación de conteos en Neo4j
+FACET_QUERY_TIMEOUT = 0.5
+
+# Perfiles que se resuelven durante el arranque para cebar la caché de resultados
+WARM_UP_PROFILES = [{'budget': budget} for budget in WIZARD_BUDGETS]
+
+# Límites de la caché de resultados
+CACHE_MAX_BYTES = 4 * 1024 * 1024
+CACHE_TTL_SECONDS = 300
+
+class RecommendationCache:
+    """Caché LRU con expiración (TTL) y límite en bytes para resultados de recomendaciones"""
     
-    def close(self):
-        """Cerrar conexión"""
-        if hasattr(self, 'driver'):
-            self.driver.close()
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES, ttl: float = CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # clave -> (expira_en, json serializado)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+    
+    @staticmethod
+    def make_key(preferences: Dict, k: int = RECOMMENDATION_LIMIT, weights: Optional[Dict] = None) -> str:
+        """Hash canónico de las preferencias normalizadas (el orden de las listas no importa)"""
+        canonical = {}
+        for name, value in preferences.items():
+            if isinstance(value, (list, tuple, set)):
+                value = sorted(set(value))
+            canonical[name] = value
+        canonical['_k'] = k
+        canonical['_weights'] = resolve_weights(weights)
+        payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Obtener una copia del resultado guardado, o None si no existe o expiró"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, payload = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Se guarda serializado: cada lectura devuelve una copia independiente
+        return json.loads(payload)
+    
+    def put(self, key: str, value: List[Dict]):
+        """Guardar un resultado, desalojando los menos usados si se excede el límite"""
+        payload = json.dumps(value, ensure_ascii=False)
+        size = len(payload.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, payload)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+    
+    def invalidate(self, key: Optional[str] = None):
+        """Invalidar una entrada concreta o toda la caché si key es None"""
+        with self._lock:
+            if key is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._bytes = 0
+            elif key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de la caché"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+    
+    def _remove(self, key: str):
+        _, payload = self._entries.pop(key)
+        self._bytes -= len(payload.encode('utf-8'))
+
+class RecommenderBase:
+    """Normalización de preferencias y puntuación, independientes de la conexión"""
     
     def parse_budget_range(self, budget_str: str) -> tuple:
         """Convertir string de presupuesto a rango numérico"""
@@ -46,65 +197,25 @@ class CarRecommender:
             return (0, float('inf'))
     
     def normalize_preferences(self, brands=None, budget=None, fuel=None, types=None, transmission=None):
-        """Normalizar y validar las preferencias del usuario"""
-        # Normalizar marcas
-        if brands:
-            if isinstance(brands, dict):
-                # Si viene como dict de grupos, tomar todos los valores
-                brands = list(brands.values())
-            elif isinstance(brands, str):
-                brands = [brands]
+        """
+        Normalizar y validar las preferencias del usuario
         
+        Todas las facetas admiten un valor o varios; salen como lista de valores
+        canónicos, o None si no hay filtro.
+        """
         # Normalizar presupuesto
         if budget:
             min_price, max_price = self.parse_budget_range(budget)
         else:
             min_price, max_price = 0, float('inf')
         
-        # Normalizar combustible
-        if fuel:
-            if isinstance(fuel, list):
-                fuel = fuel[0] if fuel else None
-            # Mapear nombres comunes
-            fuel_mapping = {
-                'gasolina': 'Gasolina',
-                'gas': 'Gasolina',
-                'diesel': 'Diésel',
-                'electrico': 'Eléctrico',
-                'electric': 'Eléctrico',
-                'hibrido': 'Híbrido',
-                'hybrid': 'Híbrido'
-            }
-            fuel = fuel_mapping.get(fuel.lower() if fuel else None, fuel)
-        
-        # Normalizar tipos
-        if types:
-            if isinstance(types, str):
-                types = [types]
-            # Mapear nombres comunes
-            type_mapping = {
-                'sedan': 'Sedán',
-                'suv': 'SUV',
-                'hatchback': 'Hatchback',
-                'pickup': 'Pickup',
-                'coupe': 'Coupé',
-                'convertible': 'Convertible'
-            }
-            types = [type_mapping.get(t.lower(), t) for t in types]
-        
-        # Normalizar transmisión
-        if transmission:
-            if isinstance(transmission, list):
-                transmission = transmission[0] if transmission else None
-            # Mapear nombres comunes
-            trans_mapping = {
-                'automatic': 'Automática',
-                'automatica': 'Automática',
-                'manual': 'Manual',
-                'semiautomatic': 'Semiautomática',
-                'semiautomatica': 'Semiautomática'
-            }
-            transmission = trans_mapping.get(transmission.lower() if transmission else None, transmission)
+        # Marcas, combustibles, tipos y transmisiones: listas de valores canónicos
+        # (alias, tildes y mayúsculas se resuelven con el vocabulario, ver vocabulary.py)
+        vocabulary = VOCABULARY.current
+        brands = vocabulary.canonical_list('brands', brands)
+        fuel = vocabulary.canonical_list('fuel', fuel)
+        types = vocabulary.canonical_list('types', types)
+        transmission = vocabulary.canonical_list('transmission', transmission)
         
         return {
             'brands': brands,
@@ -115,122 +226,37 @@ class CarRecommender:
             'transmission': transmission
         }
     
-    def build_recommendation_query(self, preferences: Dict) -> tuple:
-        """Construir consulta Cypher dinámica basada en preferencias"""
-        query_parts = ["MATCH (a:Auto)"]
-        where_conditions = []
-        parameters = {}
-        
-        # Filtro de presupuesto (siempre aplicar)
-        where_conditions.append("a.precio >= $min_price AND a.precio <= $max_price")
-        parameters['min_price'] = preferences['min_price']
-        parameters['max_price'] = preferences['max_price']
-        
-        # Filtro de marca
-        if preferences['brands']:
-            query_parts.append("MATCH (a)-[:ES_MARCA]->(m:Marca)")
-            where_conditions.append("m.nombre IN $brands")
-            parameters['brands'] = preferences['brands']
-        
-        # Filtro de combustible
-        if preferences['fuel']:
-            query_parts.append("MATCH (a)-[:USA_COMBUSTIBLE]->(c:Combustible)")
-            where_conditions.append("c.tipo = $fuel")
-            parameters['fuel'] = preferences['fuel']
-        
-        # Filtro de tipo
-        if preferences['types']:
-            query_parts.append("MATCH (a)-[:ES_TIPO]->(t:Tipo)")
-            where_conditions.append("t.categoria IN $types")
-            parameters['types'] = preferences['types']
-        
-        # Filtro de transmisión
-        if preferences['transmission']:
-            query_parts.append("MATCH (a)-[:TIENE_TRANSMISION]->(tr:Transmision)")
-            where_conditions.append("tr.tipo = $transmission")
-            parameters['transmission'] = preferences['transmission']
-        
-        # Construir query completa
-        if where_conditions:
-            query_parts.append("WHERE " + " AND ".join(where_conditions))
-        
-        # Obtener datos relacionados
-        query_parts.append("""
-            OPTIONAL MATCH (a)-[:ES_MARCA]->(m:Marca)
-            OPTIONAL MATCH (a)-[:ES_TIPO]->(t:Tipo)
-            OPTIONAL MATCH (a)-[:USA_COMBUSTIBLE]->(c:Combustible)
-            OPTIONAL MATCH (a)-[:TIENE_TRANSMISION]->(tr:Transmision)
-            RETURN a.id as id, a.modelo as modelo, a.año as año, a.precio as precio,
-                   a.caracteristicas as caracteristicas,
-                   m.nombre as marca, t.categoria as tipo, 
-                   c.tipo as combustible, tr.tipo as transmision
-            ORDER BY a.precio ASC
-            LIMIT 20
-        """)
-        
-        query = " ".join(query_parts)
-        return query, parameters
-    
-    def execute_recommendation_query(self, query: str, parameters: Dict) -> List[Dict]:
-        """Ejecutar consulta de recomendaciones"""
-        try:
-            with self.driver.session() as session:
-                result = session.run(query, parameters)
-                recommendations = []
-                
-                for record in result:
-                    car_data = {
-                        'id': record['id'],
-                        'name': f"{record['marca']} {record['modelo']} {record['año']}" if record['marca'] else f"{record['modelo']} {record['año']}",
-                        'model': record['modelo'],
-                        'brand': record['marca'] or 'Marca no especificada',
-                        'year': record['año'],
-                        'price': float(record['precio']) if record['precio'] else 0,
-                        'type': record['tipo'] or 'Tipo no especificado',
-                        'fuel': record['combustible'] or 'Combustible no especificado',
-                        'transmission': record['transmision'] or 'Transmisión no especificada',
-                        'features': record['caracteristicas'] or [],
-                        'image': None  # Placeholder para imágenes futuras
-                    }
-                    recommendations.append(car_data)
-                
-                return recommendations
-                
-        except Exception as e:
-            logger.error(f"Error ejecutando consulta de recomendaciones: {e}")
-            logger.error(f"Query: {query}")
-            logger.error(f"Parameters: {parameters}")
-            return []
-    
-    def add_similarity_score(self, recommendations: List[Dict], preferences: Dict) -> List[Dict]:
-        """Agregar puntuación de similitud basada en preferencias"""
+    def add_similarity_score(self, recommendations: List[Dict], preferences: Dict,
+                             weights: Optional[Dict] = None) -> List[Dict]:
+        """Agregar puntuación de similitud basada en preferencias (ver scoring.DEFAULT_WEIGHTS)"""
+        weights = resolve_weights(weights)
         for car in recommendations:
             score = 0
             
             # Puntuación por rango de precio (mayor score para precios más bajos dentro del rango)
-            if preferences['max_price'] != float('inf'):
+            if scores_price(preferences):
                 price_ratio = car['price'] / preferences['max_price']
-                score += (1 - price_ratio) * 30  # Hasta 30 puntos por precio
+                score += (1 - price_ratio) * weights['price']
             
             # Bonificación por marca preferida
             if preferences['brands'] and car['brand'] in preferences['brands']:
-                score += 25
+                score += weights['brand']
             
             # Bonificación por tipo preferido
             if preferences['types'] and car['type'] in preferences['types']:
-                score += 20
+                score += weights['type']
             
             # Bonificación por combustible preferido
-            if preferences['fuel'] and car['fuel'] == preferences['fuel']:
-                score += 15
+            if preferences['fuel'] and car['fuel'] in preferences['fuel']:
+                score += weights['fuel']
             
             # Bonificación por transmisión preferida
-            if preferences['transmission'] and car['transmission'] == preferences['transmission']:
-                score += 10
+            if preferences['transmission'] and car['transmission'] in preferences['transmission']:
+                score += weights['transmission']
             
             # Bonificación por características
             if car['features']:
-                score += len(car['features']) * 2
+                score += len(car['features']) * weights['feature']
             
             car['similarity_score'] = round(score, 2)
         
@@ -239,7 +265,262 @@ class CarRecommender:
         
         return recommendations
     
-    def get_recommendations(self, brands=None, budget=None, fuel=None, types=None, transmission=None) -> List[Dict]:
+    def rank_recommendations(self, recommendations: List[Dict], preferences: Dict,
+                             limit: int = RECOMMENDATION_LIMIT, weights: Optional[Dict] = None) -> List[Dict]:
+        """Puntuar, ordenar y recortar los candidatos"""
+        if not recommendations:
+            return []
+        if NUMPY_AVAILABLE:
+            # Puntuación vectorizada + selección top-k con argpartition
+            return rank_cars(recommendations, preferences, limit, weights)
+        recommendations = self.add_similarity_score(recommendations, preferences, weights)
+        return recommendations[:limit]
+    
+    def build_recommendation_query(self, preferences: Dict) -> tuple:
+        """Elegir la plantilla Cypher precompilada según los filtros presentes"""
+        return RECOMMENDATION_QUERIES.build(preferences, {
+            'min_price': preferences['min_price'],
+            'max_price': preferences['max_price'],
+            'candidate_limit': CANDIDATE_LIMIT
+        })
+    
+    def build_scored_recommendation_query(self, preferences: Dict, k: int = RECOMMENDATION_LIMIT,
+                                          weights: Optional[Dict] = None) -> tuple:
+        """Plantilla que puntúa, ordena y recorta a k dentro de Neo4j"""
+        base_parameters = score_parameters(preferences, weights)
+        base_parameters.update({
+            'min_price': preferences['min_price'],
+            'k': k
+        })
+        return SCORED_RECOMMENDATION_QUERIES.build(preferences, base_parameters)
+    
+    def build_relaxed_recommendation_query(self, preferences: Dict, k: int = RECOMMENDATION_LIMIT,
+                                           weights: Optional[Dict] = None) -> tuple:
+        """Consulta de relajación progresiva (ver relaxation.py)"""
+        parameters = score_parameters(preferences, weights)
+        relaxed_min_price, relaxed_max_price = widened_budget(preferences)
+        parameters.update({
+            'min_price': preferences['min_price'],
+            'relaxed_min_price': relaxed_min_price,
+            'relaxed_max_price': relaxed_max_price,
+            'k': k
+        })
+        return RELAXED_RECOMMENDATION_QUERY, parameters
+    
+    def cars_from_relaxed_records(self, records, preferences: Dict) -> List[Dict]:
+        """Autos del primer nivel de relajación (los registros vienen ordenados por nivel)"""
+        if not records:
+            return []
+        level = records[0]['relaxation_level']
+        cars = [self.car_from_query_record(record) for record in records
+                if record['relaxation_level'] == level]
+        return annotate(cars, level, preferences)
+    
+    @staticmethod
+    def car_from_query_record(record) -> Dict[str, Any]:
+        """Auto de un registro de consulta de recomendaciones (con su puntuación si la trae)"""
+        car_data = car_from_record(record)
+        # Las consultas puntuadas en el servidor ya traen la puntuación
+        if 'similarity_score' in record.keys():
+            car_data['similarity_score'] = record['similarity_score']
+        return car_data
+    
+
+def _rank_profiles(work: tuple) -> List[List[Dict]]:
+    """Puntuar los candidatos de un bloque de perfiles (se ejecuta en el pool de procesos)"""
+    k, weights, items = work
+    ranker = RecommenderBase()
+    return [ranker.rank_recommendations(candidates, preferences, k, weights)
+            for preferences, candidates in items]
+
+class CarRecommender(RecommenderBase):
+    def __init__(self, uri: Optional[str] = None, user: Optional[str] = None, password: Optional[str] = None,
+                 use_catalog_engine: bool = False):
+        """
+        Inicializar conexión a Neo4j
+        
+        Args:
+            uri, user, password: Omitidos se toman de las variables NEO4J_* (ver db.py)
+            use_catalog_engine: Cargar el catálogo en memoria y resolver las consultas sin Neo4j
+        """
+        self.catalog_engine = None
+        self.similarity_index = None
+        self.precomputed = None
+        self.cache = RecommendationCache()
+        try:
+            self.driver = create_driver(uri, user, password)
+            # Verificar conexión
+            self.driver.verify_connectivity()
+            logger.info("Conexión exitosa a Neo4j")
+        except Exception as e:
+            logger.error(f"Error conectando a Neo4j: {e}")
+            raise
+        self.statistics = StatisticsService(self.driver, price_summary=self.catalog_price_summary)
+        
+        self.load_vocabulary()
+        self.warm_up_queries()
+        if use_catalog_engine:
+            self.enable_catalog_engine()
+        self.build_similarity_index()
+        self.load_precomputed()
+    
+    def enable_catalog_engine(self) -> bool:
+        """Cargar el catálogo en memoria; si no es posible se sigue usando Neo4j"""
+        if not NUMPY_AVAILABLE:
+            logger.warning("NumPy no está instalado, se usará Neo4j para cada consulta")
+            return False
+        try:
+            engine = CatalogEngine(self.driver)
+            engine.load()
+            self.catalog_engine = engine
+            return True
+        except Exception as e:
+            logger.error(f"No se pudo cargar el catálogo en memoria: {e}")
+            self.catalog_engine = None
+            return False
+    
+    def catalog_price_summary(self) -> Optional[Dict[str, Any]]:
+        """Resumen de precios del catálogo en memoria para las estadísticas (None si no está cargado)"""
+        if self.catalog_engine is None or not self.catalog_engine.is_loaded:
+            return None
+        return self.catalog_engine.price_summary()
+    
+    def load_vocabulary(self) -> bool:
+        """Cargar el vocabulario de facetas; sin él se usan los valores por defecto"""
+        try:
+            VOCABULARY.load(self.driver)
+            return True
+        except Exception as e:
+            logger.error(f"No se pudo cargar el vocabulario: {e}")
+            return False
+    
+    def refresh_catalog(self):
+        """Recargar el catálogo en memoria tras un cambio en la base de datos"""
+        VOCABULARY.refresh(self.driver)
+        if self.catalog_engine is not None:
+            self.catalog_engine.refresh()
+        self.cache.invalidate()
+        self.statistics.invalidate()
+        self._check_precomputed()
+    
+    def build_similarity_index(self) -> bool:
+        """Construir el índice de autos similares desde el catálogo en memoria (o Neo4j si no está cargado)"""
+        if not NUMPY_AVAILABLE:
+            return False
+        try:
+            started = time.perf_counter()
+            if self.catalog_engine is not None and self.catalog_engine.is_loaded:
+                records = self.catalog_engine.snapshot.records
+            else:
+                records = [record.data() for record in read_query(self.driver, CATALOG_QUERY)]
+            self.similarity_index = SimilarityIndex(records)
+            logger.info(f"Índice de similares: {len(self.similarity_index)} autos "
+                        f"en {(time.perf_counter() - started) * 1000:.1f} ms")
+            return True
+        except Exception as e:
+            logger.error(f"No se pudo construir el índice de similares: {e}")
+            self.similarity_index = None
+            return False
+    
+    def update_similarity_index(self, event: str, car_id):
+        """Aplicar al índice de similares el alta, cambio o baja de un auto"""
+        if self.similarity_index is None or car_id is None:
+            return
+        if event == 'delete':
+            self.similarity_index.remove(car_id)
+            return
+        rows = read_query(self.driver, CATALOG_CAR_QUERY, {'id': car_id})
+        if rows:
+            self.similarity_index.upsert(rows[0].data())
+        else:
+            self.similarity_index.remove(car_id)
+    
+    def get_similar_cars(self, car_id, k: int = SIMILAR_LIMIT) -> Optional[List[Dict]]:
+        """Los k autos más parecidos a car_id; None si el auto no existe o no hay índice"""
+        if self.similarity_index is None:
+            return None
+        return self.similarity_index.similar(car_id, k)
+    
+    def load_precomputed(self, path=PRECOMPUTED_PATH) -> bool:
+        """Cargar las recomendaciones precalculadas si existe el archivo"""
+        self.precomputed = PrecomputedRecommendations.load(path)
+        self._check_precomputed()
+        return self.precomputed is not None
+    
+    def _check_precomputed(self):
+        """
+        Descartar los resultados precalculados si no corresponden al catálogo actual
+
+        La huella se compara con la instantánea del catálogo en memoria; sin ella
+        no hay forma de detectar un archivo obsoleto tras refresh_catalog, así que
+        tampoco se sirven.
+        """
+        if self.precomputed is None:
+            return
+        if self.catalog_engine is None or not self.catalog_engine.is_loaded:
+            logger.warning("Sin catálogo en memoria no se puede verificar el archivo precalculado, se ignora")
+            self.precomputed = None
+            return
+        if self.precomputed.catalog_fingerprint != self.catalog_engine.snapshot.fingerprint:
+            logger.warning("Las recomendaciones precalculadas no corresponden al catálogo actual, se ignoran")
+            self.precomputed = None
+    
+    def invalidate_cache(self, brands=None, budget=None, fuel=None, types=None, transmission=None):
+        """
+        Invalidar resultados en caché
+        
+        Sin argumentos invalida toda la caché; con preferencias, solo esa combinación.
+        """
+        if not any([brands, budget, fuel, types, transmission]):
+            self.cache.invalidate()
+            return
+        preferences = self.normalize_preferences(brands, budget, fuel, types, transmission)
+        self.cache.invalidate(RecommendationCache.make_key(preferences))
+    
+    def close(self):
+        """Cerrar conexión"""
+        if hasattr(self, 'driver'):
+            self.driver.close()
+    
+    def warm_up_queries(self) -> List[Dict[str, Any]]:
+        """Ejecutar EXPLAIN sobre todas las formas de consulta para calentar los planes"""
+        try:
+            compiler = SCORED_RECOMMENDATION_QUERIES if SERVER_SIDE_SCORING else RECOMMENDATION_QUERIES
+            return compiler.warm_up(self.driver)
+        except Exception as e:
+            logger.error(f"Error precalentando consultas: {e}")
+            return []
+    
+    def iter_recommendation_query(self, query: str, parameters: Dict) -> Iterator[Dict]:
+        """
+        Ejecutar consulta de recomendaciones entregando cada auto al llegar su registro
+        
+        Recorre el iterador perezoso del resultado sin acumularlo; la sesión
+        (enrutada a lectores) permanece abierta hasta agotar el generador.
+        Los errores se propagan.
+        """
+        with read_session(self.driver) as session:
+            for record in session.run(query, parameters):
+                yield self.car_from_query_record(record)
+    
+    def fetch_recommendations(self, query: str, parameters: Dict, timeout: Optional[float] = None) -> List[Dict]:
+        """Ejecutar consulta de recomendaciones acotada a `timeout` segundos; los errores se propagan"""
+        records = read_query(self.driver, query, parameters, timeout)
+        return [self.car_from_query_record(record) for record in records]
+    
+    def execute_recommendation_query(self, query: str, parameters: Dict) -> List[Dict]:
+        """Ejecutar consulta de recomendaciones"""
+        try:
+            return self.fetch_recommendations(query, parameters)
+        except Exception as e:
+            logger.error(f"Error ejecutando consulta de recomendaciones: {e}")
+            logger.error(f"Query: {query}")
+            logger.error(f"Parameters: {parameters}")
+            return []
+    
+    def get_recommendations(self, brands=None, budget=None, fuel=None, types=None, transmission=None,
+                            k: int = RECOMMENDATION_LIMIT, weights: Optional[Dict] = None,
+                            deadline: Optional[Deadline] = None) -> List[Dict]:
         """
         Obtener recomendaciones de autos basadas en preferencias del usuario
         
@@ -249,129 +530,624 @@ class CarRecommender:
             fuel: Tipo de combustible preferido
             types: Lista de tipos de vehículo preferidos
             transmission: Tipo de transmisión preferida
+            k: Número de recomendaciones a devolver
+            weights: Pesos de puntuación que sustituyen a scoring.DEFAULT_WEIGHTS
+            deadline: Plazo de la petición (ver get_recommendations_with_tier)
         
         Returns:
             Lista de diccionarios con recomendaciones de autos
         """
+        recommendations, _ = self.get_recommendations_with_tier(brands, budget, fuel, types, transmission,
+                                                                k, weights, deadline)
+        return recommendations
+    
+    def get_recommendations_with_tier(self, brands=None, budget=None, fuel=None, types=None, transmission=None,
+                                      k: int = RECOMMENDATION_LIMIT, weights: Optional[Dict] = None,
+                                      deadline: Optional[Deadline] = None,
+                                      timing: Optional[ServerTiming] = None) -> tuple:
+        """
+        Igual que get_recommendations, indicando además qué nivel respondió
+        
+        Los niveles se prueban del más barato al más caro: 'cache', 'precomputed',
+        'memory' (catálogo en memoria) y 'neo4j'. La consulta a Neo4j recibe el
+        tiempo restante del plazo como timeout de transacción y de espera por
+        conexión; si queda menos de MIN_QUERY_SECONDS, o la consulta falla o
+        vence, se sirve 'fallback' (datos de respaldo, que no se guardan en caché).
+        El tiempo de cada fase (normalize, query, scoring) se acumula en `timing`.
+        
+        Returns:
+            Tupla (recomendaciones, nivel)
+        """
         try:
-            # Log de entrada para debugging
-            logger.info("=== GENERANDO RECOMENDACIONES ===")
-            logger.info(f"Brands: {brands}")
-            logger.info(f"Budget: {budget}")
-            logger.info(f"Fuel: {fuel}")
-            logger.info(f"Types: {types}")
-            logger.info(f"Transmission: {transmission}")
+            deadline = deadline or Deadline()
+            timing = timing or ServerTiming()
+            logger.debug("Generando recomendaciones: brands=%s budget=%s fuel=%s types=%s transmission=%s",
+                         brands, budget, fuel, types, transmission)
             
             # Normalizar preferencias
-            preferences = self.normalize_preferences(brands, budget, fuel, types, transmission)
-            logger.info(f"Preferencias normalizadas: {preferences}")
+            with timing.phase('normalize'):
+                preferences = self.normalize_preferences(brands, budget, fuel, types, transmission)
+                cache_key = RecommendationCache.make_key(preferences, k, weights)
+            logger.debug("Preferencias normalizadas: %s", preferences)
             
-            # Construir y ejecutar consulta
-            query, parameters = self.build_recommendation_query(preferences)
-            logger.info(f"Query generada: {query}")
-            logger.info(f"Parámetros: {parameters}")
+            with timing.phase('query'):
+                cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.debug("Devolviendo %d recomendaciones desde caché", len(cached))
+                return cached, 'cache'
             
-            # Ejecutar consulta
-            recommendations = self.execute_recommendation_query(query, parameters)
-            logger.info(f"Encontradas {len(recommendations)} recomendaciones iniciales")
+            if self.precomputed is not None:
+                # Las entradas vacías siguen de largo para pasar por la relajación de filtros
+                with timing.phase('query'):
+                    precomputed = self.precomputed.lookup(cache_key)
+                if precomputed:
+                    logger.debug("Devolviendo %d recomendaciones precalculadas", len(precomputed))
+                    return precomputed, 'precomputed'
             
-            # Agregar puntuación de similitud
-            if recommendations:
-                recommendations = self.add_similarity_score(recommendations, preferences)
-                logger.info(f"Recomendaciones ordenadas por similitud")
+            if self.catalog_engine is not None and self.catalog_engine.is_loaded:
+                # Resolver desde el catálogo en memoria: se puntúan todos los candidatos
+                # sobre las columnas de la instantánea y solo se hidratan los k mejores
+                recommendations, tier = self.catalog_engine.rank(preferences, k, weights, timing), 'memory'
+                if not recommendations:
+                    with timing.phase('scoring'):
+                        recommendations = self.catalog_engine.relax(preferences, k, weights)
+            elif not deadline.allows(MIN_QUERY_SECONDS):
+                logger.warning(f"Plazo casi agotado ({deadline.remaining():.3f} s): se omite Neo4j")
+                return self.fallback_recommendations(brands, budget, fuel, types, transmission, k), 'fallback'
+            elif not NEO4J_BREAKER.allow():
+                logger.warning("Circuito de Neo4j abierto: se omite Neo4j")
+                return self.fallback_recommendations(brands, budget, fuel, types, transmission, k), 'fallback'
+            else:
+                try:
+                    recommendations = self.query_recommendations(preferences, k, weights,
+                                                                 deadline.remaining(), timing)
+                    if not recommendations and deadline.allows(MIN_QUERY_SECONDS):
+                        with timing.phase('query'):
+                            recommendations = self.query_relaxed_recommendations(preferences, k, weights,
+                                                                                 deadline.remaining())
+                    tier = 'neo4j'
+                    NEO4J_BREAKER.record_success()
+                except UNAVAILABLE_ERRORS as e:
+                    NEO4J_BREAKER.record_failure()
+                    logger.error(f"Neo4j no disponible: {e}")
+                    return self.fallback_recommendations(brands, budget, fuel, types, transmission, k), 'fallback'
+                except Exception as e:
+                    # Un plazo vencido cuenta como fallo; un error de la consulta no dice
+                    # nada de la disponibilidad y solo libera la prueba del circuito
+                    if is_timeout(e):
+                        NEO4J_BREAKER.record_failure()
+                        logger.error(f"Neo4j no respondió a tiempo: {e}")
+                    else:
+                        NEO4J_BREAKER.record_neutral()
+                        logger.error(f"Error en la consulta de recomendaciones: {e}")
+                    return self.fallback_recommendations(brands, budget, fuel, types, transmission, k), 'fallback'
             
-            # Limitar a máximo 10 recomendaciones
-            recommendations = recommendations[:10]
+            # Las listas vacías pueden deberse a un error de consulta: no se guardan
+            if recommendations:
+                self.cache.put(cache_key, recommendations)
+                if 'relaxed_constraints' in recommendations[0]:
+                    logger.debug("Sin coincidencias exactas; restricciones relajadas: %s",
+                                 recommendations[0]['relaxed_constraints'])
             
-            logger.info(f"Devolviendo {len(recommendations)} recomendaciones finales")
-            return recommendations
+            logger.debug("Devolviendo %d recomendaciones finales (%s)", len(recommendations), tier)
+            return recommendations, tier
             
         except Exception as e:
             logger.error(f"Error general en get_recommendations: {e}")
-            return []
+            return [], 'error'
+    
+    def query_recommendations(self, preferences: Dict, k: int = RECOMMENDATION_LIMIT,
+                              weights: Optional[Dict] = None, timeout: Optional[float] = None,
+                              timing: Optional[ServerTiming] = None) -> List[Dict]:
+        """Resolver las recomendaciones en Neo4j dentro de `timeout` segundos; los errores se propagan"""
+        timing = timing or ServerTiming()
+        if SERVER_SIDE_SCORING:
+            # Neo4j puntúa, ordena y recorta a k
+            query, parameters = self.build_scored_recommendation_query(preferences, k, weights)
+            logger.debug("Query generada: %s\nParámetros: %s", query, parameters)
+            with timing.phase('query'):
+                return self.fetch_recommendations(query, parameters, timeout)
+        
+        # Construir y ejecutar consulta
+        query, parameters = self.build_recommendation_query(preferences)
+        logger.debug("Query generada: %s\nParámetros: %s", query, parameters)
+        with timing.phase('query'):
+            recommendations = self.fetch_recommendations(query, parameters, timeout)
+        logger.debug("Encontradas %d recomendaciones iniciales", len(recommendations))
+        
+        # Agregar puntuación de similitud y limitar a k recomendaciones
+        with timing.phase('scoring'):
+            return self.rank_recommendations(recommendations, preferences, k, weights)
+    
+    def query_relaxed_recommendations(self, preferences: Dict, k: int = RECOMMENDATION_LIMIT,
+                                      weights: Optional[Dict] = None, timeout: Optional[float] = None) -> List[Dict]:
+        """Relajación progresiva en Neo4j, en una sola consulta; los errores se propagan"""
+        query, parameters = self.build_relaxed_recommendation_query(preferences, k, weights)
+        return self.cars_from_relaxed_records(read_query(self.driver, query, parameters, timeout), preferences)
+    
+    @staticmethod
+    def fallback_recommendations(brands=None, budget=None, fuel=None, types=None, transmission=None,
+                                 k: int = RECOMMENDATION_LIMIT) -> List[Dict]:
+        """Datos de respaldo recortados a k (ver get_fallback_recommendations)"""
+        return get_fallback_recommendations(brands, budget, fuel, types, transmission)[:k]
+    
+    def stream_recommendations(self, brands=None, budget=None, fuel=None, types=None, transmission=None,
+                               k: int = RECOMMENDATION_LIMIT, weights: Optional[Dict] = None) -> Iterator[Dict]:
+        """
+        Versión en flujo de get_recommendations: entrega cada auto puntuado en cuanto está listo
+        
+        Con puntuación en el servidor, Neo4j ya devuelve los autos en orden de
+        puntuación y cada registro se entrega al llegar. Caché, precalculados y
+        catálogo en memoria responden sin esperar a la red, así que se entregan
+        de una vez. Solo se guarda en caché un resultado recorrido por completo.
+        """
+        preferences = self.normalize_preferences(brands, budget, fuel, types, transmission)
+        cache_key = RecommendationCache.make_key(preferences, k, weights)
+        
+        recommendations = self.cache.get(cache_key)
+        if recommendations is None and self.precomputed is not None:
+            # Las entradas vacías siguen de largo para pasar por la relajación de filtros
+            recommendations = self.precomputed.lookup(cache_key) or None
+        if recommendations is not None:
+            yield from recommendations
+            return
+        
+        if self.catalog_engine is not None and self.catalog_engine.is_loaded:
+            recommendations = (self.catalog_engine.rank(preferences, k, weights)
+                               or self.catalog_engine.relax(preferences, k, weights))
+            if recommendations:
+                self.cache.put(cache_key, recommendations)
+            yield from recommendations
+            return
+        
+        if not SERVER_SIDE_SCORING:
+            # La puntuación en Python necesita todos los candidatos antes del primer auto
+            yield from self.get_recommendations(brands, budget, fuel, types, transmission, k, weights)
+            return
+        
+        query, parameters = self.build_scored_recommendation_query(preferences, k, weights)
+        streamed = []
+        for car in self.iter_recommendation_query(query, parameters):
+            streamed.append(car)
+            yield car
+        if not streamed:
+            # Sin coincidencias exactas: relajación progresiva en una sola consulta
+            streamed = self.query_relaxed_recommendations(preferences, k, weights)
+            yield from streamed
+        if streamed:
+            self.cache.put(cache_key, streamed)
+        logger.debug("Entregadas %d recomendaciones en flujo", len(streamed))
+    
+    def get_recommendations_page(self, brands=None, budget=None, fuel=None, types=None, transmission=None,
+                                 sort: str = 'score_desc', page_size: int = RECOMMENDATION_LIMIT,
+                                 cursor: Optional[str] = None, weights: Optional[Dict] = None) -> Dict[str, Any]:
+        """
+        Página de recomendaciones con paginación por cursor (keyset)
+        
+        Args:
+            sort: Uno de pagination.SORT_ORDERS (price_asc, price_desc, year_desc, score_desc)
+            page_size: Autos por página
+            cursor: Token next_cursor de la página anterior (None = primera página)
+        
+        Returns:
+            {'results': [...], 'next_cursor': token o None, 'sort': sort}
+        
+        Raises:
+            ValueError: si el orden o el cursor no son válidos para esta consulta
+        """
+        validate_sort(sort)
+        preferences = self.normalize_preferences(brands, budget, fuel, types, transmission)
+        digest = query_digest({'preferences': preferences, 'weights': resolve_weights(weights)})
+        after = decode_cursor(cursor, sort, digest) if cursor else None
+        
+        # Se pide una fila de más para saber si existe otra página
+        if self.catalog_engine is not None and self.catalog_engine.is_loaded:
+            rows = self.catalog_engine.page(preferences, sort, page_size + 1, after, weights)
+        else:
+            values = dict(preferences, after=after)
+            base_parameters = score_parameters(preferences, weights)
+            base_parameters.update({
+                'min_price': preferences['min_price'],
+                'limit': page_size + 1
+            })
+            query, parameters = PAGED_RECOMMENDATION_QUERIES[sort].build(values, base_parameters)
+            rows = self.execute_recommendation_query(query, parameters)
+        
+        field = API_FIELDS[SORT_ORDERS[sort][0]]
+        results, next_cursor = paginate(rows, page_size, sort, field, digest)
+        return {'results': results, 'next_cursor': next_cursor, 'sort': sort}
+    
+    @staticmethod
+    def batch_profiles(preferences_chunk: List[Dict], weights: Optional[Dict] = None) -> List[Dict]:
+        """Parámetros de cada perfil de un bloque para las consultas BATCH_* (p.index, p.brands...)"""
+        profiles = []
+        for index, preferences in enumerate(preferences_chunk):
+            profile = score_parameters(preferences, weights)
+            profile.update({'index': index, 'min_price': preferences['min_price']})
+            profiles.append(profile)
+        return profiles
+    
+    def fetch_batch_candidates(self, preferences_chunk: List[Dict]) -> Optional[List[List[Dict]]]:
+        """Candidatos de un bloque de preferencias normalizadas con una sola consulta UNWIND (None si falla)"""
+        candidates = [[] for _ in preferences_chunk]
+        try:
+            records = read_query(self.driver, BATCH_CANDIDATE_QUERY, {
+                'profiles': self.batch_profiles(preferences_chunk),
+                'candidate_limit': CANDIDATE_LIMIT
+            })
+            for record in records:
+                candidates[record['profile']].append(car_from_record(record))
+        except Exception as e:
+            logger.error(f"Error obteniendo candidatos de {len(preferences_chunk)} perfiles: {e}")
+            return None
+        return candidates
+    
+    def fetch_batch_recommendations(self, preferences_chunk: List[Dict], k: int = RECOMMENDATION_LIMIT,
+                                    weights: Optional[Dict] = None) -> Optional[List[List[Dict]]]:
+        """Top k de cada perfil de un bloque, puntuado y recortado en Neo4j con una sola consulta (None si falla)"""
+        recommendations = [[] for _ in preferences_chunk]
+        try:
+            records = read_query(self.driver, BATCH_SCORED_RECOMMENDATION_QUERY, {
+                'profiles': self.batch_profiles(preferences_chunk, weights),
+                'k': k
+            })
+            for record in records:
+                recommendations[record['profile']].append(self.car_from_query_record(record))
+        except Exception as e:
+            logger.error(f"Error obteniendo recomendaciones de {len(preferences_chunk)} perfiles: {e}")
+            return None
+        return recommendations
+    
+    def complete_batch(self, preferences_chunk: List[Dict], recommendations: Optional[List[List[Dict]]],
+                       k: int = RECOMMENDATION_LIMIT, weights: Optional[Dict] = None) -> Iterator[List[Dict]]:
+        """
+        Entregar los resultados de un bloque aplicando la relajación progresiva de
+        get_recommendations a los perfiles sin coincidencias exactas
+        
+        recommendations None significa que falló la consulta del bloque: cada perfil
+        recibe una lista vacía (sin datos de respaldo ni relajación).
+        """
+        if recommendations is None:
+            yield from ([] for _ in preferences_chunk)
+            return
+        for preferences, cars in zip(preferences_chunk, recommendations):
+            if not cars:
+                try:
+                    cars = self.query_relaxed_recommendations(preferences, k, weights)
+                except Exception as e:
+                    logger.error(f"Error relajando los filtros de un perfil: {e}")
+            yield cars
+    
+    def get_recommendations_batch(self, profiles: Iterable[Dict], k: int = RECOMMENDATION_LIMIT,
+                                  weights: Optional[Dict] = None, chunk_size: int = BATCH_CHUNK_SIZE,
+                                  processes: Optional[int] = None) -> Iterator[List[Dict]]:
+        """
+        Recomendaciones para muchos perfiles de preferencias (ej. correos nocturnos)
+        
+        Cada perfil recibe lo mismo que get_recommendations sin caché ni
+        precalculados: mismos autos, puntuaciones y orden, y la misma relajación
+        de filtros cuando no hay coincidencias exactas. Los perfiles se leen de
+        forma perezosa en bloques de chunk_size y cada bloque es una sola consulta
+        UNWIND. Con SERVER_SIDE_SCORING Neo4j puntúa y recorta cada perfil; si no,
+        la puntuación se reparte en un pool de procesos mientras se consulta el
+        siguiente bloque. Si la consulta de un bloque falla, sus perfiles reciben
+        listas vacías en lugar de los datos de respaldo.
+        
+        Args:
+            profiles: Iterable de dicts con las claves de PROFILE_FIELDS
+            processes: Procesos del pool (None = núcleos disponibles, 1 = sin pool)
+        
+        Yields:
+            Lista de recomendaciones de cada perfil, en el orden de entrada
+        """
+        profiles = iter(profiles)
+        chunks = iter(lambda: list(itertools.islice(profiles, chunk_size)), [])
+        
+        def normalize(chunk):
+            return [self.normalize_preferences(*(profile.get(name) for name in PROFILE_FIELDS))
+                    for profile in chunk]
+        
+        if self.catalog_engine is not None and self.catalog_engine.is_loaded:
+            # El catálogo en memoria no tiene ida y vuelta: se puntúa vectorizado aquí mismo
+            for chunk in chunks:
+                for preferences in normalize(chunk):
+                    yield (self.catalog_engine.rank(preferences, k, weights)
+                           or self.catalog_engine.relax(preferences, k, weights))
+            return
+        
+        if SERVER_SIDE_SCORING:
+            # Neo4j ya devuelve el top k de cada perfil: no hay puntuación que repartir
+            for chunk in chunks:
+                preferences_chunk = normalize(chunk)
+                recommendations = self.fetch_batch_recommendations(preferences_chunk, k, weights)
+                yield from self.complete_batch(preferences_chunk, recommendations, k, weights)
+            return
+        
+        def ranking_work(preferences_chunk, candidates):
+            return k, weights, list(zip(preferences_chunk, candidates))
+        
+        if processes is not None and processes <= 1:
+            for chunk in chunks:
+                preferences_chunk = normalize(chunk)
+                candidates = self.fetch_batch_candidates(preferences_chunk)
+                ranked = None if candidates is None else _rank_profiles(ranking_work(preferences_chunk, candidates))
+                yield from self.complete_batch(preferences_chunk, ranked, k, weights)
+            return
+        
+        workers = processes or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Cola FIFO de bloques en puntuación: se entregan en el orden de entrada
+            pending = deque()
+            
+            def deliver():
+                preferences_chunk, future = pending.popleft()
+                ranked = None if future is None else future.result()
+                return self.complete_batch(preferences_chunk, ranked, k, weights)
+            
+            for chunk in chunks:
+                preferences_chunk = normalize(chunk)
+                candidates = self.fetch_batch_candidates(preferences_chunk)
+                future = None if candidates is None else executor.submit(
+                    _rank_profiles, ranking_work(preferences_chunk, candidates)
+                )
+                pending.append((preferences_chunk, future))
+                while len(pending) > workers:
+                    yield from deliver()
+            while pending:
+                yield from deliver()
+    
+    def get_selectivity(self, brands=None, budget=None, fuel=None, types=None, transmission=None) -> Dict[str, Any]:
+        """Cuántos autos cumple cada faceta y su intersección (requiere el catálogo en memoria)"""
+        if self.catalog_engine is None or not self.catalog_engine.is_loaded:
+            return {}
+        preferences = self.normalize_preferences(brands, budget, fuel, types, transmission)
+        return self.catalog_engine.selectivity(preferences)
+    
+    @staticmethod
+    def option_value(step: str, option: str):
+        """Valor del catálogo al que corresponde una opción del asistente (ej. 'suv' -> 'SUV')"""
+        return VOCABULARY.current.canonical(step, option)
+    
+    def get_facet_counts(self, step: str, selections: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Autos que quedarían con cada opción de un paso del asistente
+        
+        Solo cuentan las selecciones de los pasos anteriores. Con el catálogo en
+        memoria sale de los bitsets por faceta; sin él, de una sola agregación en
+        Neo4j (agrupada por valor, o por rango para el presupuesto).
+        
+        Args:
+            step: Paso del asistente ('brands', 'budget', 'fuel', 'types', 'transmission')
+            selections: Paso -> valor guardado en la sesión
+        
+        Returns:
+            Dict con 'step', 'counts' (opción -> autos) y 'source' ('memory', 'neo4j' o 'unavailable')
+        """
+        steps = [name for name, _ in WIZARD_STEPS]
+        options = dict(WIZARD_STEPS)[step]
+        previous = {name: selections.get(name) for name in steps[:steps.index(step)]}
+        preferences = self.normalize_preferences(**previous)
+        
+        if self.catalog_engine is not None and self.catalog_engine.is_loaded:
+            if step == 'budget':
+                counts = self.catalog_engine.budget_counts(
+                    preferences, {option: self.parse_budget_range(option) for option in options})
+            else:
+                by_value = self.catalog_engine.facet_counts(preferences, step)
+                counts = {option: by_value.get(self.option_value(step, option), 0) for option in options}
+            return {'step': step, 'counts': counts, 'source': 'memory'}
+        
+        if not NEO4J_BREAKER.allow():
+            return {'step': step, 'counts': {}, 'source': 'unavailable'}
+        try:
+            counts = self.query_facet_counts(step, options, preferences)
+            NEO4J_BREAKER.record_success()
+            return {'step': step, 'counts': counts, 'source': 'neo4j'}
+        except UNAVAILABLE_ERRORS as e:
+            NEO4J_BREAKER.record_failure()
+            logger.error(f"Neo4j no disponible para conteos: {e}")
+        except Exception as e:
+            if is_timeout(e):
+                NEO4J_BREAKER.record_failure()
+            else:
+                NEO4J_BREAKER.record_neutral()
+            logger.error(f"Error contando opciones de '{step}': {e}")
+        return {'step': step, 'counts': {}, 'source': 'unavailable'}
+    
+    def query_facet_counts(self, step: str, options: List[str], preferences: Dict) -> Dict[str, int]:
+        """Conteos de un paso en una sola consulta a Neo4j; los errores se propagan"""
+        if step == 'budget':
+            ranges = [list(self.parse_budget_range(option)) for option in options]
+            query, parameters = BUDGET_COUNT_QUERIES.build(preferences, {'budget_ranges': ranges})
+            records = read_query(self.driver, query, parameters, timeout=FACET_QUERY_TIMEOUT)
+            return dict(zip(options, records[0]['autos'])) if records else {option: 0 for option in options}
+        
+        query, parameters = FACET_COUNT_QUERIES[step].build(preferences, {
+            'min_price': preferences['min_price'], 'max_price': preferences['max_price']
+        })
+        by_value = {record['valor']: record['autos']
+                    for record in read_query(self.driver, query, parameters, timeout=FACET_QUERY_TIMEOUT)}
+        return {option: by_value.get(self.option_value(step, option), 0) for option in options}
     
     def get_statistics(self) -> Dict[str, Any]:
-        """Obtener estadísticas de la base de datos"""
+        """Obtener estadísticas de la base de datos (en caché, ver catalog_statistics.py)"""
         try:
-            with self.driver.session() as session:
-                stats = {}
-                
-                # Contar autos por marca
-                result = session.run("""
-                    MATCH (a:Auto)-[:ES_MARCA]->(m:Marca)
-                    RETURN m.nombre as marca, count(a) as cantidad
-                    ORDER BY cantidad DESC
-                """)
-                stats['cars_by_brand'] = [dict(record) for record in result]
-                
-                # Contar autos por tipo
-                result = session.run("""
-                    MATCH (a:Auto)-[:ES_TIPO]->(t:Tipo)
-                    RETURN t.categoria as tipo, count(a) as cantidad
-                    ORDER BY cantidad DESC
-                """)
-                stats['cars_by_type'] = [dict(record) for record in result]
-                
-                # Rango de precios
-                result = session.run("""
-                    MATCH (a:Auto)
-                    RETURN min(a.precio) as precio_min, max(a.precio) as precio_max, avg(a.precio) as precio_promedio
-                """)
-                price_stats = result.single()
-                stats['price_range'] = {
-                    'min': price_stats['precio_min'],
-                    'max': price_stats['precio_max'],
-                    'average': round(price_stats['precio_promedio'], 2)
-                }
-                
-                # Total de autos
-                result = session.run("MATCH (a:Auto) RETURN count(a) as total")
-                stats['total_cars'] = result.single()['total']
-                
-                return stats
-                
+            return self.statistics.get()
+            
         except Exception as e:
             logger.error(f"Error obteniendo estadísticas: {e}")
             return {}
 
 # Instancia global del recomendador
 _recommender_instance = None
+_instance_lock = threading.Lock()
+
+# Cortocircuito compartido por la conexión inicial y las consultas a Neo4j
+NEO4J_BREAKER = CircuitBreaker('neo4j', BREAKER_FAILURE_THRESHOLD, BREAKER_BASE_BACKOFF, BREAKER_MAX_BACKOFF)
 
-def get_recommender_instance():
-    """Obtener instancia singleton del recomendador"""
+def get_recommender_instance(wait: bool = False):
+    """
+    Obtener instancia singleton del recomendador
+    
+    Devuelve None sin esperar cuando el circuito de Neo4j está abierto o cuando
+    otro hilo ya está intentando conectar (salvo con wait=True); el llamador
+    usa el camino degradado.
+    """
     global _recommender_instance
-    if _recommender_instance is None:
-        # Configuración de conexión
-        URI = "bolt://localhost:7687"  # Puerto correcto para bolt
-        USER = "neo4j"
-        PASSWORD = "proyectoNEO4J"
-        
+    if _recommender_instance is not None:
+        return _recommender_instance
+    
+    if not _instance_lock.acquire(blocking=wait):
+        return None
+    try:
+        if _recommender_instance is None and NEO4J_BREAKER.allow():
+            # Conexión y pool configurados por variables NEO4J_* (ver db.py)
+            try:
+                _recommender_instance = CarRecommender(use_catalog_engine=USE_CATALOG_ENGINE)
+                NEO4J_BREAKER.record_success()
+            except Exception as e:
+                NEO4J_BREAKER.record_failure()
+                logger.error(f"No se pudo crear instancia del recomendador: {e}")
+                _recommender_instance = None
+    finally:
+        _instance_lock.release()
+    
+    return _recommender_instance
+
+# Estado de la fase de arranque (ver warm_up)
+_warm_up_state = {'state': 'pending', 'started_at': None, 'finished_at': None, 'steps': {}, 'error': None}
+_warm_up_lock = threading.Lock()
+_warm_up_start_lock = threading.Lock()
+_warm_up_thread = None
+
+def warm_up() -> Dict[str, Any]:
+    """
+    Fase de arranque: conectar, precalentar las consultas y cebar la caché
+    
+    Crear la instancia verifica la conexión, ejecuta EXPLAIN sobre las formas
+    de consulta y carga el catálogo en memoria y los precalculados; después se
+    resuelven WARM_UP_PROFILES. Solo se ejecuta una vez: las llamadas
+    concurrentes esperan a la primera y devuelven su resultado.
+    
+    Returns:
+        Estado de preparación (ver get_readiness)
+    """
+    with _warm_up_lock:
+        if _warm_up_state['state'] not in ('pending', 'warming'):
+            return get_readiness()
+        _warm_up_state.update(state='warming', started_at=time.time())
+        steps = _warm_up_state['steps']
         try:
-            _recommender_instance = CarRecommender(URI, USER, PASSWORD)
+            started = time.perf_counter()
+            recommender = get_recommender_instance(wait=True)
+            steps['connect'] = round(time.perf_counter() - started, 3)
+            if recommender is None:
+                raise ConnectionError("No se pudo conectar a Neo4j")
+            
+            started = time.perf_counter()
+            for profile in WARM_UP_PROFILES:
+                recommender.get_recommendations(**profile)
+            steps['prime_cache'] = round(time.perf_counter() - started, 3)
+            
+            _warm_up_state['state'] = 'ready'
+            logger.info(f"Recomendador listo: {steps}")
         except Exception as e:
-            logger.error(f"No se pudo crear instancia del recomendador: {e}")
-            _recommender_instance = None
+            # Se sirve en modo degradado; el cortocircuito decide cuándo reintentar la conexión
+            _warm_up_state.update(state='degraded', error=str(e))
+            logger.error(f"Arranque del recomendador incompleto: {e}")
+        finally:
+            _warm_up_state['finished_at'] = time.time()
+    return get_readiness()
+
+def start_warm_up() -> threading.Thread:
+    """Lanzar warm_up en un hilo de fondo (una sola vez por proceso)"""
+    global _warm_up_thread
+    with _warm_up_start_lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(target=warm_up, name='recommender-warm-up', daemon=True)
+            _warm_up_thread.start()
+    return _warm_up_thread
+
+def get_readiness() -> Dict[str, Any]:
+    """
+    Estado de la fase de arranque
     
-    return _recommender_instance
+    ready es False mientras warm_up no terminó ('pending'/'warming'); al terminar
+    el estado es 'ready' o 'degraded' (sin Neo4j, se sirven respaldos).
+    """
+    state = dict(_warm_up_state, steps=dict(_warm_up_state['steps']))
+    state['ready'] = state['state'] in ('ready', 'degraded')
+    return state
 
-def get_recommendations(brands=None, budget=None, fuel=None, types=None, transmission=None):
+def get_recommendations(brands=None, budget=None, fuel=None, types=None, transmission=None,
+                        k=RECOMMENDATION_LIMIT, weights=None, deadline=None):
     """
     Función principal para obtener recomendaciones (compatibilidad con Flask)
     
     Esta función es llamada directamente desde app.py
     """
+    recommendations, _ = get_recommendations_with_tier(brands, budget, fuel, types, transmission,
+                                                       k, weights, deadline)
+    return recommendations
+
+def get_recommendations_with_tier(brands=None, budget=None, fuel=None, types=None, transmission=None,
+                                  k=RECOMMENDATION_LIMIT, weights=None, deadline=None, timing=None) -> tuple:
+    """Recomendaciones y nivel que las sirvió (ver CarRecommender.get_recommendations_with_tier)"""
     recommender = get_recommender_instance()
     
     if recommender is None:
         logger.error("No hay conexión a Neo4j disponible")
         # Devolver datos de ejemplo si no hay conexión
-        return get_fallback_recommendations(brands, budget, fuel, types, transmission)
+        return get_fallback_recommendations(brands, budget, fuel, types, transmission), 'fallback'
     
     try:
-        return recommender.get_recommendations(brands, budget, fuel, types, transmission)
+        return recommender.get_recommendations_with_tier(brands, budget, fuel, types, transmission,
+                                                         k, weights, deadline, timing)
     except Exception as e:
         logger.error(f"Error en get_recommendations: {e}")
-        return get_fallback_recommendations(brands, budget, fuel, types, transmission)
+        return get_fallback_recommendations(brands, budget, fuel, types, transmission), 'fallback'
+
+def stream_recommendations(brands=None, budget=None, fuel=None, types=None, transmission=None,
+                           k=RECOMMENDATION_LIMIT, weights=None) -> Iterator[Dict]:
+    """
+    Generador de recomendaciones para el endpoint NDJSON de app.py
+    
+    Los errores a mitad del flujo se propagan: el llamador ya envió autos y
+    decide cómo avisar al cliente.
+    """
+    recommender = get_recommender_instance()
+    
+    if recommender is None:
+        logger.error("No hay conexión a Neo4j disponible")
+        yield from get_fallback_recommendations(brands, budget, fuel, types, transmission)
+        return
+    
+    yield from recommender.stream_recommendations(brands, budget, fuel, types, transmission, k, weights)
+
+def get_recommendations_page(brands=None, budget=None, fuel=None, types=None, transmission=None,
+                             sort='score_desc', page_size=RECOMMENDATION_LIMIT, cursor=None, weights=None):
+    """Página de recomendaciones para app.py; ValueError si el orden o el cursor no son válidos"""
+    recommender = get_recommender_instance()
+    
+    if recommender is None:
+        logger.error("No hay conexión a Neo4j disponible")
+        return {'results': [], 'next_cursor': None, 'sort': sort}
+    
+    return recommender.get_recommendations_page(brands, budget, fuel, types, transmission,
+                                                sort, page_size, cursor, weights)
+
+def get_recommendations_batch(profiles, k=RECOMMENDATION_LIMIT, weights=None,
+                              chunk_size=BATCH_CHUNK_SIZE, processes=None) -> Iterator[List[Dict]]:
+    """Recomendaciones de muchos perfiles, en el orden de entrada (ver CarRecommender.get_recommendations_batch)"""
+    recommender = get_recommender_instance()
+    
+    if recommender is None:
+        logger.error("No hay conexión a Neo4j disponible")
+        for profile in profiles:
+            yield get_fallback_recommendations(*(profile.get(name) for name in PROFILE_FIELDS))
+        return
+    
+    yield from recommender.get_recommendations_batch(profiles, k, weights, chunk_size, processes)
 
 def get_fallback_recommendations(brands=None, budget=None, fuel=None, types=None, transmission=None):
     """Recomendaciones de respaldo cuando Neo4j no está disponible"""
@@ -426,24 +1202,25 @@ def get_fallback_recommendations(brands=None, budget=None, fuel=None, types=None
     # Filtrar datos de ejemplo basados en preferencias básicas
     filtered_cars = []
     
+    vocabulary = VOCABULARY.current
+    brand_list = vocabulary.canonical_list('brands', brands)
+    type_list = vocabulary.canonical_list('types', types)
+    fuel_list = vocabulary.canonical_list('fuel', fuel)
+    
     for car in fallback_cars:
         include_car = True
         
         # Filtro básico por marca
-        if brands:
-            brand_list = brands if isinstance(brands, list) else list(brands.values()) if isinstance(brands, dict) else [brands]
-            if car["brand"] not in brand_list:
-                include_car = False
+        if brand_list and vocabulary.canonical('brands', car["brand"]) not in brand_list:
+            include_car = False
         
         # Filtro básico por tipo
-        if types and isinstance(types, list):
-            if car["type"] not in types:
-                include_car = False
+        if type_list and car["type"] not in type_list:
+            include_car = False
         
         # Filtro básico por combustible
-        if fuel and isinstance(fuel, str):
-            if car["fuel"].lower() != fuel.lower():
-                include_car = False
+        if fuel_list and car["fuel"] not in fuel_list:
+            include_car = False
         
         if include_car:
             filtered_cars.append(car)
@@ -458,6 +1235,53 @@ def get_database_statistics():
         return recommender.get_statistics()
     return {}
 
+def refresh_catalog():
+    """Recargar el catálogo en memoria del recomendador activo"""
+    if _recommender_instance:
+        _recommender_instance.refresh_catalog()
+
+def on_catalog_change(event=None, car_id=None):
+    """
+    Listener para cambios del catálogo (ver Gestionador.add_change_listener)
+    
+    Recarga el catálogo en memoria, invalida la caché de resultados y actualiza
+    solo la fila del auto afectado en el índice de similares. Sin recomendador
+    activo en el proceso no hay nada que invalidar.
+    """
+    recommender = _recommender_instance
+    if recommender is None:
+        return
+    logger.info(f"Cambio en el catálogo ({event}: {car_id}), invalidando caché")
+    recommender.refresh_catalog()
+    try:
+        recommender.update_similarity_index(event, car_id)
+    except Exception as e:
+        logger.error(f"Error actualizando el índice de similares: {e}")
+
+def get_facet_counts(step: str, selections: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Conteos por opción de un paso del asistente para app.py; None si no hay recomendador"""
+    recommender = get_recommender_instance()
+    if recommender is None:
+        return None
+    return recommender.get_facet_counts(step, selections)
+
+def get_similar_cars(car_id, k=SIMILAR_LIMIT) -> Optional[List[Dict]]:
+    """Autos similares para app.py; None si el auto no existe o el índice no está disponible"""
+    recommender = get_recommender_instance()
+    if recommender is None:
+        return None
+    return recommender.get_similar_cars(car_id, k)
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Contadores de la caché de resultados del recomendador activo"""
+    if _recommender_instance:
+        return _recommender_instance.cache.stats()
+    return {}
+
+def get_breaker_stats() -> Dict[str, Any]:
+    """Estado y contadores del cortocircuito de Neo4j"""
+    return NEO4J_BREAKER.stats()
+
 def test_connection():
     """Probar conexión a Neo4j"""
     try:
@@ -3,21 +3,30 @@
 Sistema de recomendaciones de autos usando Neo4j (versión simplificada para Python 3.13)
 """
 
-from neo4j import GraphDatabase
 import json
+import logging
+
+from db import create_driver, connection_settings
+from vocabulary import VOCABULARY
+
+logger = logging.getLogger(__name__)
 
 class CarRecommender:
     def __init__(self, uri, user, password):
         """Inicializar conexión a Neo4j"""
         try:
-            self.driver = GraphDatabase.driver(uri, auth=(user, password))
+            self.driver = create_driver(uri, user, password)
             # Verificar conexión
             with self.driver.session() as session:
                 session.run("RETURN 1")
-            print("✓ Conexión exitosa a Neo4j")
+            logger.info("Conexión exitosa a Neo4j")
         except Exception as e:
-            print(f"✗ Error conectando a Neo4j: {e}")
+            logger.error(f"Error conectando a Neo4j: {e}")
             raise
+        try:
+            VOCABULARY.load(self.driver)
+        except Exception as e:
+            logger.error(f"No se pudo cargar el vocabulario, se usan los valores por defecto: {e}")
     
     def close(self):
         """Cerrar conexión"""
@@ -35,22 +44,21 @@ class CarRecommender:
             else:
                 return (0, int(budget_str))
         except Exception as e:
-            print(f"Error parseando presupuesto '{budget_str}': {e}")
+            logger.error(f"Error parseando presupuesto '{budget_str}': {e}")
             return (0, 999999999)
     
     def get_recommendations(self, brands=None, budget=None, fuel=None, types=None, transmission=None):
         """Obtener recomendaciones de autos"""
         try:
-            print("=== GENERANDO RECOMENDACIONES ===")
-            print(f"Brands: {brands}")
-            print(f"Budget: {budget}")
-            print(f"Fuel: {fuel}")
-            print(f"Types: {types}")
-            print(f"Transmission: {transmission}")
+            logger.debug("Generando recomendaciones: brands=%s budget=%s fuel=%s types=%s transmission=%s",
+                         brands, budget, fuel, types, transmission)
             
-            # Normalizar entrada
-            if brands and isinstance(brands, dict):
-                brands = list(brands.values())
+            # Normalizar entrada (alias, tildes y mayúsculas, ver vocabulary.py)
+            vocabulary = VOCABULARY.current
+            brands = vocabulary.canonical_list('brands', brands)
+            fuel = vocabulary.canonical_list('fuel', fuel)
+            types = vocabulary.canonical_list('types', types)
+            transmission = vocabulary.canonical_list('transmission', transmission)
             
             if budget:
                 min_price, max_price = self.parse_budget_range(budget)
@@ -76,52 +84,25 @@ class CarRecommender:
                 parameters['brands'] = brands
             
             if fuel:
-                fuel_clean = fuel if isinstance(fuel, str) else fuel[0] if fuel else None
-                if fuel_clean:
-                    fuel_mapping = {
-                        'gasolina': 'Gasolina',
-                        'diesel': 'Diésel', 
-                        'electrico': 'Eléctrico',
-                        'hibrido': 'Híbrido'
-                    }
-                    fuel_clean = fuel_mapping.get(fuel_clean.lower(), fuel_clean)
-                    query += """
-                        MATCH (a)-[:USA_COMBUSTIBLE]->(c:Combustible)
-                        WHERE c.tipo = $fuel
-                    """
-                    parameters['fuel'] = fuel_clean
+                query += """
+                    MATCH (a)-[:USA_COMBUSTIBLE]->(c:Combustible)
+                    WHERE c.tipo IN $fuel
+                """
+                parameters['fuel'] = fuel
             
             if types:
-                if isinstance(types, str):
-                    types = [types]
-                type_mapping = {
-                    'sedan': 'Sedán',
-                    'suv': 'SUV', 
-                    'hatchback': 'Hatchback',
-                    'pickup': 'Pickup',
-                    'coupe': 'Coupé'
-                }
-                types_clean = [type_mapping.get(t.lower(), t) for t in types]
                 query += """
                     MATCH (a)-[:ES_TIPO]->(t:Tipo)
                     WHERE t.categoria IN $types
                 """
-                parameters['types'] = types_clean
+                parameters['types'] = types
             
             if transmission:
-                trans_clean = transmission if isinstance(transmission, str) else transmission[0] if transmission else None
-                if trans_clean:
-                    trans_mapping = {
-                        'automatic': 'Automática',
-                        'automatica': 'Automática',
-                        'manual': 'Manual'
-                    }
-                    trans_clean = trans_mapping.get(trans_clean.lower(), trans_clean)
-                    query += """
-                        MATCH (a)-[:TIENE_TRANSMISION]->(tr:Transmision)
-                        WHERE tr.tipo = $transmission
-                    """
-                    parameters['transmission'] = trans_clean
+                query += """
+                    MATCH (a)-[:TIENE_TRANSMISION]->(tr:Transmision)
+                    WHERE tr.tipo IN $transmission
+                """
+                parameters['transmission'] = transmission
             
             # Completar consulta
             query += """
@@ -137,8 +118,7 @@ class CarRecommender:
                 LIMIT 20
             """
             
-            print(f"Query: {query}")
-            print(f"Parameters: {parameters}")
+            logger.debug("Query: %s\nParameters: %s", query, parameters)
             
             # Ejecutar consulta
             with self.driver.session() as session:
@@ -161,16 +141,16 @@ class CarRecommender:
                     }
                     recommendations.append(car_data)
                 
-                print(f"Encontradas {len(recommendations)} recomendaciones")
+                logger.debug("Encontradas %d recomendaciones", len(recommendations))
                 return recommendations
                 
         except Exception as e:
-            print(f"Error en get_recommendations: {e}")
+            logger.error(f"Error en get_recommendations: {e}")
             return self.get_fallback_recommendations(brands, budget, fuel, types, transmission)
     
     def get_fallback_recommendations(self, brands=None, budget=None, fuel=None, types=None, transmission=None):
         """Recomendaciones de respaldo"""
-        print("Usando recomendaciones de respaldo")
+        logger.warning("Usando recomendaciones de respaldo")
         
         fallback_cars = [
             {
@@ -223,23 +203,24 @@ def get_recommender_instance():
     """Obtener instancia del recomendador"""
     global _recommender_instance
     if _recommender_instance is None:
-        # Configuración específica con tu contraseña
+        # Configuración desde las variables NEO4J_* (ver db.py)
+        settings = connection_settings()
         configs = [
-            {"uri": "bolt://localhost:7687", "user": "neo4j", "password": "estructura"},
+            {"uri": settings["uri"], "user": settings["user"], "password": settings["password"]},
         ]
         
         for config in configs:
             try:
-                print(f"Probando conexión: {config['uri']} con usuario {config['user']}")
+                logger.info(f"Probando conexión: {config['uri']} con usuario {config['user']}")
                 _recommender_instance = CarRecommender(config["uri"], config["user"], config["password"])
-                print(f"✓ Conexión exitosa con configuración: {config}")
+                logger.info(f"Conexión exitosa con {config['uri']}")
                 break
             except Exception as e:
-                print(f"✗ Falló configuración {config}: {e}")
+                logger.warning(f"Falló la conexión con {config['uri']}: {e}")
                 continue
         
         if _recommender_instance is None:
-            print("⚠️ No se pudo conectar a Neo4j, usando modo de respaldo")
+            logger.warning("No se pudo conectar a Neo4j, usando modo de respaldo")
     
     return _recommender_instance
 
@@ -248,13 +229,13 @@ def get_recommendations(brands=None, budget=None, fuel=None, types=None, transmi
     recommender = get_recommender_instance()
     
     if recommender is None:
-        print("No hay conexión a Neo4j, usando datos de ejemplo")
+        logger.warning("No hay conexión a Neo4j, usando datos de ejemplo")
         return CarRecommender(None, None, None).get_fallback_recommendations(brands, budget, fuel, types, transmission)
     
     try:
         return recommender.get_recommendations(brands, budget, fuel, types, transmission)
     except Exception as e:
-        print(f"Error en get_recommendations: {e}")
+        logger.error(f"Error en get_recommendations: {e}")
         return CarRecommender(None, None, None).get_fallback_recommendations(brands, budget, fuel, types, transmission)
 
 def test_connection():
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Relajación progresiva de filtros
+Cuando ningún auto cumple todas las preferencias, las restricciones se
+relajan en orden fijo (transmisión, combustible, tipo, marca y por último el
+presupuesto, ampliado un porcentaje). Cada auto recibe en una sola pasada el
+nivel mínimo de relajación que necesita y se devuelven los mejores del nivel
+más bajo alcanzado, sin repetir la consulta por cada nivel.
+"""
+
+from typing import List, Dict, Any
+
+# Restricciones en el orden en que se relajan; el nivel n relaja las n primeras
+RELAXATION_ORDER = ('transmission', 'fuel', 'types', 'brands', 'budget')
+
+# Ampliación del presupuesto en el último nivel (fracción de cada extremo)
+BUDGET_WIDENING = 0.2
+
+
+def widened_budget(preferences: Dict, widening: float = BUDGET_WIDENING) -> tuple:
+    """Rango de precio del último nivel: (mínimo reducido, máximo ampliado)"""
+    return preferences['min_price'] * (1 - widening), preferences['max_price'] * (1 + widening)
+
+
+def is_active(constraint: str, preferences: Dict) -> bool:
+    """¿El usuario eligió esta restricción? (un presupuesto sin límites no restringe)"""
+    if constraint == 'budget':
+        return preferences['min_price'] > 0 or preferences['max_price'] != float('inf')
+    return bool(preferences.get(constraint))
+
+
+def relaxed_constraints(level: int, preferences: Dict) -> List[str]:
+    """Restricciones elegidas por el usuario que quedan relajadas en un nivel"""
+    return [constraint for constraint in RELAXATION_ORDER[:level] if is_active(constraint, preferences)]
+
+
+def annotate(cars: List[Dict[str, Any]], level: int, preferences: Dict) -> List[Dict[str, Any]]:
+    """Marcar los autos de un nivel relajado con las restricciones que se relajaron"""
+    if level > 0:
+        relaxed = relaxed_constraints(level, preferences)
+        for car in cars:
+            car['relaxed_constraints'] = list(relaxed)
+    return cars
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Reglas de puntuación de similitud compartidas
+Los mismos pesos se usan al puntuar en Python (add_similarity_score), en la
+versión vectorizada sobre arreglos NumPy y en la expresión Cypher que ordena y
+recorta los resultados dentro de Neo4j.
+"""
+
+from typing import List, Dict, Any, Optional
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# Puntos por cada regla (ver RecommenderBase.add_similarity_score)
+DEFAULT_WEIGHTS = {
+    'price': 30,         # Hasta 30 puntos por precio bajo dentro del rango
+    'brand': 25,         # Marca preferida
+    'type': 20,          # Tipo preferido
+    'fuel': 15,          # Combustible preferido
+    'transmission': 10,  # Transmisión preferida
+    'feature': 2,        # Por cada característica
+}
+
+# Expresión Cypher equivalente; requiere los alias a, m, t, c, tr enlazados
+SCORE_EXPRESSION = """(
+    CASE WHEN $score_price THEN (1 - coalesce(a.precio, 0) / toFloat($max_price)) * $w_price ELSE 0 END
+    + CASE WHEN $brands IS NOT NULL AND m.nombre IN $brands THEN $w_brand ELSE 0 END
+    + CASE WHEN $types IS NOT NULL AND t.categoria IN $types THEN $w_type ELSE 0 END
+    + CASE WHEN $fuel IS NOT NULL AND c.tipo IN $fuel THEN $w_fuel ELSE 0 END
+    + CASE WHEN $transmission IS NOT NULL AND tr.tipo IN $transmission THEN $w_transmission ELSE 0 END
+    + size(coalesce(a.caracteristicas, [])) * $w_feature
+)"""
+
+
+def resolve_weights(weights: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """Pesos por defecto sobrescritos por los indicados en la petición"""
+    resolved = dict(DEFAULT_WEIGHTS)
+    if weights:
+        unknown = set(weights) - set(DEFAULT_WEIGHTS)
+        if unknown:
+            raise ValueError(f"Pesos de puntuación desconocidos: {', '.join(sorted(unknown))}")
+        resolved.update({name: float(value) for name, value in weights.items()})
+    return resolved
+
+
+def scores_price(preferences: Dict) -> bool:
+    """La regla de precio solo aplica con un presupuesto máximo finito"""
+    return preferences['max_price'] != float('inf') and preferences['max_price'] > 0
+
+
+def score_parameters(preferences: Dict, weights: Optional[Dict[str, float]] = None) -> Dict:
+    """Parámetros de SCORE_EXPRESSION para unas preferencias normalizadas"""
+    resolved = resolve_weights(weights)
+    parameters = {
+        'score_price': scores_price(preferences),
+        'max_price': preferences['max_price'],
+        'brands': preferences['brands'] or None,
+        'types': preferences['types'] or None,
+        'fuel': preferences['fuel'] or None,
+        'transmission': preferences['transmission'] or None,
+    }
+    parameters.update({f"w_{name}": value for name, value in resolved.items()})
+    return parameters
+
+
+# Distancia a media centésima por debajo de la cual np.round puede diferir de round()
+_HALF_TOLERANCE = 1e-6
+
+
+def round_scores(scores):
+    """
+    Redondear a 2 decimales con el mismo resultado que round() de Python
+
+    np.round multiplica por 100 en coma flotante y redondea al par: 51.775
+    (guardado como 51.77499...) sale 51.78 en lugar de 51.77. Solo pueden
+    diferir los valores que quedan a menos de _HALF_TOLERANCE de media
+    centésima; esos pocos se redondean con round().
+    """
+    rounded = np.round(scores, 2)
+    scaled = scores * 100
+    for position in np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < _HALF_TOLERANCE):
+        rounded[position] = round(float(scores[position]), 2)
+    return rounded
+
+
+def score_vectors(price, brand_match, type_match, fuel_match, transmission_match,
+                  feature_count, preferences: Dict, weights: Optional[Dict[str, float]] = None):
+    """
+    Puntuar un lote de candidatos en una sola pasada vectorizada
+
+    Args:
+        price: Precios de los candidatos
+        brand_match, type_match, fuel_match, transmission_match: Máscaras booleanas
+            de coincidencia con cada preferencia
+        feature_count: Número de características de cada candidato
+
+    Returns:
+        Puntuaciones redondeadas a 2 decimales, igual que add_similarity_score
+    """
+    resolved = resolve_weights(weights)
+    # Mismo orden de sumas que add_similarity_score para obtener los mismos redondeos
+    scores = np.zeros(len(price), dtype=np.float64)
+    if scores_price(preferences):
+        scores += (1 - price / preferences['max_price']) * resolved['price']
+    scores += brand_match * resolved['brand']
+    scores += type_match * resolved['type']
+    scores += fuel_match * resolved['fuel']
+    scores += transmission_match * resolved['transmission']
+    scores += feature_count * resolved['feature']
+    return round_scores(scores)
+
+
+def top_k(scores, k: int):
+    """
+    Posiciones de las k puntuaciones más altas, de mayor a menor
+
+    Selecciona con argpartition (O(n)) y solo ordena los seleccionados. Los
+    empates conservan el orden de entrada, como el sort estable de Python.
+    """
+    n = len(scores)
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        threshold = scores[np.argpartition(-scores, k - 1)[:k]].min()
+        # Incluir todos los empatados con el umbral para que el desempate sea estable
+        selected = np.flatnonzero(scores >= threshold)
+    else:
+        selected = np.arange(n)
+    return selected[np.argsort(-scores[selected], kind='stable')][:k]
+
+
+def rank_cars(cars: List[Dict[str, Any]], preferences: Dict, k: int,
+              weights: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+    """
+    Puntuar autos en formato de la API y devolver los k mejores con similarity_score
+
+    Usado para los candidatos que vienen de Neo4j; el catálogo en memoria
+    llama directamente a score_vectors con sus columnas.
+    """
+    n = len(cars)
+    if n == 0:
+        return []
+    brands = set(preferences['brands'] or ())
+    types = set(preferences['types'] or ())
+    fuels = set(preferences['fuel'] or ())
+    transmissions = set(preferences['transmission'] or ())
+
+    price = np.fromiter((car['price'] for car in cars), dtype=np.float64, count=n)
+    feature_count = np.fromiter((len(car['features'] or ()) for car in cars), dtype=np.float64, count=n)
+    brand_match = np.fromiter((car['brand'] in brands for car in cars), dtype=bool, count=n)
+    type_match = np.fromiter((car['type'] in types for car in cars), dtype=bool, count=n)
+    fuel_match = np.fromiter((car['fuel'] in fuels for car in cars), dtype=bool, count=n)
+    transmission_match = np.fromiter((car['transmission'] in transmissions for car in cars), dtype=bool, count=n)
+
+    scores = score_vectors(price, brand_match, type_match, fuel_match, transmission_match,
+                           feature_count, preferences, weights)
+    ranked = []
+    for position in top_k(scores, k):
+        car = cars[position]
+        car['similarity_score'] = float(scores[position])
+        ranked.append(car)
+    return ranked
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tiempos por fase de una petición (cabecera Server-Timing)
+Igual que Deadline, un ServerTiming se crea al recibir la petición HTTP y se
+pasa hacia abajo; cada capa mide sus fases (normalize, query, scoring,
+serialize) y app.py las devuelve en la cabecera, que el navegador muestra en
+la pestaña de red sin activar logs de depuración.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+# Fases de una petición de recomendaciones, en el orden de la cabecera
+PHASES = ('normalize', 'query', 'scoring', 'serialize')
+
+
+class ServerTiming:
+    """Duración acumulada de cada fase, medida con perf_counter"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        """Medir un bloque; varias mediciones de la misma fase se suman"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def total(self) -> float:
+        """Segundos desde que se creó"""
+        return time.perf_counter() - self.started
+
+    def milliseconds(self) -> Dict[str, float]:
+        """Fases y total en milisegundos (para logs estructurados)"""
+        ordered = sorted(self.phases, key=lambda name: PHASES.index(name) if name in PHASES else len(PHASES))
+        timings = {name: round(self.phases[name] * 1000, 2) for name in ordered}
+        timings['total'] = round(self.total() * 1000, 2)
+        return timings
+
+    def header(self) -> str:
+        """Valor de la cabecera: 'normalize;dur=0.08, query;dur=3.10, ..., total;dur=3.90'"""
+        return ", ".join(f"{name};dur={duration:.2f}" for name, duration in self.milliseconds().items())
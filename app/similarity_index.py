@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Índice k-NN de autos similares en memoria
+Cada Auto se codifica como un vector: one-hot de marca, tipo, combustible y
+transmisión, precio y año normalizados y las características por hashing en
+un número fijo de casillas. Los vecinos se obtienen con una sola operación
+matriz-vector sobre todos los autos (búsqueda exacta), sin recorrer el grafo.
+"""
+
+import threading
+import zlib
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from catalog_engine import FACETS, car_from_record
+
+# Casillas para las características (hashing trick)
+FEATURE_HASH_DIM = 32
+
+# Peso de cada bloque del vector: cuánto pesa en la distancia una diferencia total en él
+BLOCK_WEIGHTS = {
+    'brands': 1.0,
+    'types': 1.0,
+    'fuel': 0.8,
+    'transmission': 0.6,
+    'price': 1.5,
+    'year': 0.7,
+    'features': 0.8,
+}
+
+
+def _feature_bucket(feature: str) -> int:
+    """Casilla estable (entre procesos) de una característica"""
+    return zlib.crc32(feature.strip().lower().encode('utf-8')) % FEATURE_HASH_DIM
+
+
+class SimilarityIndex:
+    """Vectores de todos los autos con altas, cambios y bajas incrementales"""
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        """
+        Args:
+            records: Filas de CATALOG_QUERY; un auto con varias filas se codifica con la primera
+        """
+        self._lock = threading.Lock()
+        self._build(records)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, car_id) -> bool:
+        return car_id in self.positions
+
+    def _build(self, records: List[Dict[str, Any]]):
+        """Codificar todos los autos; fija vocabularios y rangos de normalización"""
+        self.records: Dict[Any, Dict[str, Any]] = {}
+        for record in records:
+            self.records.setdefault(record['id'], record)
+        unique = list(self.records.values())
+
+        self.vocab = {}
+        offset = 0
+        self.offsets = {}
+        for facet, column in FACETS:
+            values = sorted({r[column] for r in unique if r[column] is not None})
+            self.vocab[facet] = {value: i for i, value in enumerate(values)}
+            self.offsets[facet] = offset
+            offset += len(values)
+        self.offsets['price'] = offset
+        self.offsets['year'] = offset + 1
+        self.offsets['features'] = offset + 2
+        self.dim = offset + 2 + FEATURE_HASH_DIM
+
+        prices = [float(r['precio']) for r in unique if r['precio'] is not None]
+        years = [float(r['año']) for r in unique if r['año'] is not None]
+        self.price_range = (min(prices), max(prices)) if prices else (0.0, 1.0)
+        self.year_range = (min(years), max(years)) if years else (0.0, 1.0)
+
+        # Distancia máxima posible: una diferencia total en cada bloque
+        self.max_distance = float(np.sqrt(sum(
+            (2 if name in ('brands', 'types', 'fuel', 'transmission', 'features') else 1) * weight ** 2
+            for name, weight in BLOCK_WEIGHTS.items()
+        )))
+
+        self.ids = [r['id'] for r in unique]
+        self.positions = {car_id: i for i, car_id in enumerate(self.ids)}
+        self.cars = [car_from_record(r) for r in unique]
+        capacity = max(16, len(unique))
+        self.matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        for i, record in enumerate(unique):
+            self.matrix[i] = self._encode(record)
+        self.norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+
+    @staticmethod
+    def _scale(value, bounds: tuple) -> float:
+        low, high = bounds
+        if value is None:
+            return 0.5
+        return (float(value) - low) / (high - low) if high > low else 0.5
+
+    def _encode(self, record: Dict[str, Any]):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for facet, column in FACETS:
+            code = self.vocab[facet].get(record[column])
+            if code is not None:
+                vector[self.offsets[facet] + code] = BLOCK_WEIGHTS[facet]
+        vector[self.offsets['price']] = self._scale(record['precio'], self.price_range) * BLOCK_WEIGHTS['price']
+        vector[self.offsets['year']] = self._scale(record['año'], self.year_range) * BLOCK_WEIGHTS['year']
+
+        features = record['caracteristicas'] or []
+        if features:
+            counts = np.zeros(FEATURE_HASH_DIM, dtype=np.float32)
+            for feature in features:
+                counts[_feature_bucket(feature)] += 1
+            start = self.offsets['features']
+            vector[start:start + FEATURE_HASH_DIM] = counts / np.linalg.norm(counts) * BLOCK_WEIGHTS['features']
+        return vector
+
+    def similar(self, car_id, k: int = 6) -> Optional[List[Dict[str, Any]]]:
+        """
+        Los k autos más cercanos a car_id
+
+        Returns:
+            Autos en el formato de la API con 'similarity' (0-100), o None si car_id no está indexado
+        """
+        with self._lock:
+            position = self.positions.get(car_id)
+            if position is None:
+                return None
+            size = len(self.ids)
+            matrix = self.matrix[:size]
+            query = matrix[position]
+            # |x - q|^2 = |x|^2 + |q|^2 - 2 x·q
+            distances = self.norms[:size] + self.norms[position] - 2.0 * (matrix @ query)
+            distances[position] = np.inf
+            k = min(k, size - 1)
+            if k <= 0:
+                return []
+            nearest = np.argpartition(distances, k - 1)[:k]
+            nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+            results = []
+            for neighbour in nearest:
+                distance = float(np.sqrt(max(distances[neighbour], 0.0)))
+                car = dict(self.cars[neighbour])
+                car['features'] = list(car['features'])
+                car['similarity'] = round(max(0.0, 1 - distance / self.max_distance) * 100, 1)
+                results.append(car)
+            return results
+
+    def upsert(self, record: Dict[str, Any]):
+        """Agregar o reemplazar un auto; un valor de faceta nuevo obliga a recodificar todo"""
+        with self._lock:
+            unknown = any(record[column] is not None and record[column] not in self.vocab[facet]
+                          for facet, column in FACETS)
+            if unknown:
+                self.records[record['id']] = record
+                self._build(list(self.records.values()))
+                return
+            self.records[record['id']] = record
+            position = self.positions.get(record['id'])
+            if position is None:
+                position = len(self.ids)
+                if position == len(self.matrix):
+                    grown = np.zeros((len(self.matrix) * 2, self.dim), dtype=np.float32)
+                    grown[:position] = self.matrix
+                    self.matrix = grown
+                    self.norms = np.resize(self.norms, len(grown))
+                self.ids.append(record['id'])
+                self.cars.append(None)
+                self.positions[record['id']] = position
+            vector = self._encode(record)
+            self.matrix[position] = vector
+            self.norms[position] = float(vector @ vector)
+            self.cars[position] = car_from_record(record)
+
+    def remove(self, car_id):
+        """Quitar un auto moviendo el último a su posición"""
+        with self._lock:
+            position = self.positions.pop(car_id, None)
+            if position is None:
+                return
+            self.records.pop(car_id, None)
+            last = len(self.ids) - 1
+            if position != last:
+                moved = self.ids[last]
+                self.ids[position] = moved
+                self.cars[position] = self.cars[last]
+                self.matrix[position] = self.matrix[last]
+                self.norms[position] = self.norms[last]
+                self.positions[moved] = position
+            self.ids.pop()
+            self.cars.pop()
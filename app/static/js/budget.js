@@ -2,6 +2,9 @@ document.addEventListener('DOMContentLoaded', () => {
   let selectedBudget = null;
   const continueBtn = document.getElementById('continue-btn');
 
+  // Autos disponibles con cada opción según lo elegido en los pasos anteriores
+  loadFacetCounts('budget', '.budget-btn', 'budget');
+
   // Configurar botones de presupuesto
   document.querySelectorAll('.budget-btn').forEach(btn => {
     btn.addEventListener('click', function() {
@@ -0,0 +1,28 @@
+// Conteo de autos por opción en cada paso del asistente (/api/facets)
+// Cada botón recibe "N autos"; las opciones sin resultados se atenúan pero siguen disponibles
+function loadFacetCounts(step, buttonSelector, dataKey) {
+  fetch(`/api/facets?step=${encodeURIComponent(step)}`)
+    .then(response => (response.ok ? response.json() : null))
+    .then(facets => {
+      if (!facets || !facets.counts) {
+        return;
+      }
+
+      document.querySelectorAll(buttonSelector).forEach(btn => {
+        const count = facets.counts[btn.dataset[dataKey]];
+        if (count === undefined) {
+          return;
+        }
+
+        let badge = btn.querySelector('.facet-count');
+        if (!badge) {
+          badge = document.createElement('small');
+          badge.className = 'facet-count';
+          btn.appendChild(badge);
+        }
+        badge.textContent = count === 1 ? '1 auto' : `${count} autos`;
+        btn.classList.toggle('no-results', count === 0);
+      });
+    })
+    .catch(error => console.error('Error cargando conteos:', error));
+}
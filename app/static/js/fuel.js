@@ -2,6 +2,9 @@ document.addEventListener('DOMContentLoaded', () => {
   let selectedFuel = null;
   const nextBtn = document.getElementById('next-btn');
 
+  // Autos disponibles con cada opción según lo elegido en los pasos anteriores
+  loadFacetCounts('fuel', '.fuel-btn', 'fuel');
+
   // Configurar botones de combustible
   document.querySelectorAll('.fuel-btn').forEach(btn => {
     btn.addEventListener('click', function() {
@@ -2,6 +2,9 @@ document.addEventListener('DOMContentLoaded', () => {
   let selectedTransmission = null;
   const nextBtn = document.getElementById('next-btn');
 
+  // Autos disponibles con cada opción según lo elegido en los pasos anteriores
+  loadFacetCounts('transmission', '.transmission-btn', 'transmission');
+
   // Configurar botones de transmisión
   document.querySelectorAll('.transmission-btn').forEach(btn => {
     btn.addEventListener('click', function() {
@@ -2,6 +2,9 @@ document.addEventListener('DOMContentLoaded', () => {
   const selectedTypes = new Set();
   const nextBtn = document.getElementById('next-btn');
 
+  // Autos disponibles con cada opción según lo elegido en los pasos anteriores
+  loadFacetCounts('types', '.type-btn', 'type');
+
   // Configurar botones de tipo
   document.querySelectorAll('.type-btn').forEach(btn => {
     btn.addEventListener('click', function() {
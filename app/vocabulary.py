@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Vocabulario de facetas del catálogo (marcas, tipos, combustibles, transmisiones)
+Se carga una vez desde los nodos Marca/Tipo/Combustible/Transmision y asigna a
+cada valor canónico un id entero denso por faceta. Las búsquedas ignoran tildes,
+mayúsculas y guiones, y aceptan alias (ej. 'hybrid' -> 'Híbrido'), así que la
+normalización de preferencias es una búsqueda en diccionario y el catálogo en
+memoria codifica las facetas con los mismos ids en todas las instantáneas.
+Al recargar, los valores borrados de la base salen del vocabulario pero su id
+no se reutiliza: los que siguen conservan el suyo y los nuevos van al final.
+"""
+
+import logging
+import threading
+import time
+import unicodedata
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Iterable
+
+from db import read_query
+
+logger = logging.getLogger(__name__)
+
+# Faceta de preferencias -> (etiqueta del nodo, propiedad con el nombre)
+FACET_NODES = {
+    'brands': ('Marca', 'nombre'),
+    'types': ('Tipo', 'categoria'),
+    'fuel': ('Combustible', 'tipo'),
+    'transmission': ('Transmision', 'tipo'),
+}
+
+# Valores con los que arranca el registro (los que crea setup_neo4j_database.py);
+# se usan mientras Neo4j no responde y conservan sus ids al cargar la base
+DEFAULT_VOCABULARY = {
+    'brands': [
+        "Toyota", "Honda", "Ford", "BMW", "Mercedes-Benz", "Audi",
+        "Volkswagen", "Nissan", "Hyundai", "Kia", "Mazda", "Subaru",
+        "Chevrolet", "Tesla", "Lexus", "Porsche", "Ferrari", "Lamborghini",
+        "Jaguar", "Land Rover", "Volvo", "Peugeot", "Renault", "Mitsubishi"
+    ],
+    'types': [
+        "Sedán", "SUV", "Hatchback", "Pickup", "Coupé", "Convertible",
+        "Van", "Wagon", "Crossover", "Minivan", "Deportivo", "Lujo"
+    ],
+    'fuel': ["Gasolina", "Diésel", "Eléctrico", "Híbrido", "Gas Natural"],
+    'transmission': ["Automática", "Manual", "Semiautomática"],
+}
+
+# Alias -> valor canónico; solo se instalan si el valor existe en el vocabulario.
+# Las variantes sin tilde o en minúsculas no hacen falta (ver fold)
+DEFAULT_ALIASES = {
+    'brands': {'mercedes': "Mercedes-Benz", 'vw': "Volkswagen", 'chevy': "Chevrolet"},
+    'types': {'pick up': "Pickup", 'camioneta': "Pickup", 'cabrio': "Convertible"},
+    'fuel': {'gas': "Gasolina", 'petrol': "Gasolina", 'electric': "Eléctrico",
+             'hybrid': "Híbrido", 'natural gas': "Gas Natural"},
+    'transmission': {'automatic': "Automática", 'auto': "Automática",
+                     'semiautomatic': "Semiautomática", 'semi automatic': "Semiautomática"},
+}
+
+# Una fila (faceta, valor) por nodo de vocabulario
+VOCABULARY_QUERY = "\nUNION ALL\n".join(
+    f"MATCH (n:{label}) WHERE n.{key} IS NOT NULL RETURN '{facet}' as faceta, n.{key} as valor"
+    for facet, (label, key) in FACET_NODES.items()
+)
+
+
+@lru_cache(maxsize=4096)
+def fold(text: str) -> str:
+    """Clave de comparación: sin tildes, en minúsculas y con guiones como espacios"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.casefold().replace('-', ' ').replace('_', ' ').split())
+
+
+class Vocabulary:
+    """Valores canónicos por faceta con ids enteros densos (inmutable)"""
+
+    def __init__(self, values: Dict[str, Iterable[Optional[str]]],
+                 aliases: Optional[Dict[str, Dict[str, str]]] = None):
+        """
+        Args:
+            values: Faceta -> valores canónicos; el id es la posición de la primera
+                aparición (None ocupa un id retirado, sin valor)
+            aliases: Faceta -> alias -> valor canónico (DEFAULT_ALIASES si se omite)
+        """
+        aliases = DEFAULT_ALIASES if aliases is None else aliases
+        self.aliases = aliases
+        self.names: Dict[str, List[Optional[str]]] = {}
+        self.ids: Dict[str, Dict[str, int]] = {}
+        self._lookup: Dict[str, Dict[str, int]] = {}
+        for facet in FACET_NODES:
+            names: List[Optional[str]] = []
+            ids: Dict[str, int] = {}
+            for value in values.get(facet, ()):
+                if value is None:
+                    names.append(None)
+                elif value not in ids:
+                    ids[value] = len(names)
+                    names.append(value)
+            lookup = {}
+            for value, value_id in ids.items():
+                lookup.setdefault(fold(value), value_id)
+            for alias, target in aliases.get(facet, {}).items():
+                if target in ids:
+                    lookup.setdefault(fold(alias), ids[target])
+            self.names[facet] = names
+            self.ids[facet] = ids
+            self._lookup[facet] = lookup
+
+    def size(self, facet: str) -> int:
+        """Rango de ids (de 0 a size - 1), contando los retirados"""
+        return len(self.names[facet])
+
+    def values(self, facet: str) -> List[str]:
+        """Valores vigentes en orden de id"""
+        return list(self.ids[facet])
+
+    def id(self, facet: str, value) -> Optional[int]:
+        """Id del valor canónico al que corresponde value; None si no es del vocabulario"""
+        if not isinstance(value, str):
+            return None
+        value_id = self.ids[facet].get(value)
+        if value_id is None:
+            value_id = self._lookup[facet].get(fold(value))
+        return value_id
+
+    def name(self, facet: str, value_id: int) -> Optional[str]:
+        """Valor de un id; None si el id está retirado"""
+        return self.names[facet][value_id]
+
+    def canonical(self, facet: str, value):
+        """Valor canónico; los valores desconocidos se devuelven tal cual"""
+        value_id = self.id(facet, value)
+        return value if value_id is None else self.names[facet][value_id]
+
+    def canonical_list(self, facet: str, values) -> Optional[List[str]]:
+        """
+        Selección de una faceta como lista de valores canónicos sin repetir
+
+        Acepta un valor, una lista o un dict de grupos (se toman sus valores).
+        Devuelve None si no queda ningún valor.
+        """
+        if not values:
+            return None
+        if isinstance(values, dict):
+            values = list(values.values())
+        elif isinstance(values, str):
+            values = [values]
+        canonical = list(dict.fromkeys(self.canonical(facet, value) for value in values if value))
+        return canonical or None
+
+    def extended(self, values: Dict[str, Iterable[str]]) -> 'Vocabulary':
+        """Este vocabulario con los valores nuevos agregados al final (los ids existentes se conservan)"""
+        new_values = {
+            facet: [value for value in dict.fromkeys(facet_values)
+                    if value is not None and value not in self.ids[facet]]
+            for facet, facet_values in values.items()
+        }
+        if not any(new_values.values()):
+            return self
+        return Vocabulary({facet: self.names[facet] + new_values.get(facet, []) for facet in FACET_NODES},
+                          self.aliases)
+
+    def reloaded(self, values: Dict[str, Iterable[str]]) -> 'Vocabulary':
+        """
+        Vocabulario con exactamente estos valores, conservando los ids
+
+        Los valores que siguen mantienen su id, los que ya no están dejan su id
+        retirado (no se reasigna, así un código viejo nunca nombra otro valor)
+        y los nuevos se agregan al final.
+        """
+        names = {}
+        for facet in FACET_NODES:
+            present = [value for value in dict.fromkeys(values.get(facet, ())) if value is not None]
+            kept = set(present)
+            names[facet] = ([name if name in kept else None for name in self.names[facet]]
+                            + [value for value in present if value not in self.ids[facet]])
+        return Vocabulary(names, self.aliases)
+
+
+class VocabularyRegistry:
+    """Vocabulario vigente con intercambio atómico al recargar"""
+
+    def __init__(self, vocabulary: Optional[Vocabulary] = None):
+        self._vocabulary = vocabulary or Vocabulary(DEFAULT_VOCABULARY)
+        self._lock = threading.Lock()
+        self.loaded_at: Optional[float] = None
+
+    @property
+    def current(self) -> Vocabulary:
+        return self._vocabulary
+
+    def install(self, rows: Iterable[Dict[str, Any]]) -> Vocabulary:
+        """Reemplazar los valores por los de filas (faceta, valor) de VOCABULARY_QUERY (ver reloaded)"""
+        values: Dict[str, List[str]] = {facet: [] for facet in FACET_NODES}
+        for row in rows:
+            if row['faceta'] in values:
+                values[row['faceta']].append(row['valor'])
+        with self._lock:
+            self._vocabulary = self._vocabulary.reloaded(values)
+            self.loaded_at = time.time()
+        return self._vocabulary
+
+    def load(self, driver) -> Vocabulary:
+        """Leer los nodos de vocabulario de Neo4j; los errores se propagan"""
+        vocabulary = self.install(read_query(driver, VOCABULARY_QUERY))
+        logger.info("Vocabulario cargado: " + ", ".join(
+            f"{len(vocabulary.ids[facet])} {facet}" for facet in FACET_NODES))
+        return vocabulary
+
+    def refresh(self, driver) -> Vocabulary:
+        """Recargar tras un cambio en el catálogo; si falla se conserva el vocabulario actual"""
+        try:
+            return self.load(driver)
+        except Exception as e:
+            logger.error(f"Error recargando vocabulario: {e}")
+            return self._vocabulary
+
+
+# Registro compartido por los recomendadores y el catálogo en memoria
+VOCABULARY = VocabularyRegistry()
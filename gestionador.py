@@ -3,16 +3,36 @@
 Gestionador mejorado para Neo4j con funcionalidades específicas para el sistema de recomendaciones
 """
 
-from neo4j import GraphDatabase
 import logging
+import sys
+from pathlib import Path
 from typing import List, Dict, Any, Optional
 
+# Módulos compartidos con la aplicación (carpeta app)
+APP_DIR = str(Path(__file__).parent / "app")
+if APP_DIR not in sys.path:
+    sys.path.append(APP_DIR)
+
+from catalog_statistics import StatisticsService
+from db import create_driver, read_query, execute_write
+from query_compiler import SEARCH_QUERIES, SEARCH_SORTS, PAGED_SEARCH_QUERIES
+from pagination import SORT_ORDERS, query_digest, decode_cursor, paginate
+import minhash
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Recomendador de la aplicación: las escrituras de autos invalidan su caché
+# de resultados, el catálogo en memoria y el índice de similares
+try:
+    from recommender import on_catalog_change as recommender_catalog_change
+except ImportError as e:
+    recommender_catalog_change = None
+    logger.warning(f"Recomendador no disponible, sus cachés no se invalidarán: {e}")
+
 class Gestionador:
-    def __init__(self, uri: str, user: str, password: str):
+    def __init__(self, uri: Optional[str] = None, user: Optional[str] = None, password: Optional[str] = None):
         """
         Inicializar conexión a Neo4j
         
@@ -20,64 +40,74 @@ class Gestionador:
             uri: URI de conexión (ej: bolt://localhost:7687)
             user: Usuario de Neo4j
             password: Contraseña de Neo4j
+        
+        Los argumentos omitidos se toman de las variables NEO4J_* (ver app/db.py).
         """
+        self._change_listeners = []
         try:
-            self.driver = GraphDatabase.driver(uri, auth=(user, password))
+            self.driver = create_driver(uri, user, password)
             # Verificar conexión
-            with self.driver.session() as session:
-                result = session.run("RETURN 'Conexión exitosa' as mensaje")
-                logger.info(f"Neo4j: {result.single()['mensaje']}")
+            records = read_query(self.driver, "RETURN 'Conexión exitosa' as mensaje")
+            logger.info(f"Neo4j: {records[0]['mensaje']}")
         except Exception as e:
             logger.error(f"Error conectando a Neo4j: {e}")
             raise ConnectionError(f"No se pudo conectar a Neo4j: {e}")
+        self.statistics = StatisticsService(self.driver)
+        if recommender_catalog_change is not None:
+            self.add_change_listener(recommender_catalog_change)
     
     def close(self):
         """Cerrar conexión a Neo4j"""
+        if recommender_catalog_change is not None:
+            self.remove_change_listener(recommender_catalog_change)
         if hasattr(self, 'driver') and self.driver:
             self.driver.close()
             logger.info("Conexión a Neo4j cerrada")
     
+    def add_change_listener(self, listener):
+        """
+        Registrar una función que se llama tras cada escritura de autos
+        
+        Args:
+            listener: Callable(event, car_id); event es 'create', 'update' o 'delete'
+        """
+        self._change_listeners.append(listener)
+    
+    def remove_change_listener(self, listener):
+        """Dejar de notificar a un listener registrado"""
+        if listener in self._change_listeners:
+            self._change_listeners.remove(listener)
+    
+    def _notify_change(self, event: str, car_id: Optional[str]):
+        """Avisar a los listeners de un cambio en el catálogo"""
+        self.statistics.invalidate()
+        for listener in list(self._change_listeners):
+            try:
+                listener(event, car_id)
+            except Exception as e:
+                logger.error(f"Error notificando cambio de catálogo: {e}")
+    
     def test_connection(self) -> bool:
         """Probar si la conexión a Neo4j está funcionando"""
         try:
-            with self.driver.session() as session:
-                session.run("RETURN 1 as test")
+            self.driver.verify_connectivity()
             return True
         except Exception as e:
             logger.error(f"Error en conexión: {e}")
             return False
     
     def get_database_info(self) -> Dict[str, Any]:
-        """Obtener información general de la base de datos"""
+        """Obtener información general de la base de datos (en caché, ver app/catalog_statistics.py)"""
         try:
-            with self.driver.session() as session:
-                # Obtener versión de Neo4j
-                version_result = session.run("CALL dbms.components() YIELD name, versions")
-                neo4j_info = version_result.data()
-                
-                # Contar nodos y relaciones
-                nodes_result = session.run("MATCH (n) RETURN count(n) as total_nodes")
-                total_nodes = nodes_result.single()["total_nodes"]
-                
-                rels_result = session.run("MATCH ()-[r]->() RETURN count(r) as total_relationships")
-                total_relationships = rels_result.single()["total_relationships"]
-                
-                # Obtener etiquetas de nodos
-                labels_result = session.run("CALL db.labels()")
-                labels = [record["label"] for record in labels_result]
-                
-                # Obtener tipos de relaciones
-                rel_types_result = session.run("CALL db.relationshipTypes()")
-                relationship_types = [record["relationshipType"] for record in rel_types_result]
-                
-                return {
-                    "neo4j_version": neo4j_info[0]["versions"][0] if neo4j_info else "Unknown",
-                    "total_nodes": total_nodes,
-                    "total_relationships": total_relationships,
-                    "node_labels": labels,
-                    "relationship_types": relationship_types,
-                    "connection_status": "Connected"
-                }
+            statistics = self.statistics.get()
+            return {
+                "neo4j_version": statistics["neo4j_version"],
+                "total_nodes": statistics["total_nodes"],
+                "total_relationships": statistics["total_relationships"],
+                "node_labels": statistics["node_labels"],
+                "relationship_types": statistics["relationship_types"],
+                "connection_status": "Connected"
+            }
         except Exception as e:
             logger.error(f"Error obteniendo información de la base de datos: {e}")
             return {"connection_status": "Error", "error": str(e)}
@@ -85,9 +115,7 @@ class Gestionador:
     def get_cars_count(self) -> int:
         """Obtener número total de autos en la base de datos"""
         try:
-            with self.driver.session() as session:
-                result = session.run("MATCH (a:Auto) RETURN count(a) as count")
-                return result.single()["count"]
+            return read_query(self.driver, "MATCH (a:Auto) RETURN count(a) as count")[0]["count"]
         except Exception as e:
             logger.error(f"Error contando autos: {e}")
             return 0
@@ -95,9 +123,8 @@ class Gestionador:
     def get_brands(self) -> List[str]:
         """Obtener lista de todas las marcas disponibles"""
         try:
-            with self.driver.session() as session:
-                result = session.run("MATCH (m:Marca) RETURN m.nombre as nombre ORDER BY m.nombre")
-                return [record["nombre"] for record in result]
+            records = read_query(self.driver, "MATCH (m:Marca) RETURN m.nombre as nombre ORDER BY m.nombre")
+            return [record["nombre"] for record in records]
         except Exception as e:
             logger.error(f"Error obteniendo marcas: {e}")
             return []
@@ -105,9 +132,8 @@ class Gestionador:
     def get_car_types(self) -> List[str]:
         """Obtener lista de todos los tipos de vehículo disponibles"""
         try:
-            with self.driver.session() as session:
-                result = session.run("MATCH (t:Tipo) RETURN t.categoria as categoria ORDER BY t.categoria")
-                return [record["categoria"] for record in result]
+            records = read_query(self.driver, "MATCH (t:Tipo) RETURN t.categoria as categoria ORDER BY t.categoria")
+            return [record["categoria"] for record in records]
         except Exception as e:
             logger.error(f"Error obteniendo tipos: {e}")
             return []
@@ -115,9 +141,8 @@ class Gestionador:
     def get_fuel_types(self) -> List[str]:
         """Obtener lista de todos los tipos de combustible disponibles"""
         try:
-            with self.driver.session() as session:
-                result = session.run("MATCH (c:Combustible) RETURN c.tipo as tipo ORDER BY c.tipo")
-                return [record["tipo"] for record in result]
+            records = read_query(self.driver, "MATCH (c:Combustible) RETURN c.tipo as tipo ORDER BY c.tipo")
+            return [record["tipo"] for record in records]
         except Exception as e:
             logger.error(f"Error obteniendo combustibles: {e}")
             return []
@@ -125,9 +150,8 @@ class Gestionador:
     def get_transmission_types(self) -> List[str]:
         """Obtener lista de todos los tipos de transmisión disponibles"""
         try:
-            with self.driver.session() as session:
-                result = session.run("MATCH (tr:Transmision) RETURN tr.tipo as tipo ORDER BY tr.tipo")
-                return [record["tipo"] for record in result]
+            records = read_query(self.driver, "MATCH (tr:Transmision) RETURN tr.tipo as tipo ORDER BY tr.tipo")
+            return [record["tipo"] for record in records]
         except Exception as e:
             logger.error(f"Error obteniendo transmisiones: {e}")
             return []
@@ -135,18 +159,16 @@ class Gestionador:
     def get_price_range(self) -> Dict[str, float]:
         """Obtener rango de precios de los autos"""
         try:
-            with self.driver.session() as session:
-                result = session.run("""
-                    MATCH (a:Auto) 
-                    WHERE a.precio IS NOT NULL
-                    RETURN min(a.precio) as min_price, max(a.precio) as max_price, avg(a.precio) as avg_price
-                """)
-                record = result.single()
-                return {
-                    "min_price": float(record["min_price"]) if record["min_price"] else 0.0,
-                    "max_price": float(record["max_price"]) if record["max_price"] else 0.0,
-                    "avg_price": float(record["avg_price"]) if record["avg_price"] else 0.0
-                }
+            record = read_query(self.driver, """
+                MATCH (a:Auto) 
+                WHERE a.precio IS NOT NULL
+                RETURN min(a.precio) as min_price, max(a.precio) as max_price, avg(a.precio) as avg_price
+            """)[0]
+            return {
+                "min_price": float(record["min_price"]) if record["min_price"] else 0.0,
+                "max_price": float(record["max_price"]) if record["max_price"] else 0.0,
+                "avg_price": float(record["avg_price"]) if record["avg_price"] else 0.0
+            }
         except Exception as e:
             logger.error(f"Error obteniendo rango de precios: {e}")
             return {"min_price": 0.0, "max_price": 0.0, "avg_price": 0.0}
@@ -158,52 +180,59 @@ class Gestionador:
         Args:
             car_data: Diccionario con datos del auto (id, modelo, año, precio, etc.)
         """
+        def create(tx):
+            # Crear el nodo del auto
+            tx.run("""
+                CREATE (a:Auto {
+                    id: $id,
+                    modelo: $modelo,
+                    año: $año,
+                    precio: $precio,
+                    caracteristicas: $caracteristicas
+                })
+            """, {**car_data, 'caracteristicas': car_data.get('caracteristicas') or []})
+            
+            # Conectar con marca si existe
+            if 'marca' in car_data:
+                tx.run("""
+                    MATCH (a:Auto {id: $id})
+                    MERGE (m:Marca {nombre: $marca})
+                    MERGE (a)-[:ES_MARCA]->(m)
+                """, id=car_data['id'], marca=car_data['marca'])
+            
+            # Conectar con tipo si existe
+            if 'tipo' in car_data:
+                tx.run("""
+                    MATCH (a:Auto {id: $id})
+                    MERGE (t:Tipo {categoria: $tipo})
+                    MERGE (a)-[:ES_TIPO]->(t)
+                """, id=car_data['id'], tipo=car_data['tipo'])
+            
+            # Conectar con combustible si existe
+            if 'combustible' in car_data:
+                tx.run("""
+                    MATCH (a:Auto {id: $id})
+                    MERGE (c:Combustible {tipo: $combustible})
+                    MERGE (a)-[:USA_COMBUSTIBLE]->(c)
+                """, id=car_data['id'], combustible=car_data['combustible'])
+            
+            # Conectar con transmisión si existe
+            if 'transmision' in car_data:
+                tx.run("""
+                    MATCH (a:Auto {id: $id})
+                    MERGE (tr:Transmision {tipo: $transmision})
+                    MERGE (a)-[:TIENE_TRANSMISION]->(tr)
+                """, id=car_data['id'], transmision=car_data['transmision'])
+            
+            # Firma MinHash y bandas LSH de las características
+            minhash.write_signatures(tx, [minhash.signature_row(car_data['id'], car_data.get('caracteristicas'))])
+        
         try:
-            with self.driver.session() as session:
-                # Crear el nodo del auto
-                session.run("""
-                    CREATE (a:Auto {
-                        id: $id,
-                        modelo: $modelo,
-                        año: $año,
-                        precio: $precio
-                    })
-                """, **car_data)
-                
-                # Conectar con marca si existe
-                if 'marca' in car_data:
-                    session.run("""
-                        MATCH (a:Auto {id: $id})
-                        MERGE (m:Marca {nombre: $marca})
-                        MERGE (a)-[:ES_MARCA]->(m)
-                    """, id=car_data['id'], marca=car_data['marca'])
-                
-                # Conectar con tipo si existe
-                if 'tipo' in car_data:
-                    session.run("""
-                        MATCH (a:Auto {id: $id})
-                        MERGE (t:Tipo {categoria: $tipo})
-                        MERGE (a)-[:ES_TIPO]->(t)
-                    """, id=car_data['id'], tipo=car_data['tipo'])
-                
-                # Conectar con combustible si existe
-                if 'combustible' in car_data:
-                    session.run("""
-                        MATCH (a:Auto {id: $id})
-                        MERGE (c:Combustible {tipo: $combustible})
-                        MERGE (a)-[:USA_COMBUSTIBLE]->(c)
-                    """, id=car_data['id'], combustible=car_data['combustible'])
-                
-                # Conectar con transmisión si existe
-                if 'transmision' in car_data:
-                    session.run("""
-                        MATCH (a:Auto {id: $id})
-                        MERGE (tr:Transmision {tipo: $transmision})
-                        MERGE (a)-[:TIENE_TRANSMISION]->(tr)
-                    """, id=car_data['id'], transmision=car_data['transmision'])
-                
-                logger.info(f"Auto creado exitosamente: {car_data.get('id', 'ID desconocido')}")
-                return True
+            # Nodo y relaciones en una sola transacción: se reintenta completa o no se aplica
+            execute_write(self.driver, create)
+            logger.info(f"Auto creado exitosamente: {car_data.get('id', 'ID desconocido')}")
+            self._notify_change('create', car_data.get('id'))
+            return True
                 
         except Exception as e:
             logger.error(f"Error creando auto: {e}")
@@ -218,98 +247,120 @@ class Gestionador:
             limit: Número máximo de resultados
         """
         try:
-            # Construir query dinámicamente
-            query_parts = ["MATCH (a:Auto)"]
-            where_conditions = []
-            parameters = {"limit": limit}
+            # Plantilla precompilada según los filtros presentes
+            query, parameters = SEARCH_QUERIES.build(filters or {}, {"limit": limit})
             
-            if filters:
-                # Filtro de marca
-                if filters.get('marca'):
-                    query_parts.append("MATCH (a)-[:ES_MARCA]->(m:Marca)")
-                    where_conditions.append("m.nombre = $marca")
-                    parameters['marca'] = filters['marca']
-                
-                # Filtro de tipo
-                if filters.get('tipo'):
-                    query_parts.append("MATCH (a)-[:ES_TIPO]->(t:Tipo)")
-                    where_conditions.append("t.categoria = $tipo")
-                    parameters['tipo'] = filters['tipo']
-                
-                # Filtro de precio mínimo
-                if filters.get('precio_min'):
-                    where_conditions.append("a.precio >= $precio_min")
-                    parameters['precio_min'] = filters['precio_min']
-                
-                # Filtro de precio máximo
-                if filters.get('precio_max'):
-                    where_conditions.append("a.precio <= $precio_max")
-                    parameters['precio_max'] = filters['precio_max']
-                
-                # Filtro de año mínimo
-                if filters.get('año_min'):
-                    where_conditions.append("a.año >= $año_min")
-                    parameters['año_min'] = filters['año_min']
-            
-            # Agregar WHERE si hay condiciones
-            if where_conditions:
-                query_parts.append("WHERE " + " AND ".join(where_conditions))
-            
-            # Completar query
-            query_parts.append("""
-                OPTIONAL MATCH (a)-[:ES_MARCA]->(m:Marca)
-                OPTIONAL MATCH (a)-[:ES_TIPO]->(t:Tipo)
-                OPTIONAL MATCH (a)-[:USA_COMBUSTIBLE]->(c:Combustible)
-                OPTIONAL MATCH (a)-[:TIENE_TRANSMISION]->(tr:Transmision)
-                RETURN a.id as id, a.modelo as modelo, a.año as año, a.precio as precio,
-                       m.nombre as marca, t.categoria as tipo, 
-                       c.tipo as combustible, tr.tipo as transmision
-                ORDER BY a.precio ASC
-                LIMIT $limit
-            """)
-            
-            query = " ".join(query_parts)
+            cars = []
+            for record in read_query(self.driver, query, parameters):
+                car = {
+                    'id': record['id'],
+                    'modelo': record['modelo'],
+                    'año': record['año'],
+                    'precio': record['precio'],
+                    'marca': record['marca'],
+                    'tipo': record['tipo'],
+                    'combustible': record['combustible'],
+                    'transmision': record['transmision']
+                }
+                cars.append(car)
             
-            with self.driver.session() as session:
-                result = session.run(query, parameters)
-                cars = []
-                
-                for record in result:
-                    car = {
-                        'id': record['id'],
-                        'modelo': record['modelo'],
-                        'año': record['año'],
-                        'precio': record['precio'],
-                        'marca': record['marca'],
-                        'tipo': record['tipo'],
-                        'combustible': record['combustible'],
-                        'transmision': record['transmision']
-                    }
-                    cars.append(car)
-                
-                return cars
+            return cars
                 
         except Exception as e:
             logger.error(f"Error buscando autos: {e}")
             return []
     
+    def search_cars_page(self, filters: Dict[str, Any] = None, limit: int = 10,
+                         sort: str = 'price_asc', cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Buscar autos página a página con cursor (keyset sobre clave de orden + id)
+        
+        Args:
+            filters: Mismos filtros que search_cars
+            limit: Autos por página
+            sort: price_asc, price_desc o year_desc
+            cursor: Token next_cursor de la página anterior (None = primera página)
+        
+        Returns:
+            {'results': [...], 'next_cursor': token o None}
+        
+        Raises:
+            ValueError: si el orden o el cursor no son válidos para esta búsqueda
+        """
+        if sort not in SEARCH_SORTS:
+            raise ValueError(f"Orden no soportado: {sort} (opciones: {', '.join(SEARCH_SORTS)})")
+        filters = filters or {}
+        digest = query_digest(filters)
+        after = decode_cursor(cursor, sort, digest) if cursor else None
+        
+        try:
+            query, parameters = PAGED_SEARCH_QUERIES[sort].build(
+                dict(filters, after=after), {"limit": limit + 1}
+            )
+            cars = [record.data() for record in read_query(self.driver, query, parameters)]
+        except Exception as e:
+            logger.error(f"Error buscando autos: {e}")
+            return {'results': [], 'next_cursor': None}
+        
+        # Las filas de búsqueda usan los nombres de propiedad de Neo4j
+        field = SORT_ORDERS[sort][0].split('.', 1)[1]
+        results, next_cursor = paginate(cars, limit, sort, field, digest)
+        return {'results': results, 'next_cursor': next_cursor}
+    
+    def warm_up_queries(self) -> List[Dict[str, Any]]:
+        """Ejecutar EXPLAIN sobre todas las formas de búsqueda para calentar los planes"""
+        try:
+            return SEARCH_QUERIES.warm_up(self.driver)
+        except Exception as e:
+            logger.error(f"Error precalentando consultas de búsqueda: {e}")
+            return []
+    
+    def find_cars_sharing_features(self, features: List[str], threshold: float = 0.5, limit: int = 20,
+                                   exclude_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Autos que comparten la mayoría de estas características (aproximado)
+        
+        Los candidatos salen de las bandas LSH de la firma MinHash, sin recorrer
+        todo el catálogo, y se ordenan por Jaccard estimada ('jaccard').
+        
+        Args:
+            features: Características buscadas
+            threshold: Jaccard estimada mínima (las bandas detectan bien desde ~0.5)
+            limit: Máximo de autos
+            exclude_id: Auto a excluir (p. ej. el propio auto de referencia)
+        """
+        query_signature = minhash.signature(features)
+        if not query_signature:
+            return []
+        try:
+            records = read_query(self.driver, minhash.CANDIDATES_QUERY, {
+                "bands": minhash.band_keys(query_signature),
+                "exclude_id": exclude_id
+            })
+            return minhash.rank_candidates(records, query_signature, threshold, limit)
+        except Exception as e:
+            logger.error(f"Error buscando autos por características: {e}")
+            return []
+    
     def delete_car(self, car_id: str) -> bool:
         """Eliminar un auto por su ID"""
+        def delete(tx):
+            return tx.run("""
+                MATCH (a:Auto {id: $car_id})
+                DETACH DELETE a
+                RETURN count(a) as deleted
+            """, car_id=car_id).single()["deleted"]
+        
         try:
-            with self.driver.session() as session:
-                result = session.run("""
-                    MATCH (a:Auto {id: $car_id})
-                    DETACH DELETE a
-                    RETURN count(a) as deleted
-                """, car_id=car_id)
-                
-                deleted_count = result.single()["deleted"]
-                if deleted_count > 0:
-                    logger.info(f"Auto eliminado: {car_id}")
-                    return True
-                else:
-                    logger.warning(f"No se encontró auto con ID: {car_id}")
-                    return False
+            deleted_count = execute_write(self.driver, delete)
+            if deleted_count > 0:
+                logger.info(f"Auto eliminado: {car_id}")
+            else:
+                logger.warning(f"No se encontró auto con ID: {car_id}")
+                return False
+            
+            self._notify_change('delete', car_id)
+            return True
                     
         except Exception as e:
             logger.error(f"Error eliminando auto: {e}")
@@ -318,26 +369,33 @@ class Gestionador:
     def update_car(self, car_id: str, updates: Dict[str, Any]) -> bool:
         """Actualizar un auto existente"""
         try:
-            with self.driver.session() as session:
-                # Construir query de actualización dinámicamente
-                set_clauses = []
-                parameters = {"car_id": car_id}
-                
-                for key, value in updates.items():
-                    if key not in ['marca', 'tipo', 'combustible', 'transmision']:  # Estas requieren manejo especial
-                        set_clauses.append(f"a.{key} = ${key}")
-                        parameters[key] = value
+            # Construir query de actualización dinámicamente
+            set_clauses = []
+            parameters = {"car_id": car_id}
+            
+            for key, value in updates.items():
+                if key not in ['marca', 'tipo', 'combustible', 'transmision']:  # Estas requieren manejo especial
+                    set_clauses.append(f"a.{key} = ${key}")
+                    parameters[key] = value
+            
+            if set_clauses:
+                query = f"""
+                    MATCH (a:Auto {{id: $car_id}})
+                    SET {', '.join(set_clauses)}
+                    RETURN a
+                """
                 
-                if set_clauses:
-                    query = f"""
-                        MATCH (a:Auto {{id: $car_id}})
-                        SET {', '.join(set_clauses)}
-                        RETURN a
-                    """
-                    session.run(query, parameters)
+                def update(tx):
+                    tx.run(query, parameters).consume()
+                    # Las características cambiaron: recalcular firma y bandas en la misma transacción
+                    if 'caracteristicas' in updates:
+                        minhash.write_signatures(tx, [minhash.signature_row(car_id, updates['caracteristicas'])])
                 
-                logger.info(f"Auto actualizado: {car_id}")
-                return True
+                execute_write(self.driver, update)
+            
+            logger.info(f"Auto actualizado: {car_id}")
+            self._notify_change('update', car_id)
+            return True
                 
         except Exception as e:
             logger.error(f"Error actualizando auto: {e}")
@@ -345,14 +403,9 @@ class Gestionador:
 
 def main():
     """Función principal para probar el gestionador"""
-    # Configuración
-    URI = "bolt://localhost:7687"
-    USER = "neo4j"
-    PASSWORD = "proyectoNEO4J"
-    
     try:
-        # Crear conexión
-        gestionador = Gestionador(URI, USER, PASSWORD)
+        # Crear conexión (configurada por variables NEO4J_*)
+        gestionador = Gestionador()
         
         # Probar funcionalidades
         print("=== PRUEBA DEL GESTIONADOR ===")
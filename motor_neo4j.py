@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Motor de recomendaciones sobre Neo4j
+Implementa MotorDeRecomendaciones con nodos (:Usuario) enlazados a los autos
+(FAVORITO, RECOMENDADO) y a los valores que prefieren (PREFIERE). Las
+recomendaciones salen del PageRank personalizado calculado en lote o, si el
+usuario aún no lo tiene, de mezclar la coincidencia con sus preferencias y la
+co-ocurrencia de favoritos entre usuarios, que se mantiene en memoria.
+"""
+
+import logging
+import math
+import sys
+import uuid
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Módulos compartidos con la aplicación (carpeta app)
+APP_DIR = str(Path(__file__).parent / "app")
+if APP_DIR not in sys.path:
+    sys.path.append(APP_DIR)
+
+from gestionador import Gestionador
+from motor_de_recomendaciones import MotorDeRecomendaciones
+from db import read_query, read_session, execute_write
+from cooccurrence import CoOccurrenceMatrix
+
+logger = logging.getLogger(__name__)
+
+# tipo_preferencia -> (etiqueta, propiedad, relación del auto con ese nodo)
+PREFERENCE_TARGETS = {
+    'marca': ('Marca', 'nombre', 'ES_MARCA'),
+    'tipo': ('Tipo', 'categoria', 'ES_TIPO'),
+    'combustible': ('Combustible', 'tipo', 'USA_COMBUSTIBLE'),
+    'transmision': ('Transmision', 'tipo', 'TIENE_TRANSMISION'),
+}
+
+# Peso de la co-ocurrencia de favoritos frente a la coincidencia con preferencias
+COLLABORATIVE_WEIGHT = 0.4
+# Candidatos colaborativos considerados y recomendaciones devueltas
+COLLABORATIVE_CANDIDATES = 50
+RECOMMENDATION_LIMIT = 10
+
+CAR_COLUMNS = """
+    OPTIONAL MATCH (a)-[:ES_MARCA]->(m:Marca)
+    OPTIONAL MATCH (a)-[:ES_TIPO]->(t:Tipo)
+    OPTIONAL MATCH (a)-[:TIENE_TRANSMISION]->(tr:Transmision)
+    RETURN a.id as id, a.modelo as modelo, m.nombre as marca, t.categoria as tipo,
+           tr.tipo as transmision, a.precio as precio
+"""
+
+# Top-k de PageRank personalizado guardado por scripts/setup/compute_pagerank.py,
+# sin los autos fuera del presupuesto ni los favoritos agregados después del cálculo
+PAGERANK_QUERY = """
+    MATCH (u:Usuario {nombre: $nombre})
+    WHERE u.ppr_autos IS NOT NULL
+    UNWIND range(0, size(u.ppr_autos) - 1) AS posicion
+    MATCH (a:Auto {id: u.ppr_autos[posicion]})
+    WHERE (u.presupuesto IS NULL OR a.precio <= u.presupuesto)
+      AND NOT (u)-[:FAVORITO]->(a)
+    WITH a, posicion, u.ppr_puntuaciones[posicion] as pagerank
+""" + CAR_COLUMNS + """, pagerank, posicion
+    ORDER BY posicion
+    LIMIT $limite
+"""
+
+# Autos dentro del presupuesto que coinciden con alguna preferencia o que llegan
+# por co-ocurrencia, con el número de preferencias que cumplen. Los candidatos
+# salen de dos orígenes anclados (los nodos preferidos del usuario y el índice
+# único de a.id), sin recorrer todos los autos en cada petición
+RECOMMENDATION_CANDIDATES_QUERY = """
+    MATCH (u:Usuario {nombre: $nombre})
+    CALL {
+        WITH u
+        MATCH (u)-[:PREFIERE]->()<-[:ES_MARCA|ES_TIPO|USA_COMBUSTIBLE|TIENE_TRANSMISION]-(a:Auto)
+        RETURN a
+        UNION
+        MATCH (a:Auto) WHERE a.id IN $colaborativos
+        RETURN a
+    }
+    WITH u, a
+    WHERE (u.presupuesto IS NULL OR a.precio <= u.presupuesto)
+      AND NOT (u)-[:FAVORITO]->(a)
+    OPTIONAL MATCH (u)-[:PREFIERE]->(p)<-[:ES_MARCA|ES_TIPO|USA_COMBUSTIBLE|TIENE_TRANSMISION]-(a)
+    WITH u, a, count(p) as coincidencias
+    WITH a, coincidencias, COUNT { (u)-[:PREFIERE]->() } as total_preferencias
+""" + CAR_COLUMNS + """, coincidencias, total_preferencias
+"""
+
+
+class MotorNeo4j(MotorDeRecomendaciones):
+    """MotorDeRecomendaciones respaldado por Neo4j, con co-ocurrencia de favoritos en memoria"""
+
+    def __init__(self, gestionador: Optional[Gestionador] = None):
+        """
+        Args:
+            gestionador: Gestionador a reutilizar; si se omite se crea uno (variables NEO4J_*)
+        """
+        self.gestionador = gestionador or Gestionador()
+        self.driver = self.gestionador.driver
+        self.coocurrencias = self._load_cooccurrence()
+        self.gestionador.add_change_listener(self._on_catalog_change)
+
+    def close(self):
+        self.gestionador.remove_change_listener(self._on_catalog_change)
+        self.gestionador.close()
+
+    def _load_cooccurrence(self) -> CoOccurrenceMatrix:
+        """Construir la matriz con un único recorrido de las relaciones FAVORITO"""
+        try:
+            with read_session(self.driver) as session:
+                result = session.run("MATCH (u:Usuario)-[:FAVORITO]->(a:Auto) RETURN u.nombre as nombre, a.id as id")
+                matrix = CoOccurrenceMatrix((record['nombre'], record['id']) for record in result)
+            logger.info(f"Co-ocurrencia de favoritos cargada: {len(matrix)} favoritos")
+            return matrix
+        except Exception as e:
+            logger.error(f"Error cargando co-ocurrencia de favoritos: {e}")
+            return CoOccurrenceMatrix()
+
+    def _on_catalog_change(self, event: str, car_id: Optional[str]):
+        if event == 'delete' and car_id:
+            self.coocurrencias.remove_car(car_id)
+
+    def _car_id(self, modelo: str) -> Optional[str]:
+        records = read_query(self.driver, "MATCH (a:Auto {modelo: $modelo}) RETURN a.id as id LIMIT 1",
+                             {"modelo": modelo})
+        return records[0]['id'] if records else None
+
+    def _cars(self, match: str, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        try:
+            return [dict(record) for record in read_query(self.driver, match + CAR_COLUMNS, parameters)]
+        except Exception as e:
+            logger.error(f"Error consultando autos: {e}")
+            return []
+
+    # Usuarios
+
+    def crear_usuario(self, usuario) -> bool:
+        """Crear un (:Usuario) a partir de un objeto Usuario; False si el nombre ya existe"""
+        def create(tx):
+            return tx.run("""
+                MERGE (u:Usuario {nombre: $nombre})
+                ON CREATE SET u.password = $password, u.presupuesto = $presupuesto, u.creado = true
+                WITH u, coalesce(u.creado, false) as creado
+                REMOVE u.creado
+                RETURN creado
+            """, nombre=usuario.nombre, password=generate_password_hash(usuario.password),
+                presupuesto=usuario.presupuesto).single()['creado']
+
+        try:
+            return execute_write(self.driver, create)
+        except Exception as e:
+            logger.error(f"Error creando usuario: {e}")
+            return False
+
+    def iniciar_sesion(self, nombre, password) -> bool:
+        try:
+            records = read_query(self.driver, "MATCH (u:Usuario {nombre: $nombre}) RETURN u.password as password",
+                                 {"nombre": nombre})
+            return bool(records) and check_password_hash(records[0]['password'], password)
+        except Exception as e:
+            logger.error(f"Error iniciando sesión: {e}")
+            return False
+
+    def obtener_nombre_usuario(self, nombre) -> Optional[str]:
+        records = read_query(self.driver, "MATCH (u:Usuario {nombre: $nombre}) RETURN u.nombre as nombre",
+                             {"nombre": nombre})
+        return records[0]['nombre'] if records else None
+
+    def eliminar_usuario(self, nombre) -> bool:
+        try:
+            deleted = execute_write(self.driver, lambda tx: tx.run(
+                "MATCH (u:Usuario {nombre: $nombre}) DETACH DELETE u RETURN count(u) as eliminados",
+                nombre=nombre).single()['eliminados'])
+            self.coocurrencias.remove_user(nombre)
+            return deleted > 0
+        except Exception as e:
+            logger.error(f"Error eliminando usuario: {e}")
+            return False
+
+    def actualizar_contrasena(self, nombre, nueva_password) -> bool:
+        return self._set_user_property(nombre, 'password', generate_password_hash(nueva_password))
+
+    def cambiar_presupuesto(self, nombre, nuevo_presupuesto) -> bool:
+        return self._set_user_property(nombre, 'presupuesto', nuevo_presupuesto)
+
+    def _set_user_property(self, nombre: str, key: str, value) -> bool:
+        try:
+            updated = execute_write(self.driver, lambda tx: tx.run(
+                f"MATCH (u:Usuario {{nombre: $nombre}}) SET u.{key} = $value RETURN count(u) as actualizados",
+                nombre=nombre, value=value).single()['actualizados'])
+            return updated > 0
+        except Exception as e:
+            logger.error(f"Error actualizando usuario: {e}")
+            return False
+
+    # Autos
+
+    def crear_carro(self, carro) -> bool:
+        """Crear un auto a partir de un objeto Carro (se le asigna un id nuevo)"""
+        return self.gestionador.create_car({
+            'id': f"car_{uuid.uuid4().hex[:12]}",
+            'modelo': carro.modelo,
+            'marca': carro.marca,
+            'tipo': carro.tipo,
+            'transmision': carro.transmision,
+            'precio': carro.precio,
+        })
+
+    def filtrar_carros_por_preferencias(self, nombre) -> List[Dict[str, Any]]:
+        """Autos que cumplen alguna preferencia del usuario, primero los que cumplen más"""
+        return self._cars("""
+            MATCH (u:Usuario {nombre: $nombre})-[:PREFIERE]->(p)<-[:ES_MARCA|ES_TIPO|USA_COMBUSTIBLE|TIENE_TRANSMISION]-(a:Auto)
+            WITH a, count(p) as coincidencias
+            ORDER BY coincidencias DESC, a.precio
+        """, {"nombre": nombre})
+
+    def filtrar_carros_por_presupuesto(self, nombre) -> List[Dict[str, Any]]:
+        return self._cars("""
+            MATCH (u:Usuario {nombre: $nombre}), (a:Auto)
+            WHERE a.precio <= u.presupuesto
+            WITH a ORDER BY a.precio DESC
+        """, {"nombre": nombre})
+
+    # Favoritos
+
+    def agregar_carro_favorito(self, nombre, modelo) -> bool:
+        """Guardar un auto en favoritos y actualizar la co-ocurrencia"""
+        try:
+            car_id = self._car_id(modelo)
+            if car_id is None:
+                logger.warning(f"Auto no encontrado para favoritos: {modelo}")
+                return False
+            linked = execute_write(self.driver, lambda tx: tx.run("""
+                MATCH (u:Usuario {nombre: $nombre}), (a:Auto {id: $id})
+                MERGE (u)-[:FAVORITO]->(a)
+                RETURN count(a) as enlazados
+            """, nombre=nombre, id=car_id).single()['enlazados'])
+            if not linked:
+                return False
+            self.coocurrencias.add(nombre, car_id)
+            return True
+        except Exception as e:
+            logger.error(f"Error agregando favorito: {e}")
+            return False
+
+    def eliminar_carro_favorito(self, nombre, modelo) -> bool:
+        try:
+            car_id = self._car_id(modelo)
+            if car_id is None:
+                return False
+            execute_write(self.driver, lambda tx: tx.run("""
+                MATCH (:Usuario {nombre: $nombre})-[f:FAVORITO]->(:Auto {id: $id})
+                DELETE f
+            """, nombre=nombre, id=car_id).consume())
+            self.coocurrencias.remove(nombre, car_id)
+            return True
+        except Exception as e:
+            logger.error(f"Error eliminando favorito: {e}")
+            return False
+
+    def obtener_carros_favoritos(self, nombre) -> List[Dict[str, Any]]:
+        return self._cars("""
+            MATCH (:Usuario {nombre: $nombre})-[:FAVORITO]->(a:Auto)
+            WITH a ORDER BY a.modelo
+        """, {"nombre": nombre})
+
+    def carros_guardados_junto_a(self, modelo, limite: int = RECOMMENDATION_LIMIT) -> List[Dict[str, Any]]:
+        """Quienes guardaron este auto también guardaron... (desde memoria)"""
+        car_id = self._car_id(modelo)
+        if car_id is None:
+            return []
+        related = self.coocurrencias.related([car_id], k=limite)
+        return self._with_scores(related, 'coocurrencia')
+
+    def _with_scores(self, scored: List[tuple], key: str) -> List[Dict[str, Any]]:
+        """Datos de los autos puntuados, en el mismo orden"""
+        if not scored:
+            return []
+        cars = {car['id']: car for car in self._cars("MATCH (a:Auto) WHERE a.id IN $ids WITH a",
+                                                      {"ids": [car_id for car_id, _ in scored]})}
+        results = []
+        for car_id, score in scored:
+            if car_id in cars:
+                car = dict(cars[car_id])
+                car[key] = round(score, 3)
+                results.append(car)
+        return results
+
+    # Preferencias
+
+    def agregar_preferencia(self, nombre, tipo_preferencia, valor_preferencia) -> bool:
+        """Enlazar al usuario con el nodo del valor preferido (marca, tipo, combustible o transmisión)"""
+        target = PREFERENCE_TARGETS.get(tipo_preferencia)
+        if target is None:
+            logger.warning(f"Tipo de preferencia desconocido: {tipo_preferencia}")
+            return False
+        label, key, _ = target
+        try:
+            linked = execute_write(self.driver, lambda tx: tx.run(f"""
+                MATCH (u:Usuario {{nombre: $nombre}}), (p:{label} {{{key}: $valor}})
+                MERGE (u)-[:PREFIERE]->(p)
+                RETURN count(p) as enlazados
+            """, nombre=nombre, valor=valor_preferencia).single()['enlazados'])
+            return linked > 0
+        except Exception as e:
+            logger.error(f"Error agregando preferencia: {e}")
+            return False
+
+    def eliminar_preferencia(self, nombre, tipo_preferencia, valor_preferencia) -> bool:
+        target = PREFERENCE_TARGETS.get(tipo_preferencia)
+        if target is None:
+            return False
+        label, key, _ = target
+        try:
+            execute_write(self.driver, lambda tx: tx.run(f"""
+                MATCH (:Usuario {{nombre: $nombre}})-[r:PREFIERE]->(:{label} {{{key}: $valor}})
+                DELETE r
+            """, nombre=nombre, valor=valor_preferencia).consume())
+            return True
+        except Exception as e:
+            logger.error(f"Error eliminando preferencia: {e}")
+            return False
+
+    def obtener_preferencias(self, nombre, tipo_preferencia) -> List[str]:
+        target = PREFERENCE_TARGETS.get(tipo_preferencia)
+        if target is None:
+            return []
+        label, key, _ = target
+        records = read_query(self.driver, f"""
+            MATCH (:Usuario {{nombre: $nombre}})-[:PREFIERE]->(p:{label})
+            RETURN p.{key} as valor ORDER BY valor
+        """, {"nombre": nombre})
+        return [record['valor'] for record in records]
+
+    # Recomendaciones
+
+    def generar_recomendaciones(self, nombre, limite: int = RECOMMENDATION_LIMIT) -> List[Dict[str, Any]]:
+        """
+        Recomendaciones para un usuario
+
+        Usa el PageRank personalizado precalculado en lote (una lectura del nodo
+        del usuario). Para usuarios aún sin cálculo recurre a la mezcla de
+        preferencias y co-ocurrencia (ver recomendar_por_coocurrencia).
+        """
+        try:
+            records = read_query(self.driver, PAGERANK_QUERY, {"nombre": nombre, "limite": limite})
+            if records:
+                recommendations = []
+                for record in records:
+                    car = {key: record[key] for key in ('id', 'modelo', 'marca', 'tipo', 'transmision', 'precio')}
+                    car['pagerank'] = round(record['pagerank'], 3)
+                    car['puntuacion'] = car['pagerank']
+                    recommendations.append(car)
+                return recommendations
+        except Exception as e:
+            logger.error(f"Error leyendo PageRank personalizado: {e}")
+        return self.recomendar_por_coocurrencia(nombre, limite)
+
+    def recomendar_por_coocurrencia(self, nombre, limite: int = RECOMMENDATION_LIMIT) -> List[Dict[str, Any]]:
+        """
+        Recomendaciones calculadas al momento
+
+        Puntuación = (1 - COLLABORATIVE_WEIGHT) · preferencias cumplidas / total
+                     + COLLABORATIVE_WEIGHT · co-ocurrencia con sus favoritos.
+        Si el usuario no tiene favoritos (o nadie comparte los suyos) solo cuentan
+        las preferencias, y viceversa.
+        """
+        try:
+            favorites = self.coocurrencias.favorites(nombre)
+            collaborative = dict(self.coocurrencias.related(favorites, k=COLLABORATIVE_CANDIDATES))
+            records = read_query(self.driver, RECOMMENDATION_CANDIDATES_QUERY, {
+                "nombre": nombre, "colaborativos": list(collaborative)
+            })
+        except Exception as e:
+            logger.error(f"Error generando recomendaciones: {e}")
+            return []
+
+        has_preferences = any(record['total_preferencias'] for record in records)
+        content_weight = 1 - COLLABORATIVE_WEIGHT if collaborative else 1.0
+        collaborative_weight = COLLABORATIVE_WEIGHT if has_preferences else 1.0
+
+        recommendations = []
+        for record in records:
+            car = {key: record[key] for key in ('id', 'modelo', 'marca', 'tipo', 'transmision', 'precio')}
+            content = record['coincidencias'] / record['total_preferencias'] if record['total_preferencias'] else 0.0
+            together = collaborative.get(car['id'], 0.0)
+            car['coincidencia_preferencias'] = round(content, 3)
+            car['coocurrencia'] = round(together, 3)
+            car['puntuacion'] = round(
+                (content_weight * content if has_preferences else 0.0)
+                + (collaborative_weight * together if collaborative else 0.0), 3)
+            recommendations.append(car)
+        recommendations.sort(key=lambda car: (-car['puntuacion'], car['precio'] if car['precio'] is not None else math.inf))
+        return recommendations[:limite]
+
+    def agregar_recomendacion(self, nombre, modelo) -> bool:
+        try:
+            linked = execute_write(self.driver, lambda tx: tx.run("""
+                MATCH (u:Usuario {nombre: $nombre}), (a:Auto {modelo: $modelo})
+                MERGE (u)-[:RECOMENDADO]->(a)
+                RETURN count(a) as enlazados
+            """, nombre=nombre, modelo=modelo).single()['enlazados'])
+            return linked > 0
+        except Exception as e:
+            logger.error(f"Error guardando recomendación: {e}")
+            return False
+
+    def obtener_recomendaciones_guardadas(self, nombre) -> List[Dict[str, Any]]:
+        return self._cars("""
+            MATCH (:Usuario {nombre: $nombre})-[:RECOMENDADO]->(a:Auto)
+            WITH a ORDER BY a.modelo
+        """, {"nombre": nombre})
+
+    def limpiar_recomendaciones_de_usuario(self, nombre) -> bool:
+        try:
+            execute_write(self.driver, lambda tx: tx.run(
+                "MATCH (:Usuario {nombre: $nombre})-[r:RECOMENDADO]->() DELETE r", nombre=nombre).consume())
+            return True
+        except Exception as e:
+            logger.error(f"Error limpiando recomendaciones: {e}")
+            return False
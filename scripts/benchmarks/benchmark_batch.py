@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark de recomendaciones por lotes
+Compara get_recommendations perfil a perfil (una sesión y una ida y vuelta por
+perfil) con get_recommendations_batch (una consulta UNWIND por bloque; el pool
+de procesos solo se usa con SERVER_SIDE_SCORING = False). Antes de reportar una
+velocidad se comprueba que el lote entrega lo mismo que get_recommendations.
+Requiere Neo4j con el catálogo cargado.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Agregar la carpeta app al path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "app"))
+
+from precomputed import wizard_combinations
+from recommender import CarRecommender, RecommendationCache
+
+def sample_profiles(count, seed=0):
+    """Perfiles aleatorios tomados de las combinaciones del asistente"""
+    combinations = list(wizard_combinations())
+    return random.Random(seed).choices(combinations, k=count)
+
+
+def result_keys(recommendations):
+    """Lo que debe coincidir entre ambos caminos: autos, puntuaciones, orden y relajación"""
+    return [(car['id'], car.get('similarity_score'), car.get('relaxed_constraints'))
+            for car in recommendations]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de recomendaciones por lotes")
+    parser.add_argument("--profiles", type=int, default=5000, help="Perfiles del lote")
+    parser.add_argument("--loop-profiles", type=int, default=500,
+                        help="Perfiles para la medición perfil a perfil (es mucho más lenta)")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[50, 100, 200], help="Perfiles por UNWIND")
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 4], help="Procesos del pool")
+    args = parser.parse_args()
+
+    # Conexión configurada por las variables NEO4J_*
+    recommender = CarRecommender()
+    # Medir siempre contra Neo4j: sin caché ni resultados precalculados
+    recommender.cache = RecommendationCache(max_bytes=0)
+    recommender.precomputed = None
+
+    try:
+        profiles = sample_profiles(args.profiles)
+
+        loop_profiles = profiles[:args.loop_profiles]
+        started = time.perf_counter()
+        expected = [result_keys(recommender.get_recommendations(**profile)) for profile in loop_profiles]
+        loop_rate = len(loop_profiles) / (time.perf_counter() - started)
+        print(f"🐢 Perfil a perfil: {loop_rate:,.0f} perfiles/s ({len(loop_profiles)} perfiles)")
+
+        for processes in args.processes:
+            for chunk_size in args.chunk_sizes:
+                started = time.perf_counter()
+                produced = [result_keys(recommendations) for recommendations in recommender.get_recommendations_batch(
+                    profiles, chunk_size=chunk_size, processes=processes
+                )]
+                rate = len(produced) / (time.perf_counter() - started)
+                mismatches = [index for index, (keys, batch_keys) in enumerate(zip(expected, produced)) if keys != batch_keys]
+                if len(produced) != len(profiles) or mismatches:
+                    print(f"❌ Lote (UNWIND {chunk_size}, {processes} procesos): {len(produced)} resultados, "
+                          f"{len(mismatches)} perfiles distintos de get_recommendations (ej. {mismatches[:5]})")
+                    sys.exit(1)
+                print(f"🚀 Lote (UNWIND {chunk_size}, {processes} procesos): {rate:,.0f} perfiles/s "
+                      f"({rate / loop_rate:.1f}x)")
+    finally:
+        recommender.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark del PageRank personalizado en lote
+Genera grafos sintéticos (autos con marca y tipo, usuarios con favoritos) y
+mide rank_all_users: el costo depende de los autos favoritos distintos, no de
+la cantidad de usuarios. No necesita Neo4j.
+"""
+
+import argparse
+import random
+import resource
+import sys
+import time
+from pathlib import Path
+
+# Agregar la carpeta app al path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "app"))
+
+from pagerank import PreferenceGraph, rank_all_users
+
+BRANDS = [f"marca_{i}" for i in range(24)]
+TYPES = [f"tipo_{i}" for i in range(12)]
+
+
+def make_graph(cars, users, favorites_per_user, seed=0):
+    """Grafo sintético con favoritos concentrados en los autos populares"""
+    rng = random.Random(seed)
+    graph = PreferenceGraph()
+    car_ids = [f"auto_{i}" for i in range(cars)]
+    for car_id in car_ids:
+        graph.add_car(car_id, rng.choice(BRANDS), rng.choice(TYPES))
+    # Popularidad tipo Zipf: pocos autos reciben la mayoría de los favoritos
+    weights = [1.0 / (rank + 1) for rank in range(cars)]
+    for user in range(users):
+        for car_id in rng.choices(car_ids, weights=weights, k=favorites_per_user):
+            graph.add_user_edge(f"usuario_{user}", 'FAVORITO', car_id)
+    return graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del PageRank personalizado")
+    parser.add_argument("--cars", type=int, nargs="+", default=[2000, 5000], help="Autos del catálogo")
+    parser.add_argument("--users", type=int, nargs="+", default=[10000], help="Usuarios con favoritos")
+    parser.add_argument("--favorites", type=int, default=5, help="Favoritos por usuario")
+    args = parser.parse_args()
+
+    for cars in args.cars:
+        for users in args.users:
+            graph = make_graph(cars, users, args.favorites)
+            started = time.perf_counter()
+            rankings, report = rank_all_users(graph)
+            elapsed = time.perf_counter() - started
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f"⏱️ {cars} autos, {users} usuarios: {report['seed_cars']} semillas, "
+                  f"bloques de {report['block_size']}, base {report['basis_megabytes']:.0f} MB, "
+                  f"{elapsed:.1f} s (memoria máxima del proceso {peak:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la puntuación de similitud
+Compara el bucle de add_similarity_score con la puntuación vectorizada
+(score_vectors + top_k) para distintos tamaños de conjunto de candidatos.
+No necesita Neo4j: los candidatos se generan al azar.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Agregar la carpeta app al path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "app"))
+
+import numpy as np
+
+from recommender import RecommenderBase, RECOMMENDATION_LIMIT
+from scoring import rank_cars, score_vectors, top_k
+
+BRANDS = ["Toyota", "Ford", "BMW", "Tesla", "Honda", "Audi", "Nissan", "Kia"]
+TYPES = ["Sedán", "SUV", "Hatchback", "Pickup", "Coupé"]
+FUELS = ["Gasolina", "Diésel", "Eléctrico", "Híbrido"]
+TRANSMISSIONS = ["Automática", "Manual"]
+FEATURES = ["Bluetooth", "GPS", "Cámara trasera", "Techo solar", "Asientos de cuero", "LED"]
+
+DEFAULT_SIZES = [20, 100, 1000, 10000, 100000]
+
+
+def make_candidates(size, seed=0):
+    """Autos aleatorios en el formato de la API"""
+    rng = random.Random(seed)
+    return [{
+        'id': f"bench_{i}",
+        'price': float(rng.randint(15000, 50000)),
+        'brand': rng.choice(BRANDS),
+        'type': rng.choice(TYPES),
+        'fuel': rng.choice(FUELS),
+        'transmission': rng.choice(TRANSMISSIONS),
+        'features': rng.sample(FEATURES, rng.randint(0, len(FEATURES)))
+    } for i in range(size)]
+
+
+def best_time(function, repeat):
+    """Mejor tiempo de varias ejecuciones (segundos)"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de puntuación de similitud")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Tamaños de candidatos")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por medición")
+    parser.add_argument("--k", type=int, default=RECOMMENDATION_LIMIT, help="Recomendaciones a seleccionar")
+    args = parser.parse_args()
+
+    ranker = RecommenderBase()
+    preferences = ranker.normalize_preferences(
+        brands=["Toyota", "BMW"], budget="15000-50000", fuel="gasolina",
+        types=["suv"], transmission="automatic"
+    )
+
+    print(f"{'candidatos':>10} | {'bucle Python':>14} | {'rank_cars':>14} | {'columnas':>14} | {'aceleración':>11}")
+    print("-" * 76)
+    for size in args.sizes:
+        cars = make_candidates(size)
+
+        # Columnas ya extraídas, como las tiene el catálogo en memoria
+        price = np.array([car['price'] for car in cars])
+        feature_count = np.array([len(car['features']) for car in cars], dtype=np.float64)
+        brand_match = np.array([car['brand'] in preferences['brands'] for car in cars])
+        type_match = np.array([car['type'] in preferences['types'] for car in cars])
+        fuel_match = np.array([car['fuel'] in preferences['fuel'] for car in cars])
+        transmission_match = np.array([car['transmission'] in preferences['transmission'] for car in cars])
+
+        def loop():
+            ranker.add_similarity_score([dict(car) for car in cars], preferences)[:args.k]
+
+        def vectorized_dicts():
+            rank_cars([dict(car) for car in cars], preferences, args.k)
+
+        def vectorized_columns():
+            scores = score_vectors(price, brand_match, type_match, fuel_match, transmission_match,
+                                   feature_count, preferences)
+            top_k(scores, args.k)
+
+        loop_time = best_time(loop, args.repeat)
+        dicts_time = best_time(vectorized_dicts, args.repeat)
+        columns_time = best_time(vectorized_columns, args.repeat)
+
+        print(f"{size:>10} | {size / loop_time:>10,.0f} c/s | {size / dicts_time:>10,.0f} c/s | "
+              f"{size / columns_time:>10,.0f} c/s | {loop_time / columns_time:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Script para recalcular el PageRank personalizado de todos los usuarios
+Lee el grafo usuario-favorito-auto de Neo4j, ejecuta la iteración de potencia
+por bloques de usuarios y guarda el top-k de cada usuario en su nodo
+(u.ppr_autos / u.ppr_puntuaciones), que lee generar_recomendaciones.
+Ejecutar periódicamente (p. ej. cada noche) o tras cargas grandes de favoritos.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Agregar la carpeta app al path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "app"))
+
+from db import create_driver
+from pagerank import (DEFAULT_ALPHA, DEFAULT_BLOCK_SIZE, DEFAULT_MAX_ITERATIONS, DEFAULT_TOLERANCE,
+                      DEFAULT_TOP_K, load_graph, rank_all_users, write_rankings)
+
+
+def print_report(report):
+    print(f"📊 Grafo: {report['nodes']} nodos, {report['edges']} aristas (matriz en {report['build_seconds']:.2f} s)")
+    print(f"📊 {report['users']} usuarios, {report['seed_cars']} autos semilla en {report['blocks']} bloques"
+          f" de {report['block_size']} (iteración {report['iterate_seconds']:.1f} s)")
+    print(f"📊 Base autos x semillas: {report['basis_megabytes']:.0f} MB")
+    print(f"📊 Iteraciones por bloque: media {report['iterations_mean']:.1f}, máximo {report['iterations_max']}")
+    print(f"📊 Tiempo por iteración: media {report['iteration_ms_mean']:.2f} ms, máximo {report['iteration_ms_max']:.2f} ms")
+    if report['unconverged_blocks']:
+        print(f"⚠️ {report['unconverged_blocks']} bloques no convergieron (aumentar --max-iterations)")
+    print(f"📊 Total: {report['total_seconds']:.1f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcular el PageRank personalizado de los usuarios")
+    parser.add_argument("--alpha", type=float, default=DEFAULT_ALPHA, help="Probabilidad de volver a los favoritos")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K, help="Autos guardados por usuario")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Cambio L1 de convergencia")
+    parser.add_argument("--max-iterations", type=int, default=DEFAULT_MAX_ITERATIONS, help="Iteraciones máximas")
+    parser.add_argument("--block-size", type=int, default=None,
+                        help=f"Autos semilla por bloque (omitido: según el tamaño del grafo, máximo {DEFAULT_BLOCK_SIZE})")
+    parser.add_argument("--dry-run", action="store_true", help="Calcular sin escribir en Neo4j")
+    args = parser.parse_args()
+
+    driver = create_driver()
+    try:
+        started = time.perf_counter()
+        graph = load_graph(driver)
+        print(f"✅ Grafo cargado en {time.perf_counter() - started:.1f} s")
+
+        rankings, report = rank_all_users(graph, args.top_k, args.alpha, args.tolerance,
+                                          args.max_iterations, args.block_size)
+        print_report(report)
+
+        if not args.dry_run:
+            started = time.perf_counter()
+            write_rankings(driver, rankings)
+            print(f"✅ Top-{args.top_k} guardado para {len(rankings)} usuarios en {time.perf_counter() - started:.1f} s")
+    except Exception as e:
+        print(f"❌ Error calculando PageRank: {e}")
+        sys.exit(1)
+    finally:
+        driver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,12 @@ Asegura que TODAS las combinaciones de preferencias tengan resultados
 
 from neo4j import GraphDatabase
 import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "app"))
+
+from minhash import index_all_car_features
 
 class DatabaseExpander:
     def __init__(self):
@@ -228,6 +234,10 @@ class DatabaseExpander:
                 """, id=car["id"], transmision=car["transmision"])
             
             print(f"✅ {len(cars)} autos creados con todas sus relaciones")
+        
+        # Firmas MinHash de las características (búsqueda de autos parecidos)
+        total = index_all_car_features(self.driver)
+        print(f"✅ Características indexadas para {total} autos")
     
     def verify_coverage(self):
         """Verificar que todas las combinaciones tengan al menos algunos resultados"""
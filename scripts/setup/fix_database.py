@@ -5,6 +5,12 @@ Borra todo y recrea con relaciones correctas
 """
 
 from neo4j import GraphDatabase
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "app"))
+
+from minhash import index_all_car_features
 
 class DatabaseFixer:
     def __init__(self):
@@ -213,6 +219,10 @@ class DatabaseFixer:
             """)
             
             print("✅ Todos los datos y relaciones creados correctamente")
+        
+        # Firmas MinHash de las características (búsqueda de autos parecidos)
+        total = index_all_car_features(self.driver)
+        print(f"✅ Características indexadas para {total} autos")
     
     def verify_data(self):
         """Verificar que todo esté creado correctamente"""
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Script para precalcular las recomendaciones de todas las combinaciones del asistente
+Carga el catálogo en memoria, calcula el top 10 de cada combinación con un pool
+de procesos y escribe el archivo que usa get_recommendations.
+Ejecutar después de cada carga del catálogo.
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Agregar la carpeta app al path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "app"))
+
+from catalog_engine import CatalogEngine
+from precomputed import DEFAULT_PATH, wizard_combinations, write_precomputed
+from db import create_driver, read_query
+from recommender import RecommenderBase, RecommendationCache, RECOMMENDATION_LIMIT
+from vocabulary import VOCABULARY, VOCABULARY_QUERY
+
+CHUNK_SIZE = 2000
+
+# Estado de cada proceso del pool
+_engine = None
+_ranker = None
+
+
+def _init_worker(records, vocabulary_rows):
+    """
+    Construir el catálogo en memoria dentro del proceso
+
+    Se instala el mismo vocabulario que carga el servidor al arrancar: con el
+    vocabulario por defecto, los valores que solo existen en la base se
+    normalizarían distinto y las claves no coincidirían con las del servidor.
+    """
+    global _engine, _ranker
+    VOCABULARY.install(vocabulary_rows)
+    _engine = CatalogEngine()
+    _engine.load_records(records)
+    _ranker = RecommenderBase()
+
+
+def _materialize_chunk(combinations):
+    """Calcular el top 10 de un bloque de combinaciones"""
+    entries = {}
+    for combination in combinations:
+        preferences = _ranker.normalize_preferences(**combination)
+        key = RecommendationCache.make_key(preferences)
+        if key in entries:
+            continue
+        ordinals, scores = _engine.rank_ordinals(preferences, RECOMMENDATION_LIMIT)
+        entries[key] = [list(pair) for pair in zip(ordinals, scores)]
+    return entries
+
+
+def materialize(records, vocabulary_rows, max_brands=2, max_types=2, processes=None):
+    """
+    Calcular las entradas de todas las combinaciones en paralelo
+
+    Args:
+        records: Filas de CATALOG_QUERY
+        vocabulary_rows: Filas (faceta, valor) de VOCABULARY_QUERY
+    """
+    combinations = list(wizard_combinations(max_brands, max_types))
+    chunks = [combinations[i:i + CHUNK_SIZE] for i in range(0, len(combinations), CHUNK_SIZE)]
+    print(f"🧮 {len(combinations)} combinaciones en {len(chunks)} bloques")
+
+    entries = {}
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(records, vocabulary_rows)) as executor:
+        for chunk_entries in executor.map(_materialize_chunk, chunks):
+            entries.update(chunk_entries)
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precalcular recomendaciones del asistente")
+    parser.add_argument("--max-brands", type=int, default=2, help="Marcas por combinación (máximo)")
+    parser.add_argument("--max-types", type=int, default=2, help="Tipos por combinación (máximo)")
+    parser.add_argument("--processes", type=int, default=None, help="Procesos del pool")
+    parser.add_argument("--output", default=str(DEFAULT_PATH), help="Archivo de salida")
+    args = parser.parse_args()
+
+    driver = create_driver()
+    try:
+        # Primero el vocabulario, como el servidor: fija los ids de las facetas
+        vocabulary_rows = [record.data() for record in read_query(driver, VOCABULARY_QUERY)]
+        VOCABULARY.install(vocabulary_rows)
+
+        engine = CatalogEngine(driver)
+        snapshot = engine.load()
+        print(f"✅ Catálogo cargado: {snapshot.size} filas")
+
+        started = time.perf_counter()
+        entries = materialize(snapshot.records, vocabulary_rows, args.max_brands, args.max_types, args.processes)
+        elapsed = time.perf_counter() - started
+
+        write_precomputed(Path(args.output), snapshot.cars, entries, snapshot.fingerprint, {
+            'max_brands': args.max_brands,
+            'max_types': args.max_types
+        })
+        print(f"✅ {len(entries)} combinaciones únicas en {elapsed:.1f} s -> {args.output}")
+    except Exception as e:
+        print(f"❌ Error precalculando recomendaciones: {e}")
+        sys.exit(1)
+    finally:
+        driver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,13 @@ y poblarla con datos de ejemplo para el sistema de recomendaciones de autos
 
 from neo4j import GraphDatabase
 import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "app"))
+
+from minhash import index_all_car_features
+from vocabulary import DEFAULT_VOCABULARY
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -32,6 +39,8 @@ class Neo4jSetup:
             "CREATE CONSTRAINT tipo_categoria IF NOT EXISTS FOR (t:Tipo) REQUIRE t.categoria IS UNIQUE",
             "CREATE CONSTRAINT combustible_tipo IF NOT EXISTS FOR (c:Combustible) REQUIRE c.tipo IS UNIQUE",
             "CREATE CONSTRAINT transmision_tipo IF NOT EXISTS FOR (tr:Transmision) REQUIRE tr.tipo IS UNIQUE",
+            "CREATE CONSTRAINT usuario_nombre IF NOT EXISTS FOR (u:Usuario) REQUIRE u.nombre IS UNIQUE",
+            "CREATE INDEX auto_modelo IF NOT EXISTS FOR (a:Auto) ON (a.modelo)",
             "CREATE INDEX auto_precio IF NOT EXISTS FOR (a:Auto) ON (a.precio)",
             "CREATE INDEX auto_año IF NOT EXISTS FOR (a:Auto) ON (a.año)"
         ]
@@ -46,12 +55,7 @@ class Neo4jSetup:
     
     def create_brands(self):
         """Crear nodos de marcas"""
-        brands = [
-            "Toyota", "Honda", "Ford", "BMW", "Mercedes-Benz", "Audi", 
-            "Volkswagen", "Nissan", "Hyundai", "Kia", "Mazda", "Subaru",
-            "Chevrolet", "Tesla", "Lexus", "Porsche", "Ferrari", "Lamborghini",
-            "Jaguar", "Land Rover", "Volvo", "Peugeot", "Renault", "Mitsubishi"
-        ]
+        brands = DEFAULT_VOCABULARY['brands']
         
         with self.driver.session() as session:
             for brand in brands:
@@ -63,10 +67,7 @@ class Neo4jSetup:
     
     def create_types(self):
         """Crear nodos de tipos de vehículo"""
-        types = [
-            "Sedán", "SUV", "Hatchback", "Pickup", "Coupé", "Convertible",
-            "Van", "Wagon", "Crossover", "Minivan", "Deportivo", "Lujo"
-        ]
+        types = DEFAULT_VOCABULARY['types']
         
         with self.driver.session() as session:
             for vehicle_type in types:
@@ -78,7 +79,7 @@ class Neo4jSetup:
     
     def create_fuels(self):
         """Crear nodos de tipos de combustible"""
-        fuels = ["Gasolina", "Diésel", "Eléctrico", "Híbrido", "Gas Natural"]
+        fuels = DEFAULT_VOCABULARY['fuel']
         
         with self.driver.session() as session:
             for fuel in fuels:
@@ -90,7 +91,7 @@ class Neo4jSetup:
     
     def create_transmissions(self):
         """Crear nodos de transmisiones"""
-        transmissions = ["Automática", "Manual", "Semiautomática"]
+        transmissions = DEFAULT_VOCABULARY['transmission']
         
         with self.driver.session() as session:
             for transmission in transmissions:
@@ -207,6 +208,11 @@ class Neo4jSetup:
         
         logger.info("Agregadas características a los autos")
     
+    def index_car_features(self):
+        """Firmas MinHash y bandas LSH para buscar autos con características parecidas"""
+        total = index_all_car_features(self.driver)
+        logger.info(f"Indexadas las características de {total} autos")
+    
     def setup_complete_database(self):
         """Configurar completamente la base de datos"""
         logger.info("Iniciando configuración de base de datos Neo4j...")
@@ -226,6 +232,7 @@ class Neo4jSetup:
         # Crear autos y sus relaciones
         self.create_cars()
         self.add_car_features()
+        self.index_car_features()
         
         logger.info("¡Configuración de base de datos completada!")
         
@@ -0,0 +1,124 @@
+"""
+Configuración compartida de las pruebas
+Los módulos de app/ y de la raíz (gestionador.py) se importan por nombre,
+igual que en run.py. Las pruebas no necesitan Neo4j: el catálogo se genera
+en memoria con una semilla fija.
+"""
+
+import importlib.util
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+for path in (str(ROOT_DIR), str(ROOT_DIR / "app")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from vocabulary import DEFAULT_VOCABULARY
+
+FEATURES = ["Bluetooth", "GPS", "Cámara trasera", "Techo solar", "Asientos de cuero",
+            "Control crucero", "Sensores de estacionamiento", "Pantalla táctil"]
+
+
+def make_catalog(size: int = 120, seed: int = 7):
+    """
+    Filas con las columnas de CATALOG_QUERY
+
+    Algunos autos tienen dos combustibles (dos filas con el mismo id), otros
+    no tienen precio o no tienen relaciones, y hay precios repetidos para
+    probar los desempates.
+    """
+    rng = random.Random(seed)
+    records = []
+    for number in range(size):
+        car = {
+            'id': f"auto_{number:03d}",
+            'modelo': f"Modelo {number}",
+            'año': rng.choice([2018, 2020, 2021, 2022, 2023, 2024, None]),
+            'precio': None if number % 29 == 0 else float(rng.randrange(10000, 130000, 500)),
+            'caracteristicas': rng.sample(FEATURES, rng.randrange(0, 5)) or None,
+            'marca': rng.choice(DEFAULT_VOCABULARY['brands'][:8]),
+            'tipo': rng.choice(DEFAULT_VOCABULARY['types'][:6]),
+            'transmision': rng.choice(DEFAULT_VOCABULARY['transmission']),
+        }
+        if number % 31 == 0:
+            car.update(marca=None, tipo=None, transmision=None)
+        fuels = rng.sample(DEFAULT_VOCABULARY['fuel'][:4], 2 if number % 5 == 0 else 1)
+        for fuel in fuels:
+            records.append(dict(car, combustible=None if car['marca'] is None else fuel))
+    return records
+
+
+@pytest.fixture
+def catalog_records():
+    return make_catalog()
+
+
+@pytest.fixture
+def catalog_engine(catalog_records):
+    from catalog_engine import CatalogEngine
+    engine = CatalogEngine()
+    engine.load_records(catalog_records)
+    return engine
+
+
+@pytest.fixture
+def ranker():
+    from recommender import RecommenderBase
+    return RecommenderBase()
+
+
+def reference_rows(records, preferences):
+    """
+    Ordinales que devuelve la consulta Cypher de recomendaciones
+
+    Filtro por presupuesto y por cada faceta presente, ordenados por precio
+    ascendente con el orden de carga como desempate.
+    """
+    columns = {'brands': 'marca', 'types': 'tipo', 'fuel': 'combustible', 'transmission': 'transmision'}
+    rows = []
+    for ordinal, record in enumerate(records):
+        price = record['precio']
+        if price is None or not preferences['min_price'] <= price <= preferences['max_price']:
+            continue
+        if all(not preferences[facet] or record[column] in preferences[facet]
+               for facet, column in columns.items()):
+            rows.append(ordinal)
+    return sorted(rows, key=lambda ordinal: records[ordinal]['precio'])
+
+
+def preference_samples(count: int = 200, seed: int = 11):
+    """Selecciones del asistente al azar (argumentos de normalize_preferences)"""
+    rng = random.Random(seed)
+    budgets = [None, "15000-30000", "30000-50000", "50000-100000", "100000+", "40000"]
+
+    def pick(values, most):
+        return rng.sample(values, rng.randrange(0, most + 1)) or None
+
+    for _ in range(count):
+        yield {
+            'brands': pick(DEFAULT_VOCABULARY['brands'][:9], 3),
+            'budget': rng.choice(budgets),
+            'fuel': pick(DEFAULT_VOCABULARY['fuel'][:4], 2),
+            'types': pick(DEFAULT_VOCABULARY['types'][:6], 2),
+            'transmission': pick(DEFAULT_VOCABULARY['transmission'], 1),
+        }
+
+
+def load_app_module(monkeypatch, name: str):
+    """
+    Importar app/app.py con el respaldo recommender_minimal
+
+    recommender.py se marca como no importable y no se reconfigura el logging
+    raíz; cada prueba reemplaza las funciones del módulo que necesita.
+    """
+    import log_setup
+    monkeypatch.setitem(sys.modules, 'recommender', None)
+    monkeypatch.setattr(log_setup, 'configure_logging', lambda: None)
+    spec = importlib.util.spec_from_file_location(name, ROOT_DIR / "app" / "app.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,62 @@
+"""
+Recomendador asíncrono: las consultas estricta y relajada viajan a la vez y la
+relajada solo se usa cuando la estricta no encuentra autos.
+"""
+
+import asyncio
+
+import async_recommender
+from async_recommender import AsyncCarRecommender
+from conftest import make_catalog
+from recommender import RecommendationCache
+
+
+def recommender_without_connection() -> AsyncCarRecommender:
+    instance = AsyncCarRecommender.__new__(AsyncCarRecommender)
+    instance.catalog_engine = None
+    instance.precomputed = None
+    instance.cache = RecommendationCache(max_bytes=0)
+    instance.driver = object()
+    return instance
+
+
+def fake_queries(monkeypatch, strict_rows, relaxed_rows):
+    """Reemplazar async_read_query; cada consulta espera a que la otra esté en curso"""
+    in_flight = {'count': 0, 'max': 0}
+    both_started = asyncio.Event()
+
+    async def fake_read_query(driver, query, parameters=None):
+        in_flight['count'] += 1
+        in_flight['max'] = max(in_flight['max'], in_flight['count'])
+        if in_flight['count'] == 2:
+            both_started.set()
+        await asyncio.wait_for(both_started.wait(), timeout=1)
+        in_flight['count'] -= 1
+        return relaxed_rows if 'relaxation_level' in query else strict_rows
+
+    monkeypatch.setattr(async_recommender, 'async_read_query', fake_read_query)
+    return in_flight
+
+
+def row(record, score, level=None):
+    row = dict(record, similarity_score=score)
+    if level is not None:
+        row['relaxation_level'] = level
+    return row
+
+
+def test_strict_and_relaxed_queries_run_concurrently(monkeypatch):
+    records = [record for record in make_catalog(10) if record['precio'] is not None]
+    in_flight = fake_queries(monkeypatch, [row(records[0], 40.0)], [row(records[1], 10.0, level=2)])
+    recommendations = asyncio.run(recommender_without_connection().get_recommendations(brands=['Toyota']))
+    assert in_flight['max'] == 2
+    assert [car['id'] for car in recommendations] == [records[0]['id']]
+    assert 'relaxed_constraints' not in recommendations[0]
+
+
+def test_relaxed_results_used_when_strict_is_empty(monkeypatch):
+    records = [record for record in make_catalog(10) if record['precio'] is not None]
+    fake_queries(monkeypatch, [], [row(records[1], 10.0, level=4), row(records[2], 5.0, level=4)])
+    recommendations = asyncio.run(recommender_without_connection().get_recommendations(brands=['Toyota']))
+    assert [car['id'] for car in recommendations] == [records[1]['id'], records[2]['id']]
+    assert recommendations[0]['relaxed_constraints'] == ['brands']
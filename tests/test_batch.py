@@ -0,0 +1,47 @@
+"""
+Recomendaciones por lotes: cada perfil recibe lo mismo que get_recommendations,
+incluida la relajación de filtros cuando no hay coincidencias exactas.
+"""
+
+from conftest import preference_samples
+from recommender import CarRecommender, RecommendationCache, PROFILE_FIELDS
+
+
+def recommender_with(engine) -> CarRecommender:
+    """CarRecommender sin conexión, sin caché ni precalculados"""
+    instance = CarRecommender.__new__(CarRecommender)
+    instance.catalog_engine = engine
+    instance.precomputed = None
+    instance.cache = RecommendationCache(max_bytes=0)
+    return instance
+
+
+def result_keys(recommendations):
+    return [(car['id'], car['similarity_score'], car.get('relaxed_constraints')) for car in recommendations]
+
+
+def test_memory_batch_matches_get_recommendations(catalog_engine):
+    instance = recommender_with(catalog_engine)
+    profiles = [{name: selection.get(name) for name in PROFILE_FIELDS} for selection in preference_samples(120)]
+    # Perfiles sin coincidencias exactas: pasan por la relajación
+    profiles.append({'brands': ['Ferrari'], 'budget': '0-20000', 'fuel': ['Eléctrico']})
+    expected = [result_keys(instance.get_recommendations(**profile)) for profile in profiles]
+    produced = [result_keys(cars) for cars in instance.get_recommendations_batch(profiles, chunk_size=7)]
+    assert produced == expected
+    assert any(keys and keys[0][2] for keys in expected)
+
+
+def test_complete_batch_relaxes_empty_profiles(monkeypatch, ranker):
+    instance = recommender_with(None)
+    relaxed = [{'id': 'auto_1', 'similarity_score': 10.0, 'relaxed_constraints': ['fuel']}]
+    calls = []
+    monkeypatch.setattr(instance, 'query_relaxed_recommendations',
+                        lambda preferences, k, weights: calls.append(preferences) or relaxed)
+    preferences_chunk = [ranker.normalize_preferences(brands=['Toyota']), ranker.normalize_preferences(fuel=['Diésel'])]
+    exact = [{'id': 'auto_2', 'similarity_score': 30.0}]
+
+    assert list(instance.complete_batch(preferences_chunk, [exact, []])) == [exact, relaxed]
+    assert calls == [preferences_chunk[1]]
+    # Consulta del bloque fallida: listas vacías, sin relajar
+    assert list(instance.complete_batch(preferences_chunk, None)) == [[], []]
+    assert len(calls) == 1
@@ -0,0 +1,57 @@
+"""
+Las escrituras de Gestionador deben llegar al recomendador de la aplicación
+(caché de resultados, catálogo en memoria e índice de similares).
+"""
+
+import pytest
+
+import gestionador
+import recommender
+
+
+class FakeDriver:
+    def close(self):
+        pass
+
+
+class FakeRecommender:
+    def __init__(self):
+        self.refreshes = 0
+        self.similarity_updates = []
+
+    def refresh_catalog(self):
+        self.refreshes += 1
+
+    def update_similarity_index(self, event, car_id):
+        self.similarity_updates.append((event, car_id))
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(gestionador, 'create_driver', lambda *args: FakeDriver())
+    monkeypatch.setattr(gestionador, 'read_query', lambda *args, **kwargs: [{'mensaje': 'ok'}])
+    manager = gestionador.Gestionador()
+    yield manager
+    manager.close()
+
+
+def test_writes_invalidate_the_active_recommender(manager, monkeypatch):
+    active = FakeRecommender()
+    monkeypatch.setattr(recommender, '_recommender_instance', active)
+    manager._notify_change('update', 'auto_001')
+    manager._notify_change('delete', 'auto_002')
+    assert active.refreshes == 2
+    assert active.similarity_updates == [('update', 'auto_001'), ('delete', 'auto_002')]
+
+
+def test_writes_without_recommender_are_ignored(manager, monkeypatch):
+    monkeypatch.setattr(recommender, '_recommender_instance', None)
+    manager._notify_change('create', 'auto_003')
+
+
+def test_close_unregisters_the_listener(manager, monkeypatch):
+    active = FakeRecommender()
+    monkeypatch.setattr(recommender, '_recommender_instance', active)
+    manager.close()
+    manager._notify_change('update', 'auto_001')
+    assert active.refreshes == 0
@@ -0,0 +1,100 @@
+"""
+Catálogo en memoria: los filtros y conteos vectorizados deben coincidir con
+los de la consulta Cypher, reproducida aquí fila por fila.
+"""
+
+import pytest
+
+from catalog_engine import CatalogEngine, car_from_record
+from conftest import make_catalog, preference_samples, reference_rows
+
+
+def distinct_cars(records, ordinals):
+    return len({records[ordinal]['id'] for ordinal in ordinals})
+
+
+def test_query_matches_reference_filter(catalog_engine, catalog_records, ranker):
+    for selection in preference_samples():
+        preferences = ranker.normalize_preferences(**selection)
+        expected = reference_rows(catalog_records, preferences)
+        assert catalog_engine.query_ordinals(preferences, limit=None) == expected, selection
+
+
+def test_query_hydrates_rows_like_neo4j(catalog_engine, catalog_records, ranker):
+    preferences = ranker.normalize_preferences(budget="30000-50000")
+    rows = catalog_engine.query(preferences, limit=5)
+    expected = [car_from_record(catalog_records[ordinal])
+                for ordinal in reference_rows(catalog_records, preferences)[:5]]
+    assert rows == expected
+
+
+def test_hydrate_returns_independent_copies(catalog_engine, ranker):
+    preferences = ranker.normalize_preferences()
+    first = catalog_engine.query(preferences, limit=1)[0]
+    first['features'].append("Modificado")
+    first['price'] = -1
+    second = catalog_engine.query(preferences, limit=1)[0]
+    assert "Modificado" not in second['features']
+    assert second['price'] != -1
+
+
+def test_cars_without_price_never_match(catalog_engine, catalog_records, ranker):
+    unpriced = {ordinal for ordinal, record in enumerate(catalog_records) if record['precio'] is None}
+    assert unpriced
+    preferences = ranker.normalize_preferences()
+    assert not unpriced & set(catalog_engine.query_ordinals(preferences, limit=None))
+
+
+def test_unknown_values_match_nothing(catalog_engine, ranker):
+    preferences = ranker.normalize_preferences(brands=["Marca inexistente"])
+    assert catalog_engine.query_ordinals(preferences, limit=None) == []
+
+
+def test_count_cars_counts_distinct_cars(catalog_engine, catalog_records, ranker):
+    for selection in preference_samples(50):
+        preferences = ranker.normalize_preferences(**selection)
+        expected = distinct_cars(catalog_records, reference_rows(catalog_records, preferences))
+        assert catalog_engine.count_cars(preferences) == expected
+
+
+@pytest.mark.parametrize('facet', ['brands', 'types', 'fuel', 'transmission'])
+def test_facet_counts_ignore_own_selection(catalog_engine, catalog_records, ranker, facet):
+    for selection in preference_samples(40):
+        preferences = ranker.normalize_preferences(**selection)
+        counts = catalog_engine.facet_counts(preferences, facet)
+        for value, count in counts.items():
+            expected = reference_rows(catalog_records, {**preferences, facet: [value]})
+            assert count == distinct_cars(catalog_records, expected), (facet, value)
+
+
+def test_budget_counts_match_reference(catalog_engine, catalog_records, ranker):
+    ranges = {label: ranker.parse_budget_range(label)
+              for label in ["15000-30000", "30000-50000", "50000-100000", "100000+"]}
+    for selection in preference_samples(40):
+        preferences = ranker.normalize_preferences(**dict(selection, budget=None))
+        counts = catalog_engine.budget_counts(preferences, ranges)
+        for label, (min_price, max_price) in ranges.items():
+            expected = reference_rows(catalog_records, dict(preferences, min_price=min_price, max_price=max_price))
+            assert counts[label] == distinct_cars(catalog_records, expected), label
+
+
+def test_selectivity_reports_intersection(catalog_engine, catalog_records, ranker):
+    preferences = ranker.normalize_preferences(brands=["Toyota", "Honda"], fuel="Gasolina", budget="100000+")
+    selectivity = catalog_engine.selectivity(preferences)
+    assert selectivity['matches'] == len(reference_rows(catalog_records, preferences))
+    assert selectivity['intersections']['fuel'] <= selectivity['facets']['brands']
+
+
+def test_snapshot_fingerprint_tracks_content():
+    records = make_catalog(20)
+    same = CatalogEngine().load_records([dict(record) for record in records])
+    changed_records = [dict(record) for record in records]
+    changed_records[3]['precio'] = 1.0
+    changed = CatalogEngine().load_records(changed_records)
+    assert CatalogEngine().load_records(records).fingerprint == same.fingerprint
+    assert changed.fingerprint != same.fingerprint
+
+
+def test_unloaded_engine_raises():
+    with pytest.raises(RuntimeError):
+        CatalogEngine().query({'min_price': 0, 'max_price': float('inf')})
@@ -0,0 +1,66 @@
+"""
+Estadísticas del catálogo: mínimo y máximo salen del índice de precio y el
+promedio del catálogo en memoria; sin él se agrega en Neo4j.
+"""
+
+import catalog_statistics
+from catalog_statistics import (STATISTICS_QUERY, STATISTICS_WITH_AVERAGE_QUERY, StatisticsService,
+                                build_statistics)
+
+
+def statistics_row(**overrides):
+    row = {
+        'total_nodes': 10, 'total_relationships': 20, 'total_cars': 4,
+        'precio_min': 12000, 'precio_max': 90000,
+        'cars_by_brand': [{'marca': 'Honda', 'cantidad': 1}, {'marca': 'Toyota', 'cantidad': 3}],
+        'cars_by_type': [{'tipo': 'SUV', 'cantidad': 2}, {'tipo': 'Sedán', 'cantidad': 2}],
+        'node_labels': ['Marca', 'Auto'], 'relationship_types': ['ES_MARCA'], 'neo4j_version': None,
+    }
+    row.update(overrides)
+    return row
+
+
+def test_queries_only_scan_for_the_average():
+    assert 'avg(' not in STATISTICS_QUERY
+    assert 'ORDER BY precio ASC LIMIT 1' in STATISTICS_QUERY
+    assert 'ORDER BY precio DESC LIMIT 1' in STATISTICS_QUERY
+    assert 'avg(a.precio) AS precio_promedio' in STATISTICS_WITH_AVERAGE_QUERY
+
+
+def test_build_statistics():
+    statistics = build_statistics(statistics_row(precio_promedio=45123.456))
+    assert statistics['price_range'] == {'min': 12000, 'max': 90000, 'average': 45123.46}
+    assert [item['marca'] for item in statistics['cars_by_brand']] == ['Toyota', 'Honda']
+    assert [item['tipo'] for item in statistics['cars_by_type']] == ['SUV', 'Sedán']
+    assert statistics['node_labels'] == ['Auto', 'Marca']
+    assert statistics['neo4j_version'] == 'Unknown'
+    summary = {'min': 12000.0, 'max': 90000.0, 'average': 50000.004}
+    assert build_statistics(statistics_row(), summary)['price_range']['average'] == 50000.0
+
+
+def test_service_uses_price_summary(monkeypatch):
+    queries = []
+
+    def fake_read_query(driver, query, parameters=None, timeout=None):
+        queries.append(query)
+        return [statistics_row(precio_promedio=1.0)]
+
+    monkeypatch.setattr(catalog_statistics, 'read_query', fake_read_query)
+    summary = {'min': 12000.0, 'max': 90000.0, 'average': 30000.0}
+    service = StatisticsService(object(), price_summary=lambda: summary)
+    assert service.refresh()['price_range']['average'] == 30000.0
+    assert queries[-1] == STATISTICS_QUERY
+
+    # Catálogo en memoria sin cargar: el promedio se consulta a Neo4j
+    service = StatisticsService(object(), price_summary=lambda: None)
+    assert service.refresh()['price_range']['average'] == 1.0
+    assert queries[-1] == STATISTICS_WITH_AVERAGE_QUERY
+    assert StatisticsService(object()).get()['price_range']['average'] == 1.0
+
+
+def test_catalog_price_summary_counts_each_car_once(catalog_engine, catalog_records):
+    prices = {record['id']: record['precio'] for record in catalog_records if record['precio'] is not None}
+    summary = catalog_engine.price_summary()
+    assert summary['min'] == min(prices.values())
+    assert summary['max'] == max(prices.values())
+    assert abs(summary['average'] - sum(prices.values()) / len(prices)) < 1e-6
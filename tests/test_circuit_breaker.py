@@ -0,0 +1,85 @@
+"""
+Cortocircuito: apertura tras fallos seguidos, una sola prueba en semiabierto
+y espera exponencial entre pruebas fallidas.
+"""
+
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Reloj monotónico controlado por la prueba"""
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def open_breaker(clock) -> CircuitBreaker:
+    breaker = CircuitBreaker('prueba', failure_threshold=3, base_backoff=1.0, max_backoff=4.0)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_threshold_and_rejects(clock):
+    breaker = CircuitBreaker('prueba', failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.stats()['rejected'] == 1
+
+
+def test_success_resets_consecutive_failures(clock):
+    breaker = CircuitBreaker('prueba', failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_single_probe_when_half_open(clock):
+    breaker = open_breaker(clock)
+    clock[0] += 1.0
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probes_double_backoff_up_to_max(clock):
+    breaker = open_breaker(clock)
+    waits = []
+    for _ in range(4):
+        waits.append(breaker.backoff)
+        clock[0] += breaker.backoff - 0.01
+        assert not breaker.allow()
+        clock[0] += 0.01
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+    assert waits == [1.0, 2.0, 4.0, 4.0]
+    breaker.record_success()
+    assert breaker.backoff == 1.0
+
+
+def test_neutral_releases_probe_without_closing(clock):
+    breaker = open_breaker(clock)
+    clock[0] += 1.0
+    assert breaker.allow()
+    breaker.record_neutral()
+    assert breaker.state == HALF_OPEN
+    assert breaker.stats()['consecutive_failures'] == 3
+    # La siguiente llamada vuelve a ser la prueba
+    assert breaker.allow()
+    assert not breaker.allow()
+    assert breaker.stats()['neutral'] == 1
@@ -0,0 +1,73 @@
+"""
+Matriz de co-ocurrencia: las altas y bajas incrementales deben dejar los
+mismos conteos que reconstruirla desde cero.
+"""
+
+import math
+import random
+
+from cooccurrence import CoOccurrenceMatrix
+
+
+def rebuilt(matrix: CoOccurrenceMatrix) -> CoOccurrenceMatrix:
+    return CoOccurrenceMatrix((user, car_id) for user, cars in matrix.user_favorites.items() for car_id in cars)
+
+
+def as_plain(matrix: CoOccurrenceMatrix):
+    pairs = {car_id: dict(row) for car_id, row in matrix.pairs.items() if row}
+    return pairs, dict(matrix.counts)
+
+
+def test_pairs_are_symmetric_counts():
+    matrix = CoOccurrenceMatrix([('ana', 'a'), ('ana', 'b'), ('luis', 'a'), ('luis', 'b'), ('luis', 'c')])
+    assert matrix.pairs['a']['b'] == matrix.pairs['b']['a'] == 2
+    assert matrix.pairs['a']['c'] == matrix.pairs['c']['a'] == 1
+    assert 'a' not in matrix.pairs['a']
+    assert len(matrix) == 5
+
+
+def test_duplicate_and_missing_favorites():
+    matrix = CoOccurrenceMatrix([('ana', 'a')])
+    assert not matrix.add('ana', 'a')
+    assert not matrix.remove('ana', 'b')
+    assert not matrix.remove('luis', 'a')
+    assert len(matrix) == 1
+
+
+def test_incremental_updates_match_rebuild():
+    rng = random.Random(3)
+    matrix = CoOccurrenceMatrix()
+    users = [f"usuario_{n}" for n in range(12)]
+    cars = [f"auto_{n}" for n in range(15)]
+    for step in range(600):
+        user, car_id = rng.choice(users), rng.choice(cars)
+        if rng.random() < 0.6:
+            matrix.add(user, car_id)
+        else:
+            matrix.remove(user, car_id)
+        if step % 150 == 149:
+            matrix.remove_car(rng.choice(cars))
+            matrix.remove_user(rng.choice(users))
+        assert as_plain(matrix) == as_plain(rebuilt(matrix))
+
+
+def test_related_uses_mean_cosine_and_excludes_seeds():
+    matrix = CoOccurrenceMatrix([
+        ('ana', 'a'), ('ana', 'b'),
+        ('luis', 'a'), ('luis', 'b'), ('luis', 'c'),
+        ('eva', 'c'), ('eva', 'd'),
+    ])
+    related = dict(matrix.related(['a']))
+    assert set(related) == {'b', 'c'}
+    assert math.isclose(related['b'], 2 / math.sqrt(2 * 2))
+    assert math.isclose(related['c'], 1 / math.sqrt(2 * 2))
+
+    related = matrix.related(['a', 'c'], exclude=['d'])
+    assert [car_id for car_id, _ in related] == ['b']
+    assert math.isclose(related[0][1], (2 / math.sqrt(4) + 1 / math.sqrt(4)) / 2)
+
+
+def test_related_without_history():
+    matrix = CoOccurrenceMatrix()
+    assert matrix.related([]) == []
+    assert matrix.related(['desconocido']) == []
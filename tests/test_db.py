@@ -0,0 +1,109 @@
+"""
+read_query contra un driver simulado: el timeout viaja en la función de trabajo
+(como lo lee session.execute_read) y no como Query dentro de la transacción.
+"""
+
+import pytest
+
+import db
+
+
+class StubTransaction:
+    def __init__(self, records):
+        self.records = records
+        self.runs = []
+
+    def run(self, query, parameters=None):
+        # Igual que el driver: Query(timeout=...) solo vale en session.run
+        if not isinstance(query, str):
+            raise TypeError("Query object is only supported for session.run")
+        self.runs.append((query, parameters))
+        return iter(self.records)
+
+
+class StubSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_read(self, work):
+        self.driver.transaction_timeouts.append(getattr(work, 'timeout', None))
+        return work(self.driver.tx)
+
+
+class StubDriver:
+    def __init__(self, records):
+        self.tx = StubTransaction(records)
+        self.session_kwargs = []
+        self.transaction_timeouts = []
+        self.executed = []
+
+    def session(self, **kwargs):
+        self.session_kwargs.append(kwargs)
+        return StubSession(self)
+
+    def execute_query(self, query, parameters=None, **kwargs):
+        self.executed.append((query, parameters, kwargs))
+        return list(self.tx.records), None, None
+
+
+def test_timeout_goes_to_transaction_and_pool():
+    driver = StubDriver([{'id': 'auto_1'}])
+    assert db.read_query(driver, "MATCH (a:Auto) RETURN a.id as id", {'k': 1}, timeout=2.5) == [{'id': 'auto_1'}]
+    assert driver.transaction_timeouts == [2.5]
+    assert driver.session_kwargs[0]['connection_acquisition_timeout'] == 2.5
+    assert driver.session_kwargs[0]['default_access_mode'] == db.READ_ACCESS
+    assert driver.tx.runs == [("MATCH (a:Auto) RETURN a.id as id", {'k': 1})]
+
+
+def test_exhausted_timeout_raises_before_running():
+    driver = StubDriver([])
+    with pytest.raises(TimeoutError):
+        db.read_query(driver, "RETURN 1", timeout=0)
+    assert driver.tx.runs == []
+
+
+def test_without_timeout_uses_execute_query():
+    driver = StubDriver([{'n': 1}])
+    assert db.read_query(driver, "RETURN 1 as n") == [{'n': 1}]
+    assert driver.session_kwargs == []
+    assert driver.executed[0][2]['routing_'] == db.RoutingControl.READ
+
+
+class StubNeo4jError(Exception):
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+def test_is_timeout():
+    assert db.is_timeout(TimeoutError("plazo"))
+    assert db.is_timeout(StubNeo4jError("cortada", code="Neo.ClientError.Transaction.TransactionTimedOut"))
+    assert db.is_timeout(StubNeo4jError("failed to obtain a connection from the pool within 2.0s"))
+    assert not db.is_timeout(StubNeo4jError("sintaxis", code="Neo.ClientError.Statement.SyntaxError"))
+    assert not db.is_timeout(ValueError("otro"))
+
+
+@pytest.mark.parametrize('error, failures, neutral', [
+    (TimeoutError("plazo"), 1, 0),
+    (StubNeo4jError("sintaxis", code="Neo.ClientError.Statement.SyntaxError"), 0, 1),
+])
+def test_facet_count_errors_reach_the_breaker(monkeypatch, error, failures, neutral):
+    import recommender
+    breaker = recommender.CircuitBreaker('prueba')
+    monkeypatch.setattr(recommender, 'NEO4J_BREAKER', breaker)
+    instance = recommender.CarRecommender.__new__(recommender.CarRecommender)
+    instance.catalog_engine = None
+
+    def failing_query(*args):
+        raise error
+
+    monkeypatch.setattr(instance, 'query_facet_counts', failing_query)
+    assert instance.get_facet_counts('fuel', {})['source'] == 'unavailable'
+    stats = breaker.stats()
+    assert (stats['successes'], stats['failures'], stats['neutral']) == (0, failures, neutral)
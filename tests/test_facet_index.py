@@ -0,0 +1,56 @@
+"""
+Bitsets por faceta: OR dentro de una faceta y AND entre facetas, igual que
+las máscaras booleanas equivalentes.
+"""
+
+import numpy as np
+
+from facet_index import FacetBitmapIndex
+
+VOCAB = {
+    'brands': {'Toyota': 0, 'Honda': 1, 'Ford': 2},
+    'fuel': {'Gasolina': 0, 'Eléctrico': 1},
+}
+# 11 filas: el último byte del bitset queda incompleto
+CODES = {
+    'brands': np.array([0, 1, 2, 0, 1, -1, 2, 0, 0, 1, 2], dtype=np.int32),
+    'fuel': np.array([0, 0, 1, 1, -1, 0, 0, 1, 0, 1, 0], dtype=np.int32),
+}
+
+
+def build_index() -> FacetBitmapIndex:
+    return FacetBitmapIndex(len(CODES['brands']), CODES, VOCAB)
+
+
+def mask(facet, values):
+    return np.isin(CODES[facet], [VOCAB[facet][value] for value in values])
+
+
+def test_facet_bits_or_values():
+    index = build_index()
+    bits = index.facet_bits('brands', ['Toyota', 'Ford'])
+    assert np.array_equal(index.to_mask(bits), mask('brands', ['Toyota', 'Ford']))
+    assert index.cardinality(bits) == int(mask('brands', ['Toyota', 'Ford']).sum())
+
+
+def test_resolve_and_between_facets():
+    index = build_index()
+    bits = index.resolve({'brands': ['Toyota', 'Honda'], 'fuel': ['Eléctrico']})
+    expected = mask('brands', ['Toyota', 'Honda']) & mask('fuel', ['Eléctrico'])
+    assert np.array_equal(index.to_mask(bits), expected)
+    assert index.resolve({}) is None
+
+
+def test_unknown_values_select_nothing():
+    index = build_index()
+    assert index.cardinality(index.facet_bits('brands', ['Tesla'])) == 0
+    assert index.cardinality(index.facet_bits('transmission', ['Manual'])) == 0
+
+
+def test_selectivity_accumulates_intersections():
+    index = build_index()
+    selectivity = index.selectivity({'brands': ['Toyota'], 'fuel': ['Gasolina']})
+    assert selectivity['facets'] == {'brands': 4, 'fuel': 6}
+    assert selectivity['intersections'] == {'brands': 4, 'fuel': 2}
+    assert selectivity['matches'] == 2
+    assert index.selectivity({})['matches'] == 11
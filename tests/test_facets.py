@@ -0,0 +1,108 @@
+"""
+Conteos del asistente (/api/facets): por cada opción de un paso, los autos
+distintos que quedarían con las selecciones de los pasos anteriores,
+comparados con un filtro fila por fila sobre el catálogo generado.
+"""
+
+import pytest
+
+from conftest import load_app_module, preference_samples, reference_rows
+from recommender import CarRecommender, WIZARD_STEPS
+
+STEPS = [name for name, _ in WIZARD_STEPS]
+
+# Opción del asistente -> valor del catálogo, escrito a mano
+CATALOG_VALUES = {
+    'brands': {'Mercedes': "Mercedes-Benz"},
+    'fuel': {'gasolina': "Gasolina", 'diesel': "Diésel", 'electrico': "Eléctrico", 'hibrido': "Híbrido"},
+    'types': {'sedan': "Sedán", 'suv': "SUV", 'hatchback': "Hatchback", 'pickup': "Pickup",
+              'coupe': "Coupé", 'convertible': "Convertible"},
+    'transmission': {'automatic': "Automática", 'manual': "Manual", 'semiautomatic': "Semiautomática"},
+}
+
+
+def recommender_with(engine) -> CarRecommender:
+    """CarRecommender sin conexión, solo con el catálogo en memoria"""
+    instance = CarRecommender.__new__(CarRecommender)
+    instance.catalog_engine = engine
+    return instance
+
+
+def expected_counts(records, ranker, step, selections):
+    """Autos distintos por opción, filtrando fila por fila"""
+    previous = {name: selections.get(name) for name in STEPS[:STEPS.index(step)]}
+    preferences = ranker.normalize_preferences(**previous)
+    counts = {}
+    for option in dict(WIZARD_STEPS)[step]:
+        if step == 'budget':
+            min_price, max_price = ranker.parse_budget_range(option)
+            narrowed = dict(preferences, min_price=min_price, max_price=max_price)
+        else:
+            narrowed = dict(preferences, **{step: [CATALOG_VALUES[step].get(option, option)]})
+        counts[option] = len({records[ordinal]['id'] for ordinal in reference_rows(records, narrowed)})
+    return counts
+
+
+@pytest.mark.parametrize('step', STEPS)
+def test_counts_match_reference_filter(catalog_engine, catalog_records, ranker, step):
+    recommender = recommender_with(catalog_engine)
+    for selections in preference_samples(40):
+        facets = recommender.get_facet_counts(step, selections)
+        assert facets['source'] == 'memory'
+        assert facets['counts'] == expected_counts(catalog_records, ranker, step, selections), selections
+
+
+def test_later_steps_do_not_change_counts(catalog_engine):
+    recommender = recommender_with(catalog_engine)
+    selections = {'brands': ['Toyota', 'Honda'], 'budget': "30000-50000"}
+    counts = recommender.get_facet_counts('fuel', selections)['counts']
+    assert recommender.get_facet_counts('fuel', dict(selections, fuel=['diesel'], types=['suv']))['counts'] == counts
+    assert sum(counts.values()) > 0
+
+
+@pytest.fixture
+def facets_app(monkeypatch):
+    """app.py con get_facet_counts reemplazado por uno que registra sus argumentos"""
+    module = load_app_module(monkeypatch, "app_facets")
+    calls = []
+
+    def facet_counts(step, selections):
+        calls.append((step, selections))
+        return {'step': step, 'counts': {'x': 1}, 'source': 'memory'}
+
+    monkeypatch.setattr(module, 'get_facet_counts', facet_counts)
+    return module, calls
+
+
+def test_route_passes_session_selections(facets_app):
+    module, calls = facets_app
+    client = module.app.test_client()
+    with client.session_transaction() as session:
+        session['selected_brands'] = ['Toyota']
+        session['selected_budget'] = "30000-50000"
+    response = client.get("/api/facets?step=fuel")
+    assert response.status_code == 200
+    assert response.get_json() == {'step': 'fuel', 'counts': {'x': 1}, 'source': 'memory'}
+    step, selections = calls[-1]
+    assert step == 'fuel'
+    assert selections['brands'] == ['Toyota'] and selections['budget'] == "30000-50000"
+    assert selections['fuel'] is None
+
+
+def test_route_defaults_to_first_unanswered_step(facets_app):
+    module, calls = facets_app
+    client = module.app.test_client()
+    with client.session_transaction() as session:
+        session['selected_brands'] = ['Toyota']
+    assert client.get("/api/facets").get_json()['step'] == 'budget'
+
+
+def test_route_rejects_unknown_step_and_reports_unavailable(facets_app, monkeypatch):
+    module, calls = facets_app
+    client = module.app.test_client()
+    assert client.get("/api/facets?step=colores").status_code == 400
+    assert not calls
+    monkeypatch.setattr(module, 'get_facet_counts', lambda step, selections: None)
+    response = client.get("/api/facets?step=brands")
+    assert response.status_code == 503
+    assert response.get_json()['source'] == 'unavailable'
@@ -0,0 +1,121 @@
+"""
+Logging en cola: el hilo que registra solo encola y el listener arma el
+texto (mensaje, campos extra y excepción) en formato texto o JSON.
+"""
+
+import json
+import logging
+import queue
+import sys
+import threading
+from logging.handlers import QueueListener
+
+import pytest
+
+import log_setup
+from log_setup import DeferredQueueHandler, StructuredFormatter
+
+
+def make_record(msg="Recomendaciones servidas", args=None, exc_info=None, **fields):
+    record = logging.LogRecord('app', logging.INFO, __file__, 10, msg, args, exc_info)
+    record.__dict__.update(fields)
+    return record
+
+
+class CapturingHandler(logging.Handler):
+    """Guarda el texto formateado y el hilo que lo formateó"""
+
+    def __init__(self, formatter):
+        super().__init__()
+        self.setFormatter(formatter)
+        self.lines = []
+        self.done = threading.Event()
+
+    def emit(self, record):
+        self.lines.append((self.format(record), threading.current_thread().name))
+        self.done.set()
+
+
+class Recorder:
+    """Argumento que registra en qué hilo se convirtió a texto"""
+
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread().name)
+        return "perfil"
+
+
+def test_text_format_appends_extra_fields():
+    line = StructuredFormatter().format(make_record(tier='memory', results=6))
+    assert line.endswith("INFO app: Recomendaciones servidas tier=memory results=6")
+
+
+def test_json_format_has_fields_and_exception():
+    try:
+        raise ValueError("fallo")
+    except ValueError:
+        record = make_record("Error %s", ('consulta',), exc_info=sys.exc_info(), tier='neo4j')
+    document = json.loads(StructuredFormatter(json_output=True).format(record))
+    assert document['message'] == "Error consulta"
+    assert document['level'] == 'INFO' and document['logger'] == 'app'
+    assert document['tier'] == 'neo4j'
+    assert "ValueError: fallo" in document['exception']
+
+
+def test_deferred_handler_formats_in_the_listener_thread():
+    records = queue.SimpleQueue()
+    capture = CapturingHandler(StructuredFormatter())
+    listener = QueueListener(records, capture)
+    logger = logging.getLogger('test_log_setup.deferred')
+    logger.propagate = False
+    handler = DeferredQueueHandler(records)
+    logger.addHandler(handler)
+    argument = Recorder()
+    try:
+        logger.warning("Perfil %s", argument)
+        # Encolado sin formatear: plantilla y argumentos intactos
+        assert argument.threads == []
+        listener.start()
+        assert capture.done.wait(5)
+    finally:
+        listener.stop()
+        logger.removeHandler(handler)
+    line, thread = capture.lines[0]
+    assert line.endswith("Perfil perfil")
+    assert argument.threads == [thread]
+    assert thread != threading.current_thread().name
+
+
+def test_deferred_handler_keeps_exception_for_the_listener():
+    try:
+        raise KeyError("auto")
+    except KeyError:
+        record = make_record(exc_info=sys.exc_info())
+    prepared = DeferredQueueHandler(queue.SimpleQueue()).prepare(record)
+    assert prepared.exc_info is not None and prepared.exc_text is None
+    assert "KeyError: 'auto'" in StructuredFormatter().format(prepared)
+
+
+@pytest.fixture
+def isolated_root(monkeypatch):
+    """Logger raíz y listener restaurados al terminar"""
+    root = logging.getLogger()
+    monkeypatch.setattr(root, 'handlers', [])
+    monkeypatch.setattr(log_setup, '_listener', None)
+    monkeypatch.setattr(log_setup.atexit, 'register', lambda function: None)
+    level = root.level
+    yield root
+    if log_setup._listener is not None:
+        log_setup._listener.stop()
+    root.setLevel(level)
+
+
+def test_configure_logging_is_idempotent(isolated_root):
+    listener = log_setup.configure_logging(level='debug', log_format='json')
+    assert log_setup.configure_logging() is listener
+    assert len(isolated_root.handlers) == 1
+    assert isinstance(isolated_root.handlers[0], DeferredQueueHandler)
+    assert isolated_root.level == logging.DEBUG
+    assert listener.handlers[0].formatter.json_output
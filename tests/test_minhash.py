@@ -0,0 +1,54 @@
+"""
+Firmas MinHash: deterministas, insensibles a mayúsculas y espacios, y con una
+Jaccard estimada cercana a la exacta.
+"""
+
+import random
+
+from conftest import FEATURES
+from minhash import (BANDS, NUM_PERM, band_keys, estimate_jaccard, jaccard, normalize_features,
+                     rank_candidates, signature, signature_row)
+
+
+def test_normalize_features():
+    assert normalize_features([" GPS ", "gps", "Cámara Trasera", "", "  ", None]) == {"gps", "cámara trasera"}
+    assert normalize_features(None) == set()
+
+
+def test_signature_is_deterministic_and_normalized():
+    first = signature(["GPS", "Bluetooth"])
+    assert len(first) == NUM_PERM
+    assert signature([" bluetooth", "gps "]) == first
+    assert signature([]) == [] and band_keys([]) == []
+
+
+def test_band_keys():
+    keys = band_keys(signature(["GPS"]))
+    assert len(keys) == BANDS
+    assert [key.split(':')[0] for key in keys] == [str(band) for band in range(BANDS)]
+    row = signature_row('auto_1', ["GPS"])
+    assert row == {'id': 'auto_1', 'minhash': signature(["GPS"]), 'bands': keys}
+
+
+def test_estimate_tracks_exact_jaccard():
+    rng = random.Random(3)
+    vocabulary = FEATURES + [f"extra_{number}" for number in range(40)]
+    errors = []
+    for _ in range(200):
+        first, second = rng.sample(vocabulary, rng.randrange(2, 15)), rng.sample(vocabulary, rng.randrange(2, 15))
+        errors.append(abs(estimate_jaccard(signature(first), signature(second)) - jaccard(first, second)))
+    assert sum(errors) / len(errors) < 0.06
+    assert estimate_jaccard(signature(["GPS"]), []) == 0.0
+    assert jaccard(["GPS", "Bluetooth"], ["gps"]) == 0.5
+
+
+def test_rank_candidates_filters_and_orders():
+    query = signature(["GPS", "Bluetooth", "Techo Solar"])
+    records = [{'id': f"auto_{number}", 'modelo': 'M', 'año': 2020, 'precio': 1.0, 'marca': 'X',
+                'caracteristicas': features, 'minhash': signature(features)}
+               for number, features in enumerate([["GPS", "Bluetooth", "Techo Solar"], ["GPS", "Bluetooth"],
+                                                  ["Asientos de Cuero"], None])]
+    ranked = rank_candidates(records, query, threshold=0.3, limit=5)
+    assert [row['id'] for row in ranked] == ['auto_0', 'auto_1']
+    assert ranked[0]['jaccard'] == 1.0 and 'minhash' not in ranked[0]
+    assert len(rank_candidates(records, query, threshold=0.0, limit=2)) == 2
@@ -0,0 +1,33 @@
+"""
+app.py con el respaldo recommender_minimal: los parámetros que el respaldo no
+entiende (k, pesos) no deben convertirse en un error 500.
+"""
+
+import pytest
+
+from conftest import load_app_module
+
+
+@pytest.fixture
+def minimal_app(monkeypatch):
+    """Importar app.py con recommender.py no disponible"""
+    module = load_app_module(monkeypatch, "app_minimal_backend")
+
+    def minimal_recommendations(brands=None, budget=None, fuel=None, types=None, transmission=None):
+        return [{'id': f"auto_{number}", 'brand': brands} for number in range(4)]
+
+    monkeypatch.setattr(module, 'get_recommendations', minimal_recommendations)
+    return module
+
+
+def test_tier_stub_ignores_weights_and_applies_k(minimal_app):
+    result, tier = minimal_app.get_recommendations_with_tier(
+        'Toyota', None, None, None, None, deadline=None, timing=None, k=2, weights={'price': 10.0})
+    assert tier == 'minimal'
+    assert [car['id'] for car in result] == ['auto_0', 'auto_1']
+    assert len(minimal_app.get_recommendations_with_tier(brands='Toyota')[0]) == 4
+
+
+def test_stream_stub_ignores_weights_and_applies_k(minimal_app):
+    streamed = list(minimal_app.stream_recommendations(brands='Toyota', k=3, weights={'brand': 5.0}))
+    assert [car['id'] for car in streamed] == ['auto_0', 'auto_1', 'auto_2']
@@ -0,0 +1,84 @@
+"""
+PageRank personalizado en lote: combinar los vectores de cada auto favorito
+debe dar el mismo resultado que iterar con el vector de reinicio del usuario.
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip('scipy')
+
+from pagerank import DEFAULT_BLOCK_SIZE, PreferenceGraph, block_size_for, power_iteration, rank_all_users
+
+
+def sample_graph() -> PreferenceGraph:
+    graph = PreferenceGraph()
+    cars = [
+        ('a1', 'Toyota', 'Sedán'), ('a2', 'Toyota', 'SUV'), ('a3', 'Honda', 'Sedán'),
+        ('a4', 'Honda', 'SUV'), ('a5', 'Ford', 'Pickup'), ('a6', 'Ford', 'SUV'), ('a7', None, None),
+    ]
+    for car_id, marca, tipo in cars:
+        graph.add_car(car_id, marca, tipo)
+    for user, relation, car_id in [
+        ('ana', 'FAVORITO', 'a1'), ('ana', 'FAVORITO', 'a3'), ('ana', 'RECOMENDADO', 'a2'),
+        ('luis', 'FAVORITO', 'a5'), ('luis', 'FAVORITO', 'a5'),
+        ('eva', 'FAVORITO', 'a2'), ('eva', 'FAVORITO', 'a4'), ('eva', 'FAVORITO', 'a6'),
+        ('sin_favoritos', 'RECOMENDADO', 'a7'),
+    ]:
+        graph.add_user_edge(user, relation, car_id)
+    return graph
+
+
+def direct_ranking(graph: PreferenceGraph, user: str):
+    """Iteración de potencia con el vector de reinicio del usuario"""
+    favorites = list(dict.fromkeys(graph.favorites[user]))
+    restart = np.zeros((len(graph), 1), dtype=np.float32)
+    restart[favorites, 0] = 1.0 / len(favorites)
+    scores, _, converged = power_iteration(graph.transition(), restart, max_iterations=500)
+    assert converged
+    positions, car_ids = graph.car_nodes()
+    ranked = {car_ids[row]: float(scores[node, 0]) for row, node in enumerate(positions)
+              if node not in favorites and scores[node, 0] > 0}
+    top = max(ranked.values())
+    return {car_id: score / top for car_id, score in ranked.items()}
+
+
+def test_transition_is_column_stochastic():
+    transition = sample_graph().transition().toarray()
+    sums = transition.sum(axis=0)
+    assert np.allclose(sums[sums > 0], 1.0, atol=1e-6)
+
+
+def test_batch_ranking_matches_direct_iteration():
+    graph = sample_graph()
+    rankings, report = rank_all_users(graph, top_k=10, max_iterations=500, block_size=2)
+    assert set(rankings) == {'ana', 'luis', 'eva'}
+    assert report['unconverged_blocks'] == 0
+    for user, ranked in rankings.items():
+        expected = direct_ranking(graph, user)
+        assert [car_id for car_id, _ in ranked] == sorted(expected, key=lambda car_id: -expected[car_id])
+        for car_id, score in ranked:
+            assert score == pytest.approx(expected[car_id], rel=1e-4)
+
+
+def test_rankings_exclude_favorites_and_start_at_one():
+    graph = sample_graph()
+    rankings, _ = rank_all_users(graph, top_k=3)
+    favorites = {'ana': {'a1', 'a3'}, 'luis': {'a5'}, 'eva': {'a2', 'a4', 'a6'}}
+    for user, ranked in rankings.items():
+        assert len(ranked) <= 3
+        assert not favorites[user] & {car_id for car_id, _ in ranked}
+        assert ranked[0][1] == pytest.approx(1.0)
+        scores = [score for _, score in ranked]
+        assert scores == sorted(scores, reverse=True)
+
+
+def test_block_size_shrinks_with_the_graph():
+    assert block_size_for(1000) == DEFAULT_BLOCK_SIZE
+    # 5 arreglos nodos x bloque de float32 dentro del presupuesto
+    assert block_size_for(1_000_000, memory_bytes=200 * 1024 * 1024) == 10
+    assert block_size_for(10 ** 9) == 1
+
+    rankings, report = rank_all_users(sample_graph(), top_k=3)
+    assert report['block_size'] == DEFAULT_BLOCK_SIZE
+    assert report['basis_megabytes'] > 0
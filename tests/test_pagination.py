@@ -0,0 +1,66 @@
+"""
+Paginación por cursor: los cursores solo valen para su consulta y recorrer
+todas las páginas entrega las mismas filas que una sola consulta ordenada.
+"""
+
+import pytest
+
+from conftest import reference_rows
+from pagination import decode_cursor, encode_cursor, paginate, query_digest, validate_sort
+
+
+def test_cursor_roundtrip():
+    digest = query_digest({'preferences': {'brands': ['Toyota']}})
+    token = encode_cursor('price_asc', 25000.0, 'auto_007', digest)
+    assert '=' not in token
+    assert decode_cursor(token, 'price_asc', digest) == {'value': 25000.0, 'id': 'auto_007'}
+
+
+def test_cursor_rejects_other_query_or_sort():
+    digest = query_digest({'preferences': {'brands': ['Toyota']}})
+    token = encode_cursor('price_asc', 25000.0, 'auto_007', digest)
+    with pytest.raises(ValueError):
+        decode_cursor(token, 'price_desc', digest)
+    with pytest.raises(ValueError):
+        decode_cursor(token, 'price_asc', query_digest({'preferences': {'brands': ['Honda']}}))
+    with pytest.raises(ValueError):
+        decode_cursor("no-es-un-cursor", 'price_asc', digest)
+
+
+def test_validate_sort():
+    assert validate_sort('year_desc') == 'year_desc'
+    with pytest.raises(ValueError):
+        validate_sort('color_asc')
+
+
+def test_paginate_emits_cursor_only_when_more_rows():
+    rows = [{'id': f"auto_{n}", 'price': 1000.0 * n} for n in range(4)]
+    page, cursor = paginate(rows, 3, 'price_asc', 'price', 'huella')
+    assert page == rows[:3]
+    assert decode_cursor(cursor, 'price_asc', 'huella') == {'value': 2000.0, 'id': 'auto_2'}
+    assert paginate(rows[:3], 3, 'price_asc', 'price', 'huella') == (rows[:3], None)
+
+
+# Orden -> campo de la API con la clave de orden
+SORT_FIELDS = {'price_asc': 'price', 'price_desc': 'price', 'year_desc': 'year', 'score_desc': 'similarity_score'}
+
+
+@pytest.mark.parametrize('sort', list(SORT_FIELDS))
+def test_catalog_pages_cover_sorted_rows(catalog_engine, catalog_records, ranker, sort):
+    # Un solo combustible: cada auto aparece en una sola fila
+    preferences = ranker.normalize_preferences(fuel="Gasolina", budget="100000+")
+    field, after, seen = SORT_FIELDS[sort], None, []
+    while True:
+        page, cursor = paginate(catalog_engine.page(preferences, sort, 5, after), 4, sort, field, 'huella')
+        seen.extend(page)
+        if cursor is None:
+            break
+        after = decode_cursor(cursor, sort, 'huella')
+
+    expected_ids = {catalog_records[ordinal]['id'] for ordinal in reference_rows(catalog_records, preferences)
+                    if sort != 'year_desc' or catalog_records[ordinal]['año'] is not None}
+    assert len(seen) == len(expected_ids)
+    assert {car['id'] for car in seen} == expected_ids
+    keys = [(car[field], car['id']) for car in seen]
+    descending = sort != 'price_asc'
+    assert keys == sorted(keys, key=lambda key: (-key[0] if descending else key[0], key[1]))
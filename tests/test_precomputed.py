@@ -0,0 +1,91 @@
+"""
+Recomendaciones precalculadas: lectura del archivo y descarte cuando no
+corresponden al catálogo cargado.
+"""
+
+import importlib.util
+from pathlib import Path
+
+from catalog_engine import CatalogEngine
+from conftest import make_catalog
+from precomputed import PrecomputedRecommendations, write_precomputed
+from recommender import CarRecommender, RecommendationCache
+from vocabulary import VOCABULARY
+
+
+def recommender_with(engine, precomputed) -> CarRecommender:
+    """CarRecommender sin conexión, solo con lo que usa _check_precomputed"""
+    instance = CarRecommender.__new__(CarRecommender)
+    instance.catalog_engine = engine
+    instance.precomputed = precomputed
+    return instance
+
+
+def test_file_roundtrip(tmp_path):
+    snapshot = CatalogEngine().load_records(make_catalog(10))
+    path = tmp_path / "precalculadas.json.gz"
+    write_precomputed(path, snapshot.cars, {'clave': [[2, 41.5], [0, 12.0]]}, snapshot.fingerprint)
+    loaded = PrecomputedRecommendations.load(path)
+    assert loaded.catalog_fingerprint == snapshot.fingerprint
+    cars = loaded.lookup('clave')
+    assert [car['id'] for car in cars] == [snapshot.cars[2]['id'], snapshot.cars[0]['id']]
+    assert [car['similarity_score'] for car in cars] == [41.5, 12.0]
+    assert loaded.lookup('otra') is None
+    assert PrecomputedRecommendations.load(tmp_path / "no_existe.json.gz") is None
+
+
+def test_kept_when_fingerprint_matches():
+    engine = CatalogEngine()
+    snapshot = engine.load_records(make_catalog(10))
+    precomputed = PrecomputedRecommendations(snapshot.cars, {}, snapshot.fingerprint)
+    instance = recommender_with(engine, precomputed)
+    instance._check_precomputed()
+    assert instance.precomputed is precomputed
+
+
+def test_dropped_after_catalog_change():
+    engine = CatalogEngine()
+    snapshot = engine.load_records(make_catalog(10))
+    instance = recommender_with(engine, PrecomputedRecommendations(snapshot.cars, {}, snapshot.fingerprint))
+    engine.load_records(make_catalog(11))
+    instance._check_precomputed()
+    assert instance.precomputed is None
+
+
+def test_dropped_without_catalog_engine():
+    instance = recommender_with(None, PrecomputedRecommendations([], {}, 'cualquiera'))
+    instance._check_precomputed()
+    assert instance.precomputed is None
+
+
+def test_cache_key_ignores_list_order(ranker):
+    first = ranker.normalize_preferences(brands=["Toyota", "Honda"], types=["SUV", "Sedán"])
+    second = ranker.normalize_preferences(brands=["Honda", "Toyota"], types=["Sedán", "SUV"])
+    assert RecommendationCache.make_key(first) == RecommendationCache.make_key(second)
+    assert RecommendationCache.make_key(first) != RecommendationCache.make_key(first, k=5)
+
+
+def load_precompute_script():
+    path = Path(__file__).resolve().parents[1] / "scripts" / "setup" / "precompute_recommendations.py"
+    spec = importlib.util.spec_from_file_location("precompute_recommendations", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_workers_use_the_database_vocabulary(monkeypatch, ranker):
+    # El registro es global: se restaura al terminar la prueba
+    monkeypatch.setattr(VOCABULARY, '_vocabulary', VOCABULARY.current)
+    script = load_precompute_script()
+    records = make_catalog(40)
+    target = next(ordinal for ordinal, record in enumerate(records) if record['precio'] is not None)
+    records[target]['marca'] = "Alfa Romeo"
+    rows = [{'faceta': 'brands', 'valor': "Alfa Romeo"}]
+
+    script._init_worker(records, rows)
+    combination = {'brands': ["alfa-romeo"], 'budget': None, 'fuel': None, 'types': None, 'transmission': None}
+    entries = script._materialize_chunk([combination])
+    # Clave del servidor, que carga el mismo vocabulario al arrancar
+    server_key = RecommendationCache.make_key(ranker.normalize_preferences(**combination))
+    assert list(entries) == [server_key]
+    assert [ordinal for ordinal, _ in entries[server_key]] == [target]
@@ -0,0 +1,50 @@
+"""
+Índice de precios: los rangos son cerrados en ambos extremos, excluyen los
+autos sin precio y devuelven los ordinales ordenados por precio.
+"""
+
+import numpy as np
+
+from price_index import PriceIndex
+
+# Ordinal -> precio; empates en 20000 y dos autos sin precio
+PRICES = np.array([30000.0, 20000.0, np.nan, 10000.0, 20000.0, 45000.0, np.nan, 30000.5])
+
+
+def reference(min_price, max_price):
+    matches = [ordinal for ordinal, price in enumerate(PRICES) if min_price <= price <= max_price]
+    return sorted(matches, key=lambda ordinal: PRICES[ordinal])
+
+
+def test_unpriced_rows_are_left_out():
+    index = PriceIndex(PRICES)
+    assert len(index) == 6
+    assert index.range(0, float('inf')).tolist() == reference(0, float('inf'))
+
+
+def test_both_edges_are_inclusive():
+    index = PriceIndex(PRICES)
+    assert index.range(20000, 30000).tolist() == [1, 4, 0]
+    assert index.range(20000, 20000).tolist() == [1, 4]
+    assert index.range(10000, 10000).tolist() == [3]
+
+
+def test_values_just_outside_the_edges_are_excluded():
+    index = PriceIndex(PRICES)
+    assert index.range(20000.01, 30000.49).tolist() == [0]
+    assert index.range(10000.01, 19999.99).tolist() == []
+    assert index.range(45000.01, float('inf')).tolist() == []
+
+
+def test_empty_and_inverted_ranges():
+    index = PriceIndex(PRICES)
+    assert index.bounds(40000, 30000)[0] == index.bounds(40000, 30000)[1]
+    assert index.range(40000, 30000).tolist() == []
+    assert len(PriceIndex(np.array([np.nan]))) == 0
+
+
+def test_matches_brute_force_filter():
+    rng = np.random.default_rng(2)
+    for _ in range(50):
+        low, high = sorted(rng.choice(np.append(PRICES[~np.isnan(PRICES)], rng.uniform(0, 50000, 3)), 2))
+        assert PriceIndex(PRICES).range(low, high).tolist() == reference(low, high)
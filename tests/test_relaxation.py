@@ -0,0 +1,43 @@
+"""
+Relajación progresiva: solo se informan como relajadas las restricciones que
+el usuario eligió, y el catálogo en memoria elige el nivel más bajo con autos.
+"""
+
+from relaxation import RELAXATION_ORDER, annotate, relaxed_constraints, widened_budget
+
+
+def test_only_selected_constraints_are_reported(ranker):
+    preferences = ranker.normalize_preferences(brands=['Toyota'])
+    assert relaxed_constraints(4, preferences) == ['brands']
+    assert relaxed_constraints(3, preferences) == []
+    everything = ranker.normalize_preferences(brands=['Toyota'], budget='20000-30000', fuel=['Diésel'],
+                                              types=['SUV'], transmission=['Manual'])
+    assert relaxed_constraints(5, everything) == list(RELAXATION_ORDER)
+
+
+def test_budget_counts_only_when_limited(ranker):
+    assert relaxed_constraints(5, ranker.normalize_preferences(fuel=['Diésel'])) == ['fuel']
+    assert relaxed_constraints(5, ranker.normalize_preferences(budget='20000-30000')) == ['budget']
+
+
+def test_annotate_leaves_exact_matches_untouched(ranker):
+    preferences = ranker.normalize_preferences(types=['SUV'], transmission=['Manual'])
+    assert annotate([{'id': 'auto_1'}], 0, preferences) == [{'id': 'auto_1'}]
+    cars = annotate([{'id': 'auto_1'}, {'id': 'auto_2'}], 3, preferences)
+    assert [car['relaxed_constraints'] for car in cars] == [['transmission', 'types']] * 2
+
+
+def test_widened_budget(ranker):
+    assert widened_budget(ranker.normalize_preferences(budget='20000-30000')) == (16000, 36000)
+
+
+def test_catalog_relax_reports_selected_constraints(catalog_engine, ranker):
+    # Sin coincidencias exactas: ni tipo ni transmisión se eligieron, así que no se informan
+    preferences = ranker.normalize_preferences(brands=['Ferrari'], budget='0-20000', fuel=['Eléctrico'])
+    assert catalog_engine.rank(preferences, 5) == []
+    relaxed = catalog_engine.relax(preferences, 5)
+    assert relaxed
+    for car in relaxed:
+        assert set(car['relaxed_constraints']) <= {'fuel', 'brands', 'budget'}
+        assert 'transmission' not in car['relaxed_constraints']
+        assert 'types' not in car['relaxed_constraints']
@@ -0,0 +1,96 @@
+"""
+Puntuación vectorizada: mismas puntuaciones y mismo orden que la versión
+escalar (add_similarity_score), que es la referencia del comportamiento.
+"""
+
+import copy
+import random
+
+import numpy as np
+import pytest
+
+from conftest import FEATURES, preference_samples, reference_rows
+from scoring import resolve_weights, round_scores, rank_cars, top_k
+from vocabulary import DEFAULT_VOCABULARY
+
+
+def random_cars(count: int, seed: int):
+    """Autos en formato de la API con precios en pasos de 250 (muchos empates de redondeo)"""
+    rng = random.Random(seed)
+    return [{
+        'id': f"auto_{number}",
+        'price': float(rng.randrange(10000, 130000, 250)),
+        'brand': rng.choice(DEFAULT_VOCABULARY['brands'][:9]),
+        'type': rng.choice(DEFAULT_VOCABULARY['types'][:6]),
+        'fuel': rng.choice(DEFAULT_VOCABULARY['fuel'][:4]),
+        'transmission': rng.choice(DEFAULT_VOCABULARY['transmission']),
+        'features': rng.sample(FEATURES, rng.randrange(0, 4)),
+    } for number in range(count)]
+
+
+def scalar_ranking(ranker, cars, preferences, k, weights=None):
+    ranked = ranker.add_similarity_score(copy.deepcopy(cars), preferences, weights)[:k]
+    return [(car['id'], car['similarity_score']) for car in ranked]
+
+
+def vector_ranking(cars, preferences, k, weights=None):
+    return [(car['id'], car['similarity_score']) for car in rank_cars(copy.deepcopy(cars), preferences, k, weights)]
+
+
+def test_round_scores_matches_python_round():
+    values = np.concatenate([
+        np.array([51.775, 29.295, 28.974999999999998, 51.325, 0.125, 2.675, 1.005]),
+        np.random.default_rng(5).uniform(0, 150, 20000),
+        np.arange(0, 20000) * 0.005,
+    ])
+    assert round_scores(values).tolist() == [round(value, 2) for value in values.tolist()]
+
+
+def test_rank_cars_matches_scalar_scoring(ranker):
+    cars = random_cars(300, seed=1)
+    for number, selection in enumerate(preference_samples(150)):
+        preferences = ranker.normalize_preferences(**selection)
+        k = 10 if number % 3 else 40
+        assert vector_ranking(cars, preferences, k) == scalar_ranking(ranker, cars, preferences, k), selection
+
+
+def test_rank_cars_matches_scalar_scoring_on_rounding_ties(ranker):
+    # 1 - 10750/100000 = 0.8925 -> 26.775 puntos: np.round daría 26.78 y round() 26.77
+    cars = [dict(car, features=[]) for car in random_cars(5, seed=2)]
+    cars[0].update(price=10750.0, brand='Toyota')
+    cars[1].update(price=10750.0 - 1 / 3, brand='Toyota')
+    preferences = ranker.normalize_preferences(brands=['Toyota'], budget='0-100000')
+    assert vector_ranking(cars, preferences, 5) == scalar_ranking(ranker, cars, preferences, 5)
+
+
+def test_custom_weights_match_scalar_scoring(ranker):
+    cars = random_cars(200, seed=3)
+    weights = {'price': 50, 'feature': 0.5, 'brand': 7.5}
+    for selection in preference_samples(50, seed=4):
+        preferences = ranker.normalize_preferences(**selection)
+        assert vector_ranking(cars, preferences, 10, weights) == scalar_ranking(ranker, cars, preferences, 10, weights)
+
+
+def test_catalog_rank_matches_scalar_scoring(catalog_engine, catalog_records, ranker):
+    for selection in preference_samples(150):
+        preferences = ranker.normalize_preferences(**selection)
+        candidates = [catalog_engine.snapshot.hydrate(ordinal)
+                      for ordinal in reference_rows(catalog_records, preferences)]
+        expected = [(car['id'], car['similarity_score'])
+                    for car in ranker.add_similarity_score(candidates, preferences)[:10]]
+        ranked = catalog_engine.rank(preferences, 10)
+        assert [(car['id'], car['similarity_score']) for car in ranked] == expected, selection
+
+
+def test_top_k_is_stable_on_ties():
+    scores = np.array([5.0, 9.0, 5.0, 9.0, 1.0, 5.0])
+    assert top_k(scores, 3).tolist() == [1, 3, 0]
+    assert top_k(scores, 10).tolist() == [1, 3, 0, 2, 5, 4]
+    assert top_k(scores, 0).tolist() == []
+    assert top_k(np.array([]), 3).tolist() == []
+
+
+def test_resolve_weights_rejects_unknown_names():
+    assert resolve_weights({'brand': '40'})['brand'] == 40.0
+    with pytest.raises(ValueError):
+        resolve_weights({'color': 1})
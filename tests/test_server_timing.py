@@ -0,0 +1,54 @@
+"""
+Cabecera Server-Timing: fases en el orden de PHASES, las desconocidas al
+final, mediciones repetidas sumadas y el total siempre al cierre.
+"""
+
+import re
+
+import pytest
+
+from server_timing import PHASES, ServerTiming
+
+
+def test_header_orders_known_phases_then_unknown_then_total():
+    timing = ServerTiming()
+    timing.add('serialize', 0.004)
+    timing.add('cache', 0.001)
+    timing.add('query', 0.0031)
+    timing.add('normalize', 0.00008)
+    names = [entry.split(';')[0] for entry in timing.header().split(', ')]
+    assert names == ['normalize', 'query', 'serialize', 'cache', 'total']
+
+
+def test_header_formats_milliseconds_with_two_decimals():
+    timing = ServerTiming()
+    timing.add('query', 0.0031)
+    timing.add('scoring', 0.0125)
+    header = timing.header()
+    assert header.startswith("query;dur=3.10, scoring;dur=12.50, total;dur=")
+    assert all(re.fullmatch(r"[a-z]+;dur=\d+\.\d{2}", entry) for entry in header.split(', '))
+
+
+def test_repeated_phases_accumulate():
+    timing = ServerTiming()
+    with timing.phase('query'):
+        pass
+    timing.add('query', 0.002)
+    milliseconds = timing.milliseconds()
+    assert list(milliseconds) == ['query', 'total']
+    assert milliseconds['query'] >= 2.0
+
+
+def test_phase_is_recorded_when_the_block_raises():
+    timing = ServerTiming()
+    with pytest.raises(ValueError):
+        with timing.phase('scoring'):
+            raise ValueError("fallo")
+    assert 'scoring' in timing.phases
+
+
+def test_empty_timing_reports_only_total():
+    timing = ServerTiming()
+    assert list(timing.milliseconds()) == ['total']
+    assert timing.header().startswith("total;dur=")
+    assert set(PHASES) == {'normalize', 'query', 'scoring', 'serialize'}
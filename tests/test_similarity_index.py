@@ -0,0 +1,92 @@
+"""
+Índice k-NN: los vecinos coinciden con una búsqueda por fuerza bruta y las
+altas, cambios y bajas incrementales dejan el mismo índice que reconstruirlo.
+"""
+
+import numpy as np
+
+from conftest import make_catalog
+from similarity_index import SimilarityIndex
+
+
+def unique_records(size=60):
+    """Una fila por auto, para comparar con el índice reconstruido"""
+    records = {}
+    for record in make_catalog(size):
+        records.setdefault(record['id'], record)
+    return list(records.values())
+
+
+def neighbours(index, car_id, k=6):
+    return [(car['id'], car['similarity']) for car in index.similar(car_id, k)]
+
+
+def middle_record(records):
+    """Auto con precio y año dentro del rango (no cambia la normalización al quitarlo)"""
+    priced = sorted((r for r in records if r['precio'] is not None and r['año'] is not None),
+                    key=lambda r: (r['precio'], r['año']))
+    return priced[len(priced) // 2]
+
+
+def test_similar_matches_brute_force():
+    records = unique_records()
+    index = SimilarityIndex(records)
+    vectors = np.array([index._encode(record) for record in records], dtype=np.float64)
+    for position in (0, 7, 33):
+        distances = ((vectors - vectors[position]) ** 2).sum(axis=1)
+        distances[position] = np.inf
+        expected = [records[i]['id'] for i in np.argsort(distances, kind='stable')[:5]]
+        assert [car_id for car_id, _ in neighbours(index, records[position]['id'], 5)] == expected
+    assert index.similar('no_existe') is None
+
+
+def test_upsert_grows_capacity():
+    records = unique_records(40)
+    index = SimilarityIndex(records[:16])
+    assert len(index.matrix) == 16
+    for record in records[16:]:
+        index.upsert(record)
+    assert len(index) == len(records)
+    assert len(index.matrix) >= len(records)
+    # Precio y año se normalizan con los rangos de la última reconstrucción
+    for record in records:
+        position = index.positions[record['id']]
+        assert np.allclose(index.matrix[position], index._encode(record))
+        assert np.isclose(index.norms[position], index._encode(record) @ index._encode(record))
+        assert record['id'] not in [car_id for car_id, _ in neighbours(index, record['id'])]
+
+
+def test_upsert_replaces_existing_car():
+    records = unique_records()
+    index = SimilarityIndex(records)
+    target = middle_record(records)
+    changed = dict(target, caracteristicas=["GPS"])
+    index.upsert(changed)
+    assert len(index) == len(records)
+    replaced = [changed if record['id'] == target['id'] else record for record in records]
+    assert neighbours(index, target['id']) == neighbours(SimilarityIndex(replaced), target['id'])
+
+
+def test_remove_matches_rebuild():
+    records = unique_records()
+    index = SimilarityIndex(records)
+    target = middle_record(records)
+    index.remove(target['id'])
+    index.remove('no_existe')
+    assert target['id'] not in index
+    remaining = [record for record in records if record['id'] != target['id']]
+    rebuilt = SimilarityIndex(remaining)
+    for record in remaining[::9]:
+        result = neighbours(index, record['id'])
+        assert target['id'] not in [car_id for car_id, _ in result]
+        assert result == neighbours(rebuilt, record['id'])
+
+
+def test_new_facet_value_rebuilds_vocabulary():
+    records = unique_records()
+    index = SimilarityIndex(records)
+    newcomer = dict(middle_record(records), id='auto_nuevo', marca="Alfa Romeo")
+    index.upsert(newcomer)
+    assert "Alfa Romeo" in index.vocab['brands']
+    assert index.dim == SimilarityIndex(records + [newcomer]).dim
+    assert neighbours(index, 'auto_nuevo') == neighbours(SimilarityIndex(records + [newcomer]), 'auto_nuevo')
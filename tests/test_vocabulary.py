@@ -0,0 +1,121 @@
+"""
+Vocabulario de facetas: comparación sin tildes ni mayúsculas, alias, ids
+densos estables y recarga desde filas (faceta, valor) de VOCABULARY_QUERY.
+"""
+
+import pytest
+
+from catalog_engine import CatalogEngine
+from conftest import make_catalog
+from vocabulary import DEFAULT_VOCABULARY, VOCABULARY, Vocabulary, VocabularyRegistry, fold
+
+
+def rows(values):
+    return [{'faceta': facet, 'valor': value} for facet, facet_values in values.items() for value in facet_values]
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Registro compartido aislado: las pruebas pueden instalar valores"""
+    monkeypatch.setattr(VOCABULARY, '_vocabulary', VOCABULARY.current)
+    return VOCABULARY
+
+
+def test_fold_ignores_accents_case_and_separators():
+    assert fold("Híbrido") == fold("hibrido") == fold("HIBRIDO")
+    assert fold("Mercedes-Benz") == fold("mercedes benz") == fold("mercedes_benz")
+    assert fold("  Gas   Natural ") == "gas natural"
+
+
+def test_lookup_accepts_variants_and_aliases():
+    vocabulary = Vocabulary(DEFAULT_VOCABULARY)
+    assert vocabulary.canonical('fuel', "diesel") == "Diésel"
+    assert vocabulary.canonical('fuel', "hybrid") == "Híbrido"
+    assert vocabulary.canonical('brands', "VW") == "Volkswagen"
+    assert vocabulary.canonical('types', "pick-up") == "Pickup"
+    assert vocabulary.canonical('brands', "Marca inexistente") == "Marca inexistente"
+    assert vocabulary.id('brands', None) is None
+
+
+def test_alias_requires_its_target():
+    vocabulary = Vocabulary({'fuel': ["Diésel"]})
+    assert vocabulary.id('fuel', "hybrid") is None
+    assert vocabulary.id('fuel', "diesel") == 0
+
+
+def test_canonical_list_deduplicates_and_accepts_groups():
+    vocabulary = Vocabulary(DEFAULT_VOCABULARY)
+    assert vocabulary.canonical_list('fuel', ["diesel", "Diésel", "electric"]) == ["Diésel", "Eléctrico"]
+    assert vocabulary.canonical_list('types', {'grupo': "suv"}) == ["SUV"]
+    assert vocabulary.canonical_list('transmission', "manual") == ["Manual"]
+    assert vocabulary.canonical_list('brands', []) is None
+
+
+def test_ids_are_dense_by_first_appearance():
+    vocabulary = Vocabulary({'brands': ["Toyota", "Honda", "Toyota", "Ford"]})
+    assert [vocabulary.id('brands', name) for name in ("Toyota", "Honda", "Ford")] == [0, 1, 2]
+    assert vocabulary.size('brands') == 3
+    assert vocabulary.name('brands', 1) == "Honda"
+
+
+def test_extended_keeps_existing_ids():
+    vocabulary = Vocabulary(DEFAULT_VOCABULARY)
+    extended = vocabulary.extended({'brands': ["Toyota", "Alfa Romeo"]})
+    assert extended.ids['brands']['Alfa Romeo'] == vocabulary.size('brands')
+    for name, value_id in vocabulary.ids['brands'].items():
+        assert extended.id('brands', name) == value_id
+    assert vocabulary.extended({'brands': ["Toyota"]}) is vocabulary
+
+
+def test_reload_drops_removed_values_and_keeps_ids():
+    registry = VocabularyRegistry(Vocabulary({'brands': ["Toyota", "Honda", "Ford"], 'fuel': ["Gasolina"]}))
+    vocabulary = registry.install(rows({'brands': ["Ford", "Toyota", "Alfa Romeo"], 'fuel': ["Gasolina"]}))
+    assert vocabulary.values('brands') == ["Toyota", "Ford", "Alfa Romeo"]
+    assert vocabulary.id('brands', "Honda") is None
+    assert (vocabulary.id('brands', "Toyota"), vocabulary.id('brands', "Ford")) == (0, 2)
+    # El id retirado no se reasigna
+    assert vocabulary.id('brands', "Alfa Romeo") == 3
+    assert vocabulary.name('brands', 1) is None
+    assert vocabulary.size('brands') == 4
+
+    # Si el valor vuelve recibe un id nuevo
+    again = registry.install(rows({'brands': ["Toyota", "Ford", "Alfa Romeo", "Honda"], 'fuel': ["Gasolina"]}))
+    assert again.id('brands', "Honda") == 4
+    assert again.id('brands', "Alfa Romeo") == 3
+
+
+def test_removed_value_loses_its_aliases():
+    registry = VocabularyRegistry()
+    values = {facet: list(facet_values) for facet, facet_values in DEFAULT_VOCABULARY.items()}
+    values['brands'].remove("Volkswagen")
+    vocabulary = registry.install(rows(values))
+    assert vocabulary.id('brands', "vw") is None
+    assert vocabulary.canonical_list('brands', ["vw", "toyota"]) == ["vw", "Toyota"]
+
+
+class FailingDriver:
+    def session(self, **kwargs):
+        raise RuntimeError("Neo4j caído")
+
+
+def test_refresh_keeps_current_vocabulary_on_error():
+    registry = VocabularyRegistry()
+    current = registry.current
+    assert registry.refresh(FailingDriver()) is current
+
+
+def test_snapshot_counts_with_retired_ids(registry, ranker):
+    records = make_catalog(60)
+    values = {facet: list(facet_values) for facet, facet_values in DEFAULT_VOCABULARY.items()}
+    # El catálogo usa los seis primeros tipos; retirar los siguientes deja el
+    # último tipo vigente (sin autos) con un id mayor que la cantidad de valores
+    retired = DEFAULT_VOCABULARY['types'][6:-1]
+    values['types'] = [value for value in values['types'] if value not in retired]
+    registry.install(rows(values))
+    engine = CatalogEngine()
+    engine.load_records(records)
+    counts = engine.facet_counts(ranker.normalize_preferences(), 'types')
+    assert counts[DEFAULT_VOCABULARY['types'][-1]] == 0
+    assert not set(retired) & set(counts)
+    assert sum(counts.values()) == len({record['id'] for record in records
+                                        if record['tipo'] is not None and record['precio'] is not None})